@@ -18,3 +18,56 @@ class Settings:
 
     # Kubernetes config.
     KUBERNETES_SERVICE_DEBUG = os.getenv("KUBERNETES_SERVICE_DEBUG") in STRING_TO_BOOL_DICT
+    # The namespace in which the operator itself runs.
+    KUBERNETES_NAMESPACE = os.getenv("KUBERNETES_NAMESPACE", "default")
+    # Whether to create and update our resources with server-side apply, which requires Kubernetes 1.16 or newer.
+    SERVER_SIDE_APPLY = os.getenv("SERVER_SIDE_APPLY") in STRING_TO_BOOL_DICT
+    # Whether to take over the fields that are owned by other field managers, instead of reporting a conflict.
+    SERVER_SIDE_APPLY_FORCE = os.getenv("SERVER_SIDE_APPLY_FORCE") in STRING_TO_BOOL_DICT
+
+    # Requests per second and burst size of the requests to the Kubernetes API, for reads and for writes.
+    KUBERNETES_READ_QPS = float(os.getenv("KUBERNETES_READ_QPS", "20"))
+    KUBERNETES_READ_BURST = int(os.getenv("KUBERNETES_READ_BURST", "40"))
+    KUBERNETES_WRITE_QPS = float(os.getenv("KUBERNETES_WRITE_QPS", "10"))
+    KUBERNETES_WRITE_BURST = int(os.getenv("KUBERNETES_WRITE_BURST", "20"))
+    # Whether listed objects are requested gzip-encoded and read through lightweight views instead of client models.
+    RAW_LIST_RESPONSES = os.getenv("RAW_LIST_RESPONSES") in STRING_TO_BOOL_DICT
+
+    # Operator config.
+    # Amount of clusters that are reconciled in parallel.
+    RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", "4"))
+    # Seconds between the audits that delete resources left behind by removed clusters.
+    GC_AUDIT_INTERVAL = float(os.getenv("GC_AUDIT_INTERVAL", "3600"))
+    # Maximum amount of orphaned clusters whose resources are deleted at once, and seconds between those batches.
+    GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "10"))
+    GC_BATCH_INTERVAL = float(os.getenv("GC_BATCH_INTERVAL", "1"))
+    # Whether the bodies sent to Kubernetes are rendered as plain dictionaries instead of Kubernetes client models.
+    PLAIN_MANIFESTS = os.getenv("PLAIN_MANIFESTS") in STRING_TO_BOOL_DICT
+    # Key of the spec hashes of the secrets. It is required and must be the same in all replicas, otherwise the
+    # secrets are updated again after every restart, failover or shard move.
+    SPEC_HASH_KEY = os.getenv("SPEC_HASH_KEY", "")
+    # Maximum amount of rendered Kubernetes objects that are cached, three are rendered per cluster.
+    RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "768"))
+    # Amount of threads that run the resource checkers, shared by all reconcile workers.
+    CHECKER_THREADS = int(os.getenv("CHECKER_THREADS", "8"))
+    # Minimum amount of seconds between periodic resyncs of a healthy and of a degraded cluster.
+    RESYNC_INTERVAL = float(os.getenv("RESYNC_INTERVAL", "300"))
+    RESYNC_DEGRADED_INTERVAL = float(os.getenv("RESYNC_DEGRADED_INTERVAL", "30"))
+    # Maximum amount of periodic resyncs per minute over all clusters. The intervals are stretched to stay within it.
+    RESYNC_BUDGET_PER_MINUTE = float(os.getenv("RESYNC_BUDGET_PER_MINUTE", "60"))
+    # Seconds to wait for a connection to a replica set member and for a suitable member to send a command to.
+    # A failed command requeues the cluster with backoff, so these are short to keep the workers available.
+    MONGO_CONNECT_TIMEOUT = float(os.getenv("MONGO_CONNECT_TIMEOUT", "5"))
+    MONGO_SERVER_SELECTION_TIMEOUT = float(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT", "5"))
+
+    # Leader election config. Only the replica that holds the lease reconciles, the others are warm standbys.
+    LEADER_ELECTION_LEASE_NAME = os.getenv("LEADER_ELECTION_LEASE_NAME", "mongo-operator")
+    LEADER_ELECTION_LEASE_DURATION = float(os.getenv("LEADER_ELECTION_LEASE_DURATION", "15"))
+    LEADER_ELECTION_RENEW_DEADLINE = float(os.getenv("LEADER_ELECTION_RENEW_DEADLINE", "10"))
+    LEADER_ELECTION_RETRY_PERIOD = float(os.getenv("LEADER_ELECTION_RETRY_PERIOD", "2"))
+
+    # Sharding config. When enabled, the clusters are split between all replicas instead of electing a leader.
+    SHARDING_ENABLED = os.getenv("SHARDING_ENABLED") in STRING_TO_BOOL_DICT
+    SHARD_LEASE_DURATION = float(os.getenv("SHARD_LEASE_DURATION", "15"))
+    SHARD_RENEW_PERIOD = float(os.getenv("SHARD_RENEW_PERIOD", "5"))
+    SHARD_VIRTUAL_NODES = int(os.getenv("SHARD_VIRTUAL_NODES", "100"))
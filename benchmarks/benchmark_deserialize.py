@@ -0,0 +1,49 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compares the compiled deserializer of `KubernetesResources.deserialize` with the previous implementation, which
+walked the swagger types of every model on each call, on the CRD YAML and on a stateful set payload.
+Note the previous implementation left lists and dictionaries of models as plain data, so it did less work.
+Run from the repository root with `python -m benchmarks.benchmark_deserialize`.
+"""
+import yaml
+from kubernetes.client import models as k8s_models
+
+from benchmarks.benchmark_manifests import loadCluster, measure
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+
+
+def deserializeUncompiled(data: dict, model_name: str) -> any:
+    """
+    The previous implementation of `KubernetesResources.deserialize`, kept as reference.
+    :param data: The data dictionary.
+    :param model_name: The name of the model.
+    :return: An instance of the model with the given name.
+    """
+    model_class = getattr(k8s_models, model_name, None)
+    if not model_class or not isinstance(data, dict):
+        return data
+    kwargs = {}
+    if model_class.swagger_types is not None:
+        for attr, attr_type in model_class.swagger_types.items():
+            if model_class.attribute_map.get(attr):
+                value = data.get(model_class.attribute_map[attr])
+                kwargs[attr] = deserializeUncompiled(value, attr_type)
+    return model_class(**kwargs)
+
+
+def main() -> None:
+    with open("mongo_crd.yaml") as crd_file:
+        crd_dict = yaml.safe_load(crd_file)
+    stateful_set_dict = KubernetesResources.serialize(KubernetesResources._renderStatefulSet(loadCluster()))
+
+    for name, data, model_name in (("CRD", crd_dict, "V1beta1CustomResourceDefinition"),
+                                   ("stateful set", stateful_set_dict, "V1beta1StatefulSet")):
+        uncompiled = measure("{}: uncompiled".format(name), lambda: deserializeUncompiled(data, model_name))
+        compiled = measure("{}: compiled".format(name), lambda: KubernetesResources.deserialize(data, model_name))
+        print("{}: {:.1f}x faster".format(name, uncompiled / compiled))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compares decoding a large list response into Kubernetes client models with decoding it into `ObjectView`s, as done
+with `RAW_LIST_RESPONSES`, when only the cluster keys are read like `cleanResources` does. Prints the CPU time, the
+peak memory and the transferred size with and without gzip.
+Run from the repository root with `python -m benchmarks.benchmark_lists`.
+"""
+import gzip
+import json
+import timeit
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from kubernetes.client import ApiClient
+
+from benchmarks.benchmark_manifests import loadCluster
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.ObjectView import ObjectView
+
+CLUSTERS = 2000
+NUMBER = 3
+
+
+class RawResponse:
+    """
+    The part of a urllib3 response that `ApiClient.deserialize` uses.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+
+def createListResponses() -> List[Tuple[str, str, bytes]]:
+    """
+    Renders the list responses of the secrets and stateful sets of all benchmarked clusters.
+    :return: A list of tuples with the name, the client model name of the list and the JSON response.
+    """
+    cluster_object = loadCluster()
+    secrets, stateful_sets = [], []
+    for index in range(CLUSTERS):
+        cluster_object.metadata.name = "mongo-cluster-{}".format(index)
+        cluster_object.metadata.uid = "2b1e4a5c-0000-0000-0000-{:012d}".format(index)
+        secrets.append(KubernetesResources.serialize(KubernetesResources.createSecret(
+            "{}-admin-credentials".format(cluster_object.metadata.name), cluster_object.metadata.namespace,
+            {"username": "root", "password": "secret"})))
+        stateful_sets.append(KubernetesResources._renderStatefulSetManifest(cluster_object))
+    return [
+        ("secrets", "V1SecretList", json.dumps({"items": secrets, "metadata": {}}).encode()),
+        ("stateful sets", "V1beta1StatefulSetList", json.dumps({"items": stateful_sets, "metadata": {}}).encode()),
+    ]
+
+
+def measure(name: str, func: Callable[[], any]) -> Tuple[float, int]:
+    """
+    Measures the CPU time and peak memory of the given function and prints them.
+    :param name: The name of the benchmark.
+    :param func: The function to measure.
+    :return: The best time per call in milliseconds, and the peak memory in bytes.
+    """
+    best = min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER * 1e3
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<40} {:>10.1f} ms {:>10.1f} MB".format(name, best, peak / 2 ** 20))
+    return best, peak
+
+
+def main() -> None:
+    api_client = ApiClient()
+    for name, list_model_name, data in createListResponses():
+        print("{}: {:.1f} MB, {:.1f} MB gzip-encoded".format(name, len(data) / 2 ** 20,
+                                                             len(gzip.compress(data)) / 2 ** 20))
+        model_time, model_peak = measure("{}: models".format(name), lambda: [
+            KubernetesResources.getClusterKey(item)
+            for item in api_client.deserialize(RawResponse(data), list_model_name).items
+        ])
+        view_time, view_peak = measure("{}: views".format(name), lambda: [
+            KubernetesResources.getClusterKey(ObjectView(item)) for item in json.loads(data)["items"]
+        ])
+        print("{}: {:.1f}x faster, {:.1f}x less memory".format(name, model_time / view_time, model_peak / view_peak))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compares the CPU time of rendering and serializing the stateful set body as Kubernetes client models and as plain
+manifests. Run from the repository root with `python -m benchmarks.benchmark_manifests`.
+"""
+import json
+import timeit
+from typing import Callable
+
+import yaml
+from kubernetes.client import ApiClient
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+
+REPLICAS = 50
+NUMBER = 2000
+
+
+def loadCluster() -> V1MongoClusterConfiguration:
+    """
+    Loads the example cluster, scaled to the benchmarked amount of replicas.
+    :return: The cluster object.
+    """
+    with open("examples/mongo-3-replicas.yaml") as example_file:
+        cluster_dict = yaml.safe_load(example_file)
+    cluster_dict["spec"]["mongodb"]["replicas"] = REPLICAS
+    cluster_dict["metadata"]["uid"] = "2b1e4a5c-0000-0000-0000-000000000000"
+    return V1MongoClusterConfiguration(**cluster_dict)
+
+
+def measure(name: str, func: Callable[[], any]) -> float:
+    """
+    Measures the given function and prints the time per call.
+    :param name: The name of the benchmark.
+    :param func: The function to measure.
+    :return: The best time per call, in microseconds.
+    """
+    best = min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e6
+    print("{:<40} {:>10.1f} us".format(name, best))
+    return best
+
+
+def main() -> None:
+    cluster_object = loadCluster()
+    api_client = ApiClient()
+    model_time = measure("model: render", lambda: KubernetesResources._renderStatefulSet(cluster_object))
+    model_total = measure("model: render + serialize", lambda: json.dumps(
+        api_client.sanitize_for_serialization(KubernetesResources._renderStatefulSet(cluster_object))))
+    manifest_time = measure("manifest: render", lambda: KubernetesResources._renderStatefulSetManifest(cluster_object))
+    manifest_total = measure("manifest: render + serialize", lambda: json.dumps(
+        api_client.sanitize_for_serialization(KubernetesResources._renderStatefulSetManifest(cluster_object))))
+    print("Speed-up: {:.1f}x render, {:.1f}x render + serialize".format(
+        model_time / manifest_time, model_total / manifest_total))
+
+
+if __name__ == "__main__":
+    main()
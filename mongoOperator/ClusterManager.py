@@ -3,18 +3,34 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import logging
-from time import sleep
-from typing import Dict, List, Tuple, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from socket import gethostname
+from uuid import uuid4
+from typing import Callable, Dict, List, Tuple, Optional
 
-from kubernetes import watch
+from kubernetes.client.rest import ApiException
 
+from Settings import Settings
+from mongoOperator.helpers.AsyncWatch import AsyncWatch
 from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
 from mongoOperator.helpers.BackupHelper import BackupHelper
+from mongoOperator.helpers.ClusterLocks import ClusterLocks
+from mongoOperator.helpers.DependencyGraph import DependencyGraph
+from mongoOperator.helpers.ExponentialBackoff import ExponentialBackoff
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.LeaderElector import LeaderElector
+from mongoOperator.helpers.ResourceCache import ResourceCache
+from mongoOperator.helpers.ResyncScheduler import ResyncScheduler
+from mongoOperator.helpers.ShardMembership import ShardMembership
+from mongoOperator.helpers.WorkQueue import WorkQueue
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.helpers.resourceCheckers.HeadlessServiceChecker import HeadlessServiceChecker
 from mongoOperator.helpers.resourceCheckers.ServiceChecker import ServiceChecker
 from mongoOperator.helpers.resourceCheckers.StatefulSetChecker import StatefulSetChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.AsyncKubernetesService import AsyncKubernetesService
 from mongoOperator.services.KubernetesService import KubernetesService
 from mongoOperator.services.MongoService import MongoService
 
@@ -22,11 +38,33 @@ from mongoOperator.services.MongoService import MongoService
 class ClusterManager:
     """ Manager that periodically checks the status of the MongoDB objects in the cluster. """
 
+    # A cluster that failed to reconcile is retried after an exponentially increasing delay between these bounds.
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 300.0
+
     def __init__(self) -> None:
         self._cluster_versions: Dict[Tuple[str, str], str] = {}  # format: {(cluster_name, namespace): resource_version}
         self._kubernetes_service = KubernetesService()
-        self._mongo_service = MongoService(self._kubernetes_service)
+        self._async_kubernetes_service = AsyncKubernetesService(self._kubernetes_service)
+        self._cluster_locks = ClusterLocks()
+        self._mongo_service = MongoService(self._kubernetes_service, self._cluster_locks, is_owner=self._isOwner)
         self._backup_checker = BackupHelper(self._kubernetes_service)
+        self._work_queue = WorkQueue()  # format: (namespace, cluster_name)
+        self._retry_backoff = ExponentialBackoff(self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY)
+        self._resync_scheduler = ResyncScheduler(self._work_queue, Settings.RESYNC_INTERVAL,
+                                                 Settings.RESYNC_DEGRADED_INTERVAL, Settings.RESYNC_BUDGET_PER_MINUTE)
+        identity = "{}_{}".format(gethostname(), uuid4())
+        self._leader_elector = LeaderElector(self._kubernetes_service, Settings.LEADER_ELECTION_LEASE_NAME,
+                                             Settings.KUBERNETES_NAMESPACE, identity,
+                                             Settings.LEADER_ELECTION_LEASE_DURATION,
+                                             Settings.LEADER_ELECTION_RENEW_DEADLINE,
+                                             Settings.LEADER_ELECTION_RETRY_PERIOD)
+        self._shard_membership: Optional[ShardMembership] = None
+        if Settings.SHARDING_ENABLED:
+            self._shard_membership = ShardMembership(self._kubernetes_service, Settings.LEADER_ELECTION_LEASE_NAME,
+                                                     Settings.KUBERNETES_NAMESPACE, identity,
+                                                     Settings.SHARD_LEASE_DURATION, Settings.SHARD_RENEW_PERIOD,
+                                                     Settings.SHARD_VIRTUAL_NODES)
         self._resource_checkers: List[BaseResourceChecker] = [
             HeadlessServiceChecker(self._kubernetes_service),
             ServiceChecker(self._kubernetes_service),
@@ -34,51 +72,248 @@ class ClusterManager:
             StatefulSetChecker(self._kubernetes_service)
 
         ]
+        self._checker_executor = ThreadPoolExecutor(Settings.CHECKER_THREADS, thread_name_prefix="checker")
+        self._stopping = threading.Event()
+        self._kubernetes_service.mongo_informer.addEventHandler(self._onMongoObjectEvent)
+        self._kubernetes_service.stateful_set_informer.addEventHandler(self._onResourceEvent)
+
+    def startInformers(self) -> None:
+        """
+        Fills the local caches of the Kubernetes objects and starts watching them for changes.
+        """
+        self._kubernetes_service.startInformers()
+
+    def warmUp(self) -> None:
+        """
+        Connects to all known replica sets ahead of time, so a standby replica can take over without a cold start.
+        """
+        for cluster_dict in self._kubernetes_service.mongo_informer.cache.list():
+            cluster_object = self._parseConfiguration(cluster_dict)
+            if cluster_object:
+                self._mongo_service.connect(cluster_object)
+        logging.info("Connected to %s replica sets.", len(self._kubernetes_service.mongo_informer.cache))
+
+    def lead(self, on_stopped_leading: Callable[[], None]) -> None:
+        """
+        Blocks until this operator replica was elected as the leader, and keeps renewing the leadership afterwards.
+        Only the leader may change any resources, the other replicas keep their caches and connections warm.
+        :param on_stopped_leading: Function called when the leadership was lost.
+        """
+        self._leader_elector.acquire()
+        self._mongo_service.activate()
+        self._leader_elector.startRenewing(on_stopped_leading)
+
+    def joinShards(self) -> None:
+        """
+        Joins the other operator replicas, after which this replica only reconciles and backs up its own share of the
+        clusters. The clusters are split again whenever a replica joins or leaves.
+        """
+        self._shard_membership.refresh()
+        self._mongo_service.activate()
+        self._shard_membership.start(on_members_changed=self._onShardMembersChanged)
+        self._onShardMembersChanged()
+
+    def leaveShards(self) -> None:
+        """
+        Hands our share of the clusters over to the other operator replicas, e.g. when shutting down.
+        """
+        if self._shard_membership:
+            self._shard_membership.leave()
+
+    def stop(self) -> None:
+        """
+        Stops taking on new work, e.g. after the leadership was lost. The reconciles, backups and restores that are
+        in progress are finished, after which `processQueue`, `resyncPeriodically` and `checkAndBackupIfNeeded` return.
+        """
+        self._stopping.set()
+        self._mongo_service.deactivate()
+        self._work_queue.shutDown()
+        self._resync_scheduler.stop()
 
     def checkExistingClusters(self) -> None:
         """
         Check all Mongo objects and see if the sub objects are available.
         If they are not, they should be (re-)created to ensure the cluster is in the expected state.
         """
-        mongo_objects = self._kubernetes_service.listMongoObjects()
-        logging.info("Checking %s mongo objects.", len(mongo_objects["items"]))
-        for cluster_dict in mongo_objects["items"]:
+        count = 0
+        for count, cluster_dict in enumerate(self._kubernetes_service.listMongoObjects(), start=1):
             cluster_object = self._parseConfiguration(cluster_dict)
             if cluster_object:
                 self._checkCluster(cluster_object)
+        logging.info("Checked %s mongo objects.", count)
+
+    def resyncPeriodically(self) -> None:
+        """
+        Queues a reconcile of every cluster periodically, until `stop` is called. Healthy clusters are checked less
+        often than degraded ones. The schedule of a cluster is renewed each time it is reconciled successfully.
+        """
+        self._resync_scheduler.run()
 
-    def collectGarbage(self) -> None:
+    async def auditGarbagePeriodically(self) -> None:
+        """
+        Collects garbage every audit interval, forever. Kubernetes deletes the resources of removed clusters through
+        their owner references, so this only cleans up resources that were created without them.
+        """
+        while True:
+            await asyncio.sleep(Settings.GC_AUDIT_INTERVAL)
+            try:
+                await self.collectGarbage()
+            except Exception as err:
+                logging.exception("Could not collect garbage: %s", err)
+
+    async def collectGarbage(self) -> None:
         """
         Cleans up any resources that are left after a cluster has been removed.
+        The existing clusters are listed once and shared by all checkers, which clean their resources concurrently.
+        Resources are deleted, so the clusters are always listed from the API: the informer cache may be stale while
+        its watch is down. The cached clusters are added, so clusters created during the listing are kept as well.
+        If the listing fails, nothing is deleted.
+        """
+        cluster_keys = {ResourceCache.getObjectKey(cluster_dict)
+                        async for cluster_dict in self._async_kubernetes_service.listMongoObjects()}
+        mongo_cache = self._kubernetes_service.mongo_informer.cache
+        if mongo_cache.synced:
+            cluster_keys.update(ResourceCache.getObjectKey(cluster_dict) for cluster_dict in mongo_cache.list())
+        await asyncio.gather(*(checker.cleanResources(cluster_keys, self._async_kubernetes_service)
+                               for checker in self._resource_checkers))
+
+    async def pods(self) -> None:
+        """
+        Watches the pods operated by us, queueing a reconcile of their cluster on every change.
+        The blocking watch stream is consumed in a background thread, so the event loop is never blocked.
+        """
+        async for event in AsyncWatch(self._kubernetes_service.streamPodsOperatedByMe):
+            self._onResourceEvent(event["type"], event["object"])
+
+    def processQueue(self) -> None:
+        """
+        Reconciles the clusters that were queued by the watch events, until `stop` is called.
+        Bursts of events for the same cluster are coalesced into a single reconcile.
+        Several threads may run this method to reconcile different clusters in parallel.
+        A cluster that fails is queued again after a backoff delay, without blocking the thread meanwhile.
         """
-        for checker in self._resource_checkers:
-            checker.cleanResources()
-
-    async def pods(self):
-        w = watch.Watch()
-        for event in self._kubernetes_service.streamPodsOperatedByMe(watch=w):
-            logging.info("Received Event: %s %s %s" % (event['type'], event['object'].kind, event['object'].metadata.name))
-            self.checkExistingClusters()
-            self.collectGarbage()
-            await asyncio.sleep(0)
-
-    async def statefulsets(self):
-        w = watch.Watch()
-        for event in self._kubernetes_service.streamStatefulSetsOperatedByMe(watch=w):
-            logging.info("Received Event: %s %s %s" % (event['type'], event['object'].kind, event['object'].metadata.name))
-            self.checkExistingClusters()
-            self.collectGarbage()
-            await asyncio.sleep(0)
-
-    def checkAndBackupIfNeeded(self):
         while True:
-            mongo_objects = self._kubernetes_service.listMongoObjects()
-            logging.debug("Checking backup job for %s mongo objects.", len(mongo_objects["items"]))
-            for cluster_dict in mongo_objects["items"]:
-                cluster_object = self._parseConfiguration(cluster_dict)
-                if cluster_object:
-                    self._backup_checker.backup_if_needed(cluster_object)
-            sleep(10)
+            key = self._work_queue.get()
+            if key is None:
+                return  # the queue was shut down
+            if not self._isOwner(key):
+                logging.debug("Skipping cluster %s @ ns/%s, it is owned by another replica.", key[1], key[0])
+                self._resync_scheduler.forget(key)
+                self._work_queue.done(key)
+                continue
+            try:
+                self.reconcile(key)
+                self._retry_backoff.succeeded(key)
+            except Exception as err:
+                delay = self._retry_backoff.failed(key)
+                logging.exception("Could not reconcile cluster %s @ ns/%s, retrying in %.1f seconds: %s",
+                                  key[1], key[0], delay, err)
+                self._work_queue.addAfter(key, delay)
+            finally:
+                self._work_queue.done(key)
+            logging.info("Reconciled cluster %s @ ns/%s. Queue stats: %s. API rate limit stats: %s", key[1], key[0],
+                         self._work_queue.getStats(), self._kubernetes_service.rate_limiter.getStats())
+
+    def reconcile(self, key: Tuple[str, str]) -> None:
+        """
+        Checks the cluster with the given key. If the cluster no longer exists, its resources are cleaned up.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        """
+        with self._cluster_locks.get(key):
+            self._reconcile(key)
+
+    def _reconcile(self, key: Tuple[str, str]) -> None:
+        """
+        Checks the cluster with the given key. The cluster lock must be held by the caller.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        """
+        namespace, cluster_name = key
+        try:
+            cluster_dict = self._kubernetes_service.getMongoObject(cluster_name, namespace)
+        except ApiException as api_exception:
+            if api_exception.status != 404:
+                raise
+            # The resources of the cluster are deleted by Kubernetes, as they are owned by the cluster object.
+            logging.info("Cluster %s @ ns/%s was removed.", cluster_name, namespace)
+            self._cluster_versions.pop((cluster_name, namespace), None)
+            self._resync_scheduler.forget(key)
+            return
+
+        cluster_object = self._parseConfiguration(cluster_dict)
+        if not cluster_object:
+            self._resync_scheduler.forget(key)
+            return
+        self._checkCluster(cluster_object)
+        delay = self._resync_scheduler.schedule(key, self._mongo_service.isReplicaSetHealthy(cluster_object))
+        logging.debug("Next resync of cluster %s @ ns/%s in %.1f seconds.", cluster_name, namespace, delay)
+
+    def _onMongoObjectEvent(self, event_type: str, cluster_dict: Dict[str, any]) -> None:
+        """
+        Queues a reconcile of a created, updated or deleted Mongo object.
+        :param event_type: The type of the event, i.e. ADDED, MODIFIED or DELETED.
+        :param cluster_dict: The Mongo object.
+        """
+        key = ResourceCache.getObjectKey(cluster_dict)
+        logging.info("Received Event: %s %s %s @ ns/%s", event_type, cluster_dict.get("kind"), key[1], key[0])
+        if self._isOwner(key):
+            self._work_queue.add(key)
+
+    def _onResourceEvent(self, event_type: str, obj: any) -> None:
+        """
+        Queues a reconcile of the cluster that owns the object in the given event, e.g. a pod or stateful set.
+        :param event_type: The type of the event, i.e. ADDED, MODIFIED or DELETED.
+        :param obj: The object.
+        """
+        logging.info("Received Event: %s %s %s", event_type, obj.kind, obj.metadata.name)
+        key = KubernetesResources.getClusterKey(obj)
+        if key:
+            if self._isOwner(key):
+                self._work_queue.add(key)
+        else:
+            logging.warning("Ignoring event for %s, it has no cluster label.", obj.metadata.name)
+
+    def _isOwner(self, key: Tuple[str, str]) -> bool:
+        """
+        Checks whether this operator replica is responsible for the given cluster.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        :return: True if sharding is disabled or if the cluster is in our share.
+        """
+        return self._shard_membership is None or self._shard_membership.isOwner(key)
+
+    def _onShardMembersChanged(self) -> None:
+        """
+        Queues a reconcile of all clusters in our share, as some of them may have been owned by another replica.
+        """
+        keys = [ResourceCache.getObjectKey(cluster_dict)
+                for cluster_dict in self._kubernetes_service.mongo_informer.cache.list()]
+        owned_keys = [key for key in keys if self._isOwner(key)]
+        logging.info("This replica now owns %s of %s clusters.", len(owned_keys), len(keys))
+        for key in owned_keys:
+            self._work_queue.add(key)
+
+    def checkAndBackupIfNeeded(self) -> None:
+        """
+        Backs up the clusters in our share when their backup is due, every 10 seconds until `stop` is called.
+        The cluster lock is only held while reading the cluster, so the cluster can be reconciled during the dump.
+        """
+        mongo_cache = self._kubernetes_service.mongo_informer.cache
+        while not self._stopping.is_set():
+            cluster_dicts = mongo_cache.list()
+            logging.debug("Checking backup job for %s mongo objects.", len(cluster_dicts))
+            for cluster_dict in cluster_dicts:
+                namespace, cluster_name = key = ResourceCache.getObjectKey(cluster_dict)
+                if self._stopping.is_set():
+                    return
+                if not self._isOwner(key):
+                    continue
+                with self._cluster_locks.get(key):
+                    # the cluster is read once any running reconcile of it has finished
+                    cluster_dict = mongo_cache.get(namespace, cluster_name)
+                    cluster_object = cluster_dict and self._parseConfiguration(cluster_dict)
+                    if not cluster_object or not self._backup_checker.is_backup_needed(cluster_object):
+                        continue
+                self._backup_checker.backup_if_needed(cluster_object)
+            self._stopping.wait(10)
 
     def _checkCluster(self, cluster_object: V1MongoClusterConfiguration, force: bool = False) -> None:
         """
@@ -96,8 +331,7 @@ class ClusterManager:
             self._mongo_service.checkOrCreateReplicaSet(cluster_object)
         else:
             logging.debug("Checking cluster %s now with all checkers.", cluster_object.metadata.name)
-            for checker in self._resource_checkers:
-                checker.checkResource(cluster_object)
+            self._runCheckers(cluster_object)
             logging.debug("Checks of all checkers complete, will check replica.")
             self._mongo_service.checkOrCreateReplicaSet(cluster_object)
             self._mongo_service.createUsers(cluster_object)
@@ -105,6 +339,19 @@ class ClusterManager:
 
         #self._backup_checker.backup_if_needed(cluster_object)
 
+    def _runCheckers(self, cluster_object: V1MongoClusterConfiguration) -> None:
+        """
+        Runs all resource checkers for the given cluster. Each checker starts as soon as the checkers it depends on
+        have finished, so independent resources are checked concurrently.
+        :param cluster_object: The cluster object from the YAML file.
+        """
+        graph = DependencyGraph()
+        names = {type(checker).__name__ for checker in self._resource_checkers}
+        for checker in self._resource_checkers:
+            graph.add(type(checker).__name__, partial(checker.checkResource, cluster_object),
+                      depends_on=[name for name in checker.DEPENDS_ON if name in names])
+        graph.run(self._checker_executor)
+
     @staticmethod
     def _parseConfiguration(cluster_dict: Dict[str, any]) -> Optional[V1MongoClusterConfiguration]:
         """
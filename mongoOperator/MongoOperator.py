@@ -3,8 +3,11 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import logging
+import sys
 import threading
+from typing import List, Optional
 
+from Settings import Settings
 from mongoOperator.ClusterManager import ClusterManager
 
 
@@ -13,31 +16,85 @@ class MongoOperator:
     The Mongo operator manages MongoDB replica sets and backups in a Kubernetes cluster.
     """
 
-    def __init__(self, sleep_per_run: float = 5.0) -> None:
+    def __init__(self) -> None:
         """
-        :param sleep_per_run: How many seconds we should sleep after each run.
+        :raise ValueError: If the key of the spec hashes is not configured.
         """
-        self._sleep_per_run = sleep_per_run
+        if not Settings.SPEC_HASH_KEY:
+            raise ValueError("The SPEC_HASH_KEY environment variable is required, set it to the same secret key in all "
+                             "replicas of the operator.")
+        self._cluster_manager: Optional[ClusterManager] = None
+        self._ioloop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped_leading = False
 
     def run_forever(self) -> None:
         """
-        Runs the mongo operator forever (until a kill command is received).
+        Runs the mongo operator forever (until a kill command is received or the leadership is lost).
+        The running reconciles, backups and restores are always finished before the operator stops.
+        :raise SystemExit: If the leadership was lost, so Kubernetes restarts the pod as a standby.
         """
+        self._ioloop = asyncio.get_event_loop()
+        self._cluster_manager = clusterManager = ClusterManager()
+        clusterManager.startInformers()
+        if Settings.SHARDING_ENABLED:
+            clusterManager.joinShards()
+        else:
+            clusterManager.warmUp()
+            clusterManager.lead(on_stopped_leading=self._stopLeading)
 
-        clusterManager = ClusterManager()
-
-        thread = threading.Thread(target=clusterManager.checkAndBackupIfNeeded)
-        thread.start()
-        logging.info("Scheduled backup check every 10 seconds,")
+        threads = self._startThreads(clusterManager)
 
         logging.info("Starting operator ioloop processing events")
         try:
-            ioloop = asyncio.get_event_loop()
-
-            ioloop.create_task(clusterManager.pods())
-            ioloop.create_task(clusterManager.statefulsets())
-            ioloop.run_forever()
+            self._startTasks(clusterManager)
+            self._ioloop.run_forever()
         except KeyboardInterrupt:
             logging.info("Application interrupted...")
+            clusterManager.leaveShards()
+
+        logging.info("Waiting for the running reconciles and backups to finish...")
+        clusterManager.stop()
+        for thread in threads:
+            thread.join()
         logging.info("Done running operator")
+        if self._stopped_leading:
+            sys.exit(1)
 
+    @staticmethod
+    def _startThreads(cluster_manager: ClusterManager) -> List[threading.Thread]:
+        """
+        Starts the threads that check the backups, reconcile the clusters and resync them periodically.
+        :param cluster_manager: The cluster manager.
+        :return: The started threads.
+        """
+        threads = [threading.Thread(target=cluster_manager.checkAndBackupIfNeeded, name="backup")]
+        threads += [threading.Thread(target=cluster_manager.processQueue, name="reconcile-{}".format(index))
+                    for index in range(Settings.RECONCILE_WORKERS)]
+        threads.append(threading.Thread(target=cluster_manager.resyncPeriodically, name="resync"))
+        for thread in threads:
+            thread.start()
+        logging.info("Scheduled backup check every 10 seconds,")
+        logging.info("Started %s reconcile workers.", Settings.RECONCILE_WORKERS)
+        logging.info("Scheduled resyncs every %s seconds for healthy and %s seconds for degraded clusters.",
+                     Settings.RESYNC_INTERVAL, Settings.RESYNC_DEGRADED_INTERVAL)
+        return threads
+
+    def _startTasks(self, cluster_manager: ClusterManager) -> None:
+        """
+        Schedules the tasks on the event loop that watch the pods and audit the garbage.
+        :param cluster_manager: The cluster manager.
+        """
+        self._ioloop.create_task(cluster_manager.pods())
+        self._ioloop.create_task(cluster_manager.auditGarbagePeriodically())
+        logging.info("Scheduled garbage collection audits every %s seconds.", Settings.GC_AUDIT_INTERVAL)
+
+    def _stopLeading(self) -> None:
+        """
+        Stops the operator after the leadership was lost, as another replica takes over. No new work is started,
+        and `run_forever` exits once the running work is finished. The pod is then restarted by Kubernetes and
+        becomes a standby.
+        """
+        logging.error("Leadership lost, stopping the operator.")
+        self._stopped_leading = True
+        self._cluster_manager.stop()
+        self._ioloop.call_soon_threadsafe(self._ioloop.stop)
@@ -0,0 +1,54 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+
+class AsyncWatch:
+    """
+    Asynchronous iterator over a blocking Kubernetes watch stream.
+    The stream is consumed in a background thread that hands the events to the event loop through an `asyncio.Queue`,
+    so any number of watches can be awaited concurrently without blocking the event loop.
+
+    Usage:
+        async for event in AsyncWatch(kubernetes_service.streamPodsOperatedByMe):
+            handle(event)
+    """
+
+    # Marker put in the queue when the stream has ended.
+    _END = object()
+
+    def __init__(self, stream_factory: Callable[[], Iterable[Dict[str, any]]]) -> None:
+        """
+        :param stream_factory: Function that opens the blocking watch stream. It is called in the background thread.
+        """
+        self._stream_factory = stream_factory
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    def __aiter__(self) -> "AsyncWatch":
+        self._loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue()
+        threading.Thread(target=self._consume, name="async-watch", daemon=True).start()
+        return self
+
+    async def __anext__(self) -> Dict[str, any]:
+        item = await self._queue.get()
+        if item is self._END:
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def _consume(self) -> None:
+        """
+        Iterates the blocking stream, forwarding each event (or the error that ended the stream) to the event loop.
+        """
+        try:
+            for event in self._stream_factory():
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        except Exception as err:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, err)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, self._END)
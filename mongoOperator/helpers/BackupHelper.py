@@ -35,11 +35,11 @@ class BackupHelper:
         self.kubernetes_service = kubernetes_service
         self._last_backups = {}  # type: Dict[Tuple[str, str], datetime]  # format: {(cluster_name, namespace): date}
 
-    def backup_if_needed(self, cluster_object: V1MongoClusterConfiguration) -> bool:
+    def is_backup_needed(self, cluster_object: V1MongoClusterConfiguration) -> bool:
         """
-        Checks whether a backup is needed for the cluster, backing it up if necessary.
+        Checks whether a backup is needed for the cluster.
         :param cluster_object: The cluster object from the YAML file.
-        :return: Whether a backup was created or not.
+        :return: Whether the backup is due.
         """
         now = self._utc_now()
 
@@ -49,14 +49,26 @@ class BackupHelper:
             if last_backup else now
 
         if next_backup <= now:
-            self.backup(cluster_object, now)
-            self._last_backups[cluster_key] = now
             return True
 
         logging.debug("Cluster %s @ ns/%s will need a backup at %s.", cluster_object.metadata.name,
                      cluster_object.metadata.namespace, next_backup.isoformat())
         return False
 
+    def backup_if_needed(self, cluster_object: V1MongoClusterConfiguration) -> bool:
+        """
+        Checks whether a backup is needed for the cluster, backing it up if necessary.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: Whether a backup was created or not.
+        """
+        if not self.is_backup_needed(cluster_object):
+            return False
+
+        now = self._utc_now()
+        self.backup(cluster_object, now)
+        self._last_backups[(cluster_object.metadata.name, cluster_object.metadata.namespace)] = now
+        return True
+
     @staticmethod
     def ensure_dir(file_path):
         directory = os.path.dirname(file_path)
@@ -0,0 +1,104 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from typing import Dict, Hashable, List
+
+
+class ClusterLock:
+    """
+    The lock of a single cluster, see `ClusterLocks.get`. It is reentrant, like `threading.RLock`.
+    """
+
+    def __init__(self, cluster_locks: "ClusterLocks", key: Hashable) -> None:
+        """
+        :param cluster_locks: The locks of all clusters.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        """
+        self._cluster_locks = cluster_locks
+        self._key = key
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Acquires the lock of the cluster.
+        :param blocking: Whether to wait until the lock is released by other threads.
+        :return: Whether the lock was acquired.
+        """
+        return self._cluster_locks.acquire(self._key, blocking)
+
+    def release(self) -> None:
+        """
+        Releases the lock of the cluster.
+        """
+        self._cluster_locks.release(self._key)
+
+    def __enter__(self) -> "ClusterLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class ClusterLocks:
+    """
+    Hands out one lock per cluster, so work on a single cluster is never done by two threads at the same time,
+    while different clusters can be handled in parallel.
+    The locks are created when needed and dropped once no thread holds or waits for them, so the locks of removed
+    clusters are not kept forever.
+
+    Usage:
+        with cluster_locks.get(("namespace", "cluster")):
+            reconcile()
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, List] = {}  # format: {cluster_key: [lock, amount of holders and waiters]}
+
+    def get(self, key: Hashable) -> ClusterLock:
+        """
+        Gets the lock for the given cluster.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        :return: The lock.
+        """
+        return ClusterLock(self, key)
+
+    def acquire(self, key: Hashable, blocking: bool = True) -> bool:
+        """
+        Acquires the lock of the given cluster, creating it if needed.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        :param blocking: Whether to wait until the lock is released by other threads.
+        :return: Whether the lock was acquired.
+        """
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.RLock(), 0])
+            entry[1] += 1
+        if entry[0].acquire(blocking):
+            return True
+        with self._lock:
+            self._forget(key, entry)
+        return False
+
+    def release(self, key: Hashable) -> None:
+        """
+        Releases the lock of the given cluster, dropping it if no other thread holds or waits for it.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        :raise RuntimeError: If the lock is not held by the current thread.
+        """
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                raise RuntimeError("Cannot release the lock of {}, it is not held".format(key))
+            entry[0].release()
+            self._forget(key, entry)
+
+    def _forget(self, key: Hashable, entry: List) -> None:
+        """
+        Counts one less holder or waiter of the given lock. The lock of this class must be held by the caller.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        :param entry: The lock and its amount of holders and waiters.
+        """
+        entry[1] -= 1
+        if not entry[1]:
+            del self._locks[key]
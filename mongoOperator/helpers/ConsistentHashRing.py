@@ -0,0 +1,46 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import bisect
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+
+class ConsistentHashRing:
+    """
+    Assigns keys to members using consistent hashing. Every member is placed on the ring many times (virtual nodes),
+    so keys are spread evenly, and when a member joins or leaves only the keys in its own slices move.
+    """
+
+    def __init__(self, members: Iterable[str] = (), virtual_nodes: int = 100) -> None:
+        """
+        :param members: The identities of the members.
+        :param virtual_nodes: How many times each member is placed on the ring.
+        """
+        self._virtual_nodes = virtual_nodes
+        self.members = frozenset(members)
+        self._ring: List[Tuple[int, str]] = sorted(
+            (self._hash("{}#{}".format(member, index)), member)
+            for member in self.members for index in range(virtual_nodes)
+        )
+        self._hashes = [node_hash for node_hash, _ in self._ring]
+
+    def getOwner(self, key: Tuple[str, ...]) -> Optional[str]:
+        """
+        Finds the member that owns the given key.
+        :param key: The key, e.g. a tuple (namespace, cluster_name).
+        :return: The identity of the owner, or None if there are no members.
+        """
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._hashes, self._hash("/".join(key))) % len(self._ring)
+        return self._ring[index][1]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        """
+        Calculates a stable hash, that is the same in every process.
+        :param value: The value to hash.
+        :return: The hash as integer.
+        """
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
@@ -0,0 +1,108 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+class DependencyGraph:
+    """
+    Runs a set of tasks that depend on each other, as a directed acyclic graph.
+    Every task is started as soon as all of its dependencies have finished, so independent tasks run concurrently.
+    If a task fails, the tasks that depend on it are not started, and the first error is raised once all running
+    tasks have finished.
+
+    Usage:
+        graph = DependencyGraph()
+        graph.add("secret", create_secret)
+        graph.add("stateful_set", create_stateful_set, depends_on=["secret"])
+        graph.run(executor)
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, Callable[[], None]] = {}
+        self._dependencies: Dict[str, List[str]] = {}
+
+    def add(self, name: str, task: Callable[[], None], depends_on: Iterable[str] = ()) -> None:
+        """
+        Adds a task to the graph.
+        :param name: The unique name of the task.
+        :param task: The function to run.
+        :param depends_on: The names of the tasks that must finish before this task may start.
+        """
+        if name in self._tasks:
+            raise ValueError("Task {} was added twice".format(name))
+        self._tasks[name] = task
+        self._dependencies[name] = list(depends_on)
+
+    def run(self, executor: Executor) -> None:
+        """
+        Runs all tasks, blocking until they are finished.
+        :param executor: The executor that runs the tasks.
+        :raise ValueError: If a dependency is unknown or if the dependencies contain a cycle.
+        :raise Exception: The first error raised by any of the tasks.
+        """
+        self._validate()
+        pending = dict(self._dependencies)
+        finished = set()
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+        while pending or running:
+            if error is None:
+                self._submitReady(executor, pending, finished, running)
+            if not running:
+                break  # the remaining tasks depend on a failed task
+            error = self._collectFinished(running, finished, error)
+        if error is not None:
+            raise error
+
+    def _submitReady(self, executor: Executor, pending: Dict[str, List[str]], finished: Set[str],
+                     running: Dict[Future, str]) -> None:
+        """
+        Starts the pending tasks whose dependencies have all finished.
+        :param executor: The executor that runs the tasks.
+        :param pending: The dependencies of the tasks that were not started yet, the started tasks are removed.
+        :param finished: The names of the tasks that finished successfully.
+        :param running: The names of the running tasks by their future, the started tasks are added.
+        """
+        for name in [name for name, dependencies in pending.items() if finished.issuperset(dependencies)]:
+            del pending[name]
+            running[executor.submit(self._tasks[name])] = name
+
+    @staticmethod
+    def _collectFinished(running: Dict[Future, str], finished: Set[str],
+                         error: Optional[BaseException]) -> Optional[BaseException]:
+        """
+        Waits until at least one of the running tasks is done, and moves the successful ones to the finished tasks.
+        :param running: The names of the running tasks by their future, the done tasks are removed.
+        :param finished: The names of the tasks that finished successfully, the successful tasks are added.
+        :param error: The first error raised by any of the tasks so far.
+        :return: The first error raised by any of the tasks, including the ones that are done now.
+        """
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            if future.exception() is None:
+                finished.add(name)
+            elif error is None:
+                error = future.exception()
+        return error
+
+    def _validate(self) -> None:
+        """
+        Checks that all dependencies exist and that there are no cycles.
+        :raise ValueError: If the graph is invalid.
+        """
+        for name, dependencies in self._dependencies.items():
+            unknown = set(dependencies) - set(self._tasks)
+            if unknown:
+                raise ValueError("Task {} depends on unknown tasks {}".format(name, sorted(unknown)))
+        resolved = set()
+        remaining = dict(self._dependencies)
+        while remaining:
+            ready = [name for name, dependencies in remaining.items() if resolved.issuperset(dependencies)]
+            if not ready:
+                raise ValueError("The dependencies of tasks {} contain a cycle".format(sorted(remaining)))
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
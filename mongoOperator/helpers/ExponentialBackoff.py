@@ -0,0 +1,53 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import random
+import threading
+from typing import Dict, Hashable
+
+
+class ExponentialBackoff:
+    """
+    Keeps track of consecutive failures per key, and calculates how long to wait before the next attempt.
+    The delay doubles on every failure up to a maximum, with some random jitter so retries are spread out.
+    """
+
+    def __init__(self, base_delay: float, max_delay: float, jitter: float = 0.2) -> None:
+        """
+        :param base_delay: The amount of seconds to wait after the first failure.
+        :param max_delay: The maximum amount of seconds to wait.
+        :param jitter: The fraction by which each delay is randomly shortened or lengthened.
+        """
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._failures: Dict[Hashable, int] = {}
+
+    def failed(self, key: Hashable) -> float:
+        """
+        Registers a failure for the given key.
+        :param key: The key that failed, e.g. a tuple (namespace, cluster_name).
+        :return: The amount of seconds to wait before trying again.
+        """
+        with self._lock:
+            failures = self._failures.get(key, 0)
+            self._failures[key] = failures + 1
+        delay = min(self._max_delay, self._base_delay * 2 ** min(failures, 32))
+        return min(self._max_delay, delay * random.uniform(1 - self._jitter, 1 + self._jitter))
+
+    def succeeded(self, key: Hashable) -> None:
+        """
+        Resets the failures of the given key.
+        :param key: The key that succeeded.
+        """
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def getFailures(self, key: Hashable) -> int:
+        """
+        :param key: The key.
+        :return: The amount of consecutive failures of the given key.
+        """
+        with self._lock:
+            return self._failures.get(key, 0)
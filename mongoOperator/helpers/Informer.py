@@ -0,0 +1,121 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from time import sleep
+from typing import Callable, List, Optional
+
+from mongoOperator.helpers.ListPager import ListPager
+from mongoOperator.helpers.ResourceCache import ResourceCache, ClusterKey
+from mongoOperator.helpers.ResumableWatch import ResumableWatch, WatchExpiredError
+
+EventHandler = Callable[[str, any], None]
+
+
+class Informer:
+    """
+    Keeps a `ResourceCache` up to date by listing all objects once and then watching them for changes.
+    The watch resumes from the last seen resource version, so the objects are only listed again (page by page) when
+    that version has expired.
+    Registered event handlers are called for every change, including for the objects found by a (re)list.
+    """
+
+    # How many seconds we wait before listing again after the list failed.
+    RETRY_WAIT = 5.0
+
+    def __init__(self, name: str, list_func: Callable, *args,
+                 cluster_key_func: Callable[[any], Optional[ClusterKey]], page_size: Optional[int] = None,
+                 decode_func: Optional[Callable[[any], any]] = None, **kwargs) -> None:
+        """
+        :param name: The name of the informer, used for logging.
+        :param list_func: The Kubernetes API list function, e.g. `CoreV1Api.list_service_for_all_namespaces`.
+        :param args: The positional arguments for the list function.
+        :param cluster_key_func: Function that returns the key of the cluster that owns the given object.
+        :param page_size: The amount of objects to request per page when listing, or None to list in one request.
+        :param decode_func: Function that converts the listed and watched objects, e.g. plain JSON into views.
+        :param kwargs: The keyword arguments for the list function, e.g. the label selector.
+        """
+        self.name = name
+        self.cache = ResourceCache(cluster_key_func)
+        self._list_func = list_func
+        self._args = args
+        self._kwargs = kwargs
+        self._page_size = page_size
+        self._decode_func = decode_func
+        self._watch = ResumableWatch(list_func, *args, **kwargs)
+        self._handlers: List[EventHandler] = []
+
+    def addEventHandler(self, handler: EventHandler) -> None:
+        """
+        Registers a function to be called with the event type and object for every change.
+        The handlers are called from the informer thread, so they should return quickly.
+        :param handler: The event handler.
+        """
+        self._handlers.append(handler)
+
+    def start(self) -> threading.Thread:
+        """
+        Starts listing and watching in a background thread.
+        :return: The started thread.
+        """
+        thread = threading.Thread(target=self.run, name="informer-{}".format(self.name), daemon=True)
+        thread.start()
+        return thread
+
+    def run(self) -> None:
+        """
+        Lists and watches the objects, forever.
+        """
+        while True:
+            try:
+                resource_version = self._list()
+                self._watchFrom(resource_version)
+            except WatchExpiredError as err:
+                logging.info("Informer %s watch expired (%s), listing again.", self.name, err)
+            except Exception as err:
+                logging.exception("Informer %s failed to list, trying again in %s seconds: %s", self.name,
+                                  self.RETRY_WAIT, err)
+                sleep(self.RETRY_WAIT)
+
+    def _list(self) -> str:
+        """
+        Lists all objects page by page, replacing the cache contents.
+        :return: The resource version of the list.
+        """
+        items = []
+        resource_version = None
+        pager = ListPager(self._list_func, *self._args, page_size=self._page_size, **self._kwargs)
+        for page, resource_version in pager.pages():
+            items.extend(map(self._decode_func, page) if self._decode_func else page)
+
+        deleted = self.cache.replace(items)
+        logging.info("Informer %s listed %s objects at version %s.", self.name, len(items), resource_version)
+        for obj in deleted:
+            self._notify("DELETED", obj)
+        for obj in items:
+            self._notify("ADDED", obj)
+        return resource_version
+
+    def _watchFrom(self, resource_version: str) -> None:
+        """
+        Watches the objects starting at the given resource version, forever.
+        :param resource_version: The resource version to start watching from.
+        :raise WatchExpiredError: If the resource version expired.
+        """
+        for event in self._watch.stream(resource_version):
+            obj = self._decode_func(event["object"]) if self._decode_func else event["object"]
+            self.cache.apply(event["type"], obj)
+            self._notify(event["type"], obj)
+
+    def _notify(self, event_type: str, obj: any) -> None:
+        """
+        Calls all event handlers for the given event.
+        :param event_type: The type of the event, i.e. ADDED, MODIFIED or DELETED.
+        :param obj: The object in the event.
+        """
+        for handler in self._handlers:
+            try:
+                handler(event_type, obj)
+            except Exception as err:
+                logging.exception("Event handler of informer %s failed: %s", self.name, err)
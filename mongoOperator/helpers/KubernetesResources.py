@@ -1,14 +1,19 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-from os import urandom
+import hashlib
+import hmac
+import json
+from copy import copy
+from datetime import date, datetime
 from base64 import b64encode
 
 from kubernetes import client
 from kubernetes.client import models as k8s_models
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
 
 from Settings import Settings
+from mongoOperator.helpers.RenderCache import RenderCache
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
 
@@ -26,6 +31,10 @@ def stored_versions(self, stored_versions):
 setattr(V1beta1CustomResourceDefinitionStatus, 'stored_versions', property(fget=V1beta1CustomResourceDefinitionStatus.stored_versions.fget, fset=stored_versions))
 # end of patch
 
+RenderedType = TypeVar("RenderedType")
+Deserializer = Callable[[any], any]
+Manifest = Dict[str, any]  # a plain, JSON-ready Kubernetes object, e.g. {"metadata": {"name": "mongo"}, "spec": {}}
+
 
 class KubernetesResources:
     """ Helper class responsible for creating the Kubernetes model objects. """
@@ -40,6 +49,19 @@ class KubernetesResources:
     # taken from AdminSecretChecker.py
     ADMIN_SECRET_NAME_FORMAT = "{}-admin-credentials"
 
+    # The annotation holding the hash of the desired state of each object we create.
+    SPEC_HASH_ANNOTATION = Settings.CUSTOM_OBJECT_API_GROUP + "/spec-hash"
+    # The key of the hashes of objects with secret data, see `cls.calculateSpecHash`.
+    SPEC_HASH_KEY = Settings.SPEC_HASH_KEY.encode()
+    # The fields that hold secret data.
+    SECRET_DATA_FIELDS = ("data", "stringData")
+
+    # The compiled deserializers, by swagger type, see `cls.deserialize`.
+    _deserializers: Dict[str, "Deserializer"] = {}
+
+    # The rendered objects of the clusters, by (kind, cluster_uid, generation).
+    render_cache = RenderCache(Settings.RENDER_CACHE_SIZE)
+
     # These are default values and are overridable in the custom resource definition.
     DEFAULT_STORAGE_NAME = "mongo-storage"
     DEFAULT_STORAGE_MOUNT_PATH = "/var/lib/mongodb/data/"
@@ -55,23 +77,26 @@ class KubernetesResources:
 
     @classmethod
     def createSecret(cls, secret_name: str, namespace: str, secret_data: Dict[str, str],
-                     labels: Optional[Dict[str, str]] = None) -> client.V1Secret:
+                     labels: Optional[Dict[str, str]] = None,
+                     owner_references: Optional[List[client.V1OwnerReference]] = None) -> client.V1Secret:
         """
         Creates a secret object.
         :param secret_name: The name of the secret.
         :param namespace: The name space for the secret.
         :param secret_data: The secret data.
         :param labels: Optional labels for this secret, defaults to the default labels (see `cls.createDefaultLabels`).
+        :param owner_references: Optional owners of this secret, see `cls.createOwnerReferences`.
         :return: The secret model object.
         """
-        return client.V1Secret(
+        return cls.stampSpecHash(client.V1Secret(
             metadata=client.V1ObjectMeta(
                 name=secret_name,
                 namespace=namespace,
-                labels=cls.createDefaultLabels(secret_name) if labels is None else labels
+                labels=cls.createDefaultLabels(secret_name) if labels is None else labels,
+                owner_references=owner_references,
             ),
             string_data=secret_data,
-        )
+        ))
 
     @staticmethod
     def createDefaultLabels(name: str = None) -> Dict[str, str]:
@@ -87,8 +112,58 @@ class KubernetesResources:
             "app": name if name else ""
         }
 
+    @staticmethod
+    def createOwnerReferences(cluster_object: V1MongoClusterConfiguration) -> Optional[List[client.V1OwnerReference]]:
+        """
+        Creates the owner references that point at the given cluster, so Kubernetes deletes the objects we create for
+        the cluster once the cluster itself is deleted.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The owner references, or None if the cluster object has no UID, e.g. because it was never stored.
+        """
+        if not cluster_object.metadata.uid:
+            return None
+        return [client.V1OwnerReference(
+            api_version=cluster_object.api_version,
+            kind=cluster_object.kind,
+            name=cluster_object.metadata.name,
+            uid=cluster_object.metadata.uid,
+            controller=True,
+            block_owner_deletion=True,
+        )]
+
+    @staticmethod
+    def getClusterKey(obj: any) -> Optional[Tuple[str, str]]:
+        """
+        Gets the key of the cluster that owns the given object, based on its default labels.
+        :param obj: The Kubernetes model object, e.g. a pod or stateful set.
+        :return: The cluster key, format: (namespace, cluster_name), or None if the object is not labelled.
+        """
+        cluster_name = (obj.metadata.labels or {}).get("name")
+        return (obj.metadata.namespace, cluster_name) if cluster_name else None
+
+    @classmethod
+    def getSecretClusterKey(cls, secret: client.V1Secret) -> Optional[Tuple[str, str]]:
+        """
+        Gets the key of the cluster that owns the given admin secret.
+        The admin secrets are labelled with their own name, so the secret suffix is removed from it.
+        :param secret: The secret model object.
+        :return: The cluster key, format: (namespace, cluster_name), or None if the secret is not labelled.
+        """
+        key = cls.getClusterKey(secret)
+        return key and (key[0], key[1].replace(cls.ADMIN_SECRET_NAME_FORMAT.format(""), ""))
+
     @classmethod
     def createService(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
+        """
+        Creates a service model object.
+        The object is rendered once per cluster generation, so it must not be modified.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The service object.
+        """
+        return cls._render("Service", cluster_object, cls._renderService)
+
+    @classmethod
+    def _renderService(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
         """
         Creates a service model object.
         :param cluster_object: The cluster object from the YAML file.
@@ -98,11 +173,12 @@ class KubernetesResources:
         name = cluster_object.metadata.name
 
         # Create service.
-        return client.V1Service(
+        return cls.stampSpecHash(client.V1Service(
             metadata=client.V1ObjectMeta(
                 name=name,
                 namespace=cluster_object.metadata.namespace,
                 labels=cls.createDefaultLabels(name),
+                owner_references=cls.createOwnerReferences(cluster_object),
             ),
             spec=client.V1ServiceSpec(
                 type="ClusterIP",
@@ -114,10 +190,20 @@ class KubernetesResources:
                     target_port=cls.MONGO_PORT
                 )],
             ),
-        )
+        ))
 
     @classmethod
     def createHeadlessService(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
+        """
+        Creates a headless service model object.
+        The object is rendered once per cluster generation, so it must not be modified.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The service object.
+        """
+        return cls._render("HeadlessService", cluster_object, cls._renderHeadlessService)
+
+    @classmethod
+    def _renderHeadlessService(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
         """
         Creates a headless service model object.
         :param cluster_object: The cluster object from the YAML file.
@@ -127,12 +213,13 @@ class KubernetesResources:
         name = "svc-" + cluster_object.metadata.name + "-internal"
 
         # Create service.
-        return client.V1Service(
+        return cls.stampSpecHash(client.V1Service(
             metadata=client.V1ObjectMeta(
                 annotations={"service.alpha.kubernetes.io/tolerate-unready-endpoints": "true"},
                 name=name,
                 namespace=cluster_object.metadata.namespace,
                 labels=cls.createDefaultLabels(cluster_object.metadata.name),
+                owner_references=cls.createOwnerReferences(cluster_object),
             ),
             spec=client.V1ServiceSpec(
                 cluster_ip="None",  # create headless service, no load-balancing and a single service IP
@@ -143,10 +230,20 @@ class KubernetesResources:
                     protocol="TCP"
                 )],
             ),
-        )
+        ))
 
     @classmethod
     def createStatefulSet(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1beta1StatefulSet:
+        """
+        Creates the stateful set configuration for the given cluster.
+        The object is rendered once per cluster generation, so it must not be modified.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The stateful set object.
+        """
+        return cls._render("StatefulSet", cluster_object, cls._renderStatefulSet)
+
+    @classmethod
+    def _renderStatefulSet(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1beta1StatefulSet:
         """
         Creates a the stateful set configuration for the given cluster.
         :param cluster_object: The cluster object from the YAML file.
@@ -293,13 +390,15 @@ class KubernetesResources:
         )]
 
         # Create stateful set.
-        return client.V1beta1StatefulSet(
+        return cls.stampSpecHash(client.V1beta1StatefulSet(
             metadata = client.V1ObjectMeta(annotations={"service.alpha.kubernetes.io/tolerate-unready-endpoints": "true"},
                                            name=name,
                                            namespace=namespace,
-                                           labels=cls.createDefaultLabels(name)),
+                                           labels=cls.createDefaultLabels(name),
+                                           owner_references=cls.createOwnerReferences(cluster_object)),
             spec = client.V1beta1StatefulSetSpec(
                 replicas = replicas,
+                selector = client.V1LabelSelector(match_labels=cls.createDefaultLabels(name)),
                 service_name = "svc-" + name + "-internal",
                 template = client.V1PodTemplateSpec(
                     metadata = client.V1ObjectMeta(labels=cls.createDefaultLabels(name)),
@@ -312,7 +411,333 @@ class KubernetesResources:
                     )
                 ),
             ),
-        )
+        ))
+
+    @classmethod
+    def createServiceBody(cls, cluster_object: V1MongoClusterConfiguration) -> Union[client.V1Service, Manifest]:
+        """
+        Creates the service body that is sent to the API, as plain manifest if `Settings.PLAIN_MANIFESTS` is enabled.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The service model object or manifest.
+        """
+        if Settings.PLAIN_MANIFESTS:
+            return cls._render("ServiceManifest", cluster_object, cls._renderServiceManifest)
+        return cls.createService(cluster_object)
+
+    @classmethod
+    def createHeadlessServiceBody(cls, cluster_object: V1MongoClusterConfiguration
+                                  ) -> Union[client.V1Service, Manifest]:
+        """
+        Creates the headless service body that is sent to the API, as plain manifest if `Settings.PLAIN_MANIFESTS` is
+        enabled.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The service model object or manifest.
+        """
+        if Settings.PLAIN_MANIFESTS:
+            return cls._render("HeadlessServiceManifest", cluster_object, cls._renderHeadlessServiceManifest)
+        return cls.createHeadlessService(cluster_object)
+
+    @classmethod
+    def createStatefulSetBody(cls, cluster_object: V1MongoClusterConfiguration
+                              ) -> Union[client.V1beta1StatefulSet, Manifest]:
+        """
+        Creates the stateful set body that is sent to the API, as plain manifest if `Settings.PLAIN_MANIFESTS` is
+        enabled.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The stateful set model object or manifest.
+        """
+        if Settings.PLAIN_MANIFESTS:
+            return cls._render("StatefulSetManifest", cluster_object, cls._renderStatefulSetManifest)
+        return cls.createStatefulSet(cluster_object)
+
+    @classmethod
+    def createSecretBody(cls, secret_name: str, namespace: str, secret_data: Dict[str, str],
+                         labels: Optional[Dict[str, str]] = None,
+                         owner_references: Optional[List[client.V1OwnerReference]] = None
+                         ) -> Union[client.V1Secret, Manifest]:
+        """
+        Creates the secret body that is sent to the API, as plain manifest if `Settings.PLAIN_MANIFESTS` is enabled.
+        :param secret_name: The name of the secret.
+        :param namespace: The name space for the secret.
+        :param secret_data: The secret data.
+        :param labels: Optional labels for this secret, defaults to the default labels (see `cls.createDefaultLabels`).
+        :param owner_references: Optional owners of this secret, see `cls.createOwnerReferences`.
+        :return: The secret model object or manifest.
+        """
+        if not Settings.PLAIN_MANIFESTS:
+            return cls.createSecret(secret_name, namespace, secret_data, labels, owner_references)
+        metadata = {
+            "name": secret_name,
+            "namespace": namespace,
+            "labels": cls.createDefaultLabels(secret_name) if labels is None else labels,
+        }
+        if owner_references:
+            metadata["ownerReferences"] = cls.serialize(owner_references)
+        return cls._stampManifestHash({"metadata": metadata, "stringData": secret_data})
+
+    @staticmethod
+    def withType(body: RenderedType, api_version: str, kind: str) -> RenderedType:
+        """
+        Sets the API version and kind of the given body. The rendered bodies are shared, so a copy is changed.
+        :param body: The model object or manifest.
+        :param api_version: The API version, e.g. "apps/v1beta1".
+        :param kind: The kind, e.g. "StatefulSet".
+        :return: A shallow copy of the body, with the given API version and kind.
+        """
+        if isinstance(body, dict):
+            return dict(body, apiVersion=api_version, kind=kind)
+        body = copy(body)
+        body.api_version, body.kind = api_version, kind
+        return body
+
+    @classmethod
+    def _createOwnerReferencesManifest(cls, cluster_object: V1MongoClusterConfiguration,
+                                       metadata: Manifest) -> Manifest:
+        """
+        Adds the owner references that point at the given cluster to the given metadata manifest.
+        :param cluster_object: The cluster object from the YAML file.
+        :param metadata: The metadata manifest.
+        :return: The same metadata manifest.
+        """
+        if cluster_object.metadata.uid:
+            metadata["ownerReferences"] = [{
+                "apiVersion": cluster_object.api_version,
+                "kind": cluster_object.kind,
+                "name": cluster_object.metadata.name,
+                "uid": cluster_object.metadata.uid,
+                "controller": True,
+                "blockOwnerDeletion": True,
+            }]
+        return metadata
+
+    @classmethod
+    def _renderServiceManifest(cls, cluster_object: V1MongoClusterConfiguration) -> Manifest:
+        """
+        Creates the plain manifest of the service, equal to the serialized result of `cls.createService`.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The service manifest.
+        """
+        name = cluster_object.metadata.name
+        return cls._stampManifestHash({
+            "metadata": cls._createOwnerReferencesManifest(cluster_object, {
+                "name": name,
+                "namespace": cluster_object.metadata.namespace,
+                "labels": cls.createDefaultLabels(name),
+            }),
+            "spec": {
+                "type": "ClusterIP",
+                "selector": cls.createDefaultLabels(name),
+                "ports": [{"name": "mongod", "port": cls.MONGO_PORT, "protocol": "TCP", "targetPort": cls.MONGO_PORT}],
+            },
+        })
+
+    @classmethod
+    def _renderHeadlessServiceManifest(cls, cluster_object: V1MongoClusterConfiguration) -> Manifest:
+        """
+        Creates the plain manifest of the headless service, equal to the serialized result of
+        `cls.createHeadlessService`.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The service manifest.
+        """
+        return cls._stampManifestHash({
+            "metadata": cls._createOwnerReferencesManifest(cluster_object, {
+                "annotations": {"service.alpha.kubernetes.io/tolerate-unready-endpoints": "true"},
+                "name": "svc-" + cluster_object.metadata.name + "-internal",
+                "namespace": cluster_object.metadata.namespace,
+                "labels": cls.createDefaultLabels(cluster_object.metadata.name),
+            }),
+            "spec": {
+                "clusterIP": "None",
+                "selector": cls.createDefaultLabels(cluster_object.metadata.name),
+                "ports": [{"name": "mongod", "port": cls.MONGO_PORT, "protocol": "TCP"}],
+            },
+        })
+
+    @classmethod
+    def _renderStatefulSetManifest(cls, cluster_object: V1MongoClusterConfiguration) -> Manifest:
+        """
+        Creates the plain manifest of the stateful set, equal to the serialized result of `cls.createStatefulSet`.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The stateful set manifest.
+        """
+        name = cluster_object.metadata.name
+        mongodb = cluster_object.spec.mongodb
+        secret_name = cls.ADMIN_SECRET_NAME_FORMAT.format(name)
+        cpu_limit = mongodb.cpu_limit or cls.DEFAULT_CPU_LIMIT
+        memory_limit = mongodb.memory_limit or cls.DEFAULT_MEMORY_LIMIT
+
+        def secretEnvVar(env_name: str, key: str) -> Manifest:
+            return {"name": env_name, "valueFrom": {"secretKeyRef": {"key": key, "name": secret_name}}}
+
+        mongo_container = {
+            "name": name,
+            "env": [
+                {"name": "POD_IP", "valueFrom": {"fieldRef": {"apiVersion": "v1", "fieldPath": "status.podIP"}}},
+                secretEnvVar("MONGODB_PASSWORD", "database-password"),
+                secretEnvVar("MONGODB_USER", "database-user"),
+                secretEnvVar("MONGODB_DATABASE", "database-name"),
+                secretEnvVar("MONGODB_ADMIN_PASSWORD", "database-admin-password"),
+                {"name": "WIREDTIGER_CACHE_SIZE", "value": mongodb.wired_tiger_cache_size or cls.DEFAULT_CACHE_SIZE},
+                {"name": "MONGODB_REPLICA_NAME", "value": name},
+                {"name": "MONGODB_SERVICE_NAME", "value": "svc-" + name + "-internal"},
+                {"name": "MONGODB_KEYFILE_VALUE", "value": "supersecretkeyfile123"},
+            ],
+            "livenessProbe": {
+                "failureThreshold": 3,
+                "initialDelaySeconds": 30,
+                "periodSeconds": 30,
+                "successThreshold": 1,
+                "tcpSocket": {"port": cls.MONGO_PORT},
+                "timeoutSeconds": 1,
+            },
+            "command": cls.MONGO_COMMAND.split(),
+            "image": cls.MONGO_IMAGE,
+            "imagePullPolicy": "Always",
+            "ports": [{"name": "mongodb", "containerPort": cls.MONGO_PORT, "protocol": "TCP"}],
+            "readinessProbe": {
+                "exec": {"command": ["/bin/sh", "-i", "-c", "mongo 127.0.0.1:27017/$MONGODB_DATABASE -u $MONGODB_USER "
+                                                            '-p $MONGODB_PASSWORD --eval="quit()"']},
+                "failureThreshold": 3,
+                "initialDelaySeconds": 10,
+                "periodSeconds": 10,
+                "successThreshold": 1,
+                "timeoutSeconds": 1,
+            },
+            "securityContext": {
+                "runAsUser": int(mongodb.run_as_user or cls.DEFAULT_RUN_AS_USER),
+                "seLinuxOptions": {"level": "s0", "type": "spc_t"},
+            },
+            "terminationMessagePath": "/dev/termination-log",
+            "volumeMounts": [{
+                "name": "mongo-data",
+                "readOnly": False,
+                "mountPath": mongodb.host_path or cls.DEFAULT_STORAGE_MOUNT_PATH,
+            }],
+            "resources": {
+                "limits": {"cpu": cpu_limit, "memory": memory_limit},
+                "requests": {"cpu": cpu_limit, "memory": memory_limit},
+            },
+        }
+
+        affinity = {"podAntiAffinity": {"requiredDuringSchedulingIgnoredDuringExecution": [{
+            "labelSelector": {"matchExpressions": [{"key": "app", "operator": "In", "values": [name]}]},
+            "topologyKey": "kubernetes.io/hostname",
+        }]}}
+
+        return cls._stampManifestHash({
+            "metadata": cls._createOwnerReferencesManifest(cluster_object, {
+                "annotations": {"service.alpha.kubernetes.io/tolerate-unready-endpoints": "true"},
+                "name": name,
+                "namespace": cluster_object.metadata.namespace,
+                "labels": cls.createDefaultLabels(name),
+            }),
+            "spec": {
+                "replicas": mongodb.replicas,
+                "selector": {"matchLabels": cls.createDefaultLabels(name)},
+                "serviceName": "svc-" + name + "-internal",
+                "template": {
+                    "metadata": {"labels": cls.createDefaultLabels(name)},
+                    "spec": {
+                        "affinity": affinity,
+                        "containers": [mongo_container],
+                        "nodeSelector": {"compute": "mongodb"},
+                        "serviceAccount": mongodb.service_account or cls.DEFAULT_SERVICE_ACCOUNT,
+                        "volumes": [{"name": "mongo-data", "hostPath": {"path": mongodb.host_path}}],
+                    },
+                },
+            },
+        })
+
+    @classmethod
+    def _render(cls, kind: str, cluster_object: V1MongoClusterConfiguration,
+                render_func: Callable[[V1MongoClusterConfiguration], RenderedType]) -> RenderedType:
+        """
+        Renders an object for the given cluster, reusing the object rendered earlier for the same cluster generation.
+        Objects of clusters without a UID or generation, e.g. because they were never stored, are not cached.
+        :param kind: The kind of object, used in the cache key.
+        :param cluster_object: The cluster object from the YAML file.
+        :param render_func: The function that renders the object.
+        :return: The rendered object, including its spec hash.
+        """
+        uid, generation = cluster_object.metadata.uid, cluster_object.metadata.generation
+        if not uid or generation is None:
+            return render_func(cluster_object)
+        return cls.render_cache.getOrRender((kind, uid, generation), lambda: render_func(cluster_object))
+
+    @classmethod
+    def stampSpecHash(cls, body: any) -> any:
+        """
+        Adds an annotation with the hash of the given object, so we can later tell whether it is up to date.
+        :param body: The Kubernetes model object.
+        :return: The same object, with the spec hash annotation.
+        """
+        annotations = {key: value for key, value in (body.metadata.annotations or {}).items()
+                       if key != cls.SPEC_HASH_ANNOTATION}
+        body.metadata.annotations = annotations or None
+        spec_hash = cls.calculateSpecHash(body)
+        body.metadata.annotations = dict(annotations, **{cls.SPEC_HASH_ANNOTATION: spec_hash})
+        return body
+
+    @classmethod
+    def _stampManifestHash(cls, manifest: Manifest) -> Manifest:
+        """
+        Adds an annotation with the hash of the given manifest. The hash is the same as the hash of the equal model.
+        :param manifest: The plain manifest.
+        :return: The same manifest, with the spec hash annotation.
+        """
+        metadata = manifest["metadata"]
+        annotations = {key: value for key, value in metadata.pop("annotations", {}).items()
+                       if key != cls.SPEC_HASH_ANNOTATION}
+        if annotations:
+            metadata["annotations"] = annotations
+        spec_hash = cls.calculateSpecHash(manifest)
+        metadata["annotations"] = dict(annotations, **{cls.SPEC_HASH_ANNOTATION: spec_hash})
+        return manifest
+
+    @classmethod
+    def calculateSpecHash(cls, body: any) -> str:
+        """
+        Calculates a hash of the given object, which is the same for every object with the same contents.
+        The annotations can be read by anyone who can list the objects, so objects with secret data are hashed with
+        a keyed HMAC. Otherwise, the secret values could be guessed by hashing candidates.
+        :param body: The Kubernetes model object or plain manifest.
+        :return: The hash as hexadecimal string.
+        """
+        manifest = body if isinstance(body, dict) else cls.serialize(body)
+        serialized = json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode()
+        if any(field in manifest for field in cls.SECRET_DATA_FIELDS):
+            return hmac.new(cls.SPEC_HASH_KEY, serialized, hashlib.sha256).hexdigest()
+        return hashlib.sha1(serialized).hexdigest()
+
+    @classmethod
+    def getSpecHash(cls, obj: any) -> Optional[str]:
+        """
+        Gets the spec hash that was stamped on the given object.
+        :param obj: The Kubernetes model object or plain manifest.
+        :return: The hash, or None if the object has no spec hash annotation.
+        """
+        if isinstance(obj, dict):
+            return (obj.get("metadata", {}).get("annotations") or {}).get(cls.SPEC_HASH_ANNOTATION)
+        return (obj.metadata.annotations or {}).get(cls.SPEC_HASH_ANNOTATION)
+
+    @classmethod
+    def serialize(cls, obj: any) -> any:
+        """
+        Converts the given Kubernetes model into the dictionary sent to the API, like
+        `kubernetes.client.ApiClient.sanitize_for_serialization` does, without needing an API client.
+        :param obj: The model object, or a list, dictionary or primitive value.
+        :return: The serialized value.
+        """
+        if obj is None or isinstance(obj, (str, int, float, bool, bytes)):
+            return obj
+        if isinstance(obj, (list, tuple)):
+            return [cls.serialize(item) for item in obj]
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        if isinstance(obj, dict):
+            return {key: cls.serialize(value) for key, value in obj.items()}
+        return {obj.attribute_map[attr]: cls.serialize(getattr(obj, attr))
+                for attr in obj.swagger_types if getattr(obj, attr) is not None}
 
     @classmethod
     def createLabelSelector(cls, labels: Dict[str, str]) -> str:
@@ -324,21 +749,113 @@ class KubernetesResources:
         return ",".join("{}={}".format(k, v) for k, v in labels.items() if v)
 
     @classmethod
-    def deserialize(cls, data: dict, model_name: str) -> any:
+    def deserialize(cls, data: any, model_name: str) -> any:
         """
         Deserializes the dictionary into a kubernetes model.
         :param data: The data dictionary.
-        :param model_name: The name of the model.
+        :param model_name: The name of the model, or a swagger type such as "list[V1Container]".
         :return: An instance of the model with the given name.
         """
-        model_class = getattr(k8s_models, model_name, None)
-        if not model_class or not isinstance(data, dict):
-            return data
-        kwargs = {}
-        if model_class.swagger_types is not None:
-            for attr, attr_type in model_class.swagger_types.items():
-                if model_class.attribute_map.get(attr):
-                    value = data.get(model_class.attribute_map[attr])
-                    kwargs[attr] = cls.deserialize(value, attr_type)
-
-        return model_class(**kwargs)
+        return cls._getDeserializer(model_name)(data)
+
+    @classmethod
+    def _getDeserializer(cls, type_name: str) -> Deserializer:
+        """
+        Gets the deserializer of the given swagger type, compiling it on first use.
+        :param type_name: The swagger type, e.g. "V1Container", "list[V1Container]" or "dict(str, str)".
+        :return: The function that deserializes data of that type.
+        """
+        deserializer = cls._deserializers.get(type_name)
+        if deserializer is None:
+            deserializer = cls._compileDeserializer(type_name)
+        return deserializer
+
+    @classmethod
+    def _compileDeserializer(cls, type_name: str) -> Deserializer:
+        """
+        Compiles the deserializer of the given swagger type and stores it in the cache.
+        Values that do not match the type, e.g. a string where a model is expected, are returned unchanged.
+        :param type_name: The swagger type.
+        :return: The function that deserializes data of that type.
+        """
+        if type_name.startswith("list[") and type_name.endswith("]"):
+            deserializer = cls._compileListDeserializer(type_name[5:-1])
+        elif type_name.startswith("dict(") and type_name.endswith(")"):
+            deserializer = cls._compileDictDeserializer(type_name[5:-1].split(",", 1)[1].strip())
+        else:
+            model_class = getattr(k8s_models, type_name, None)
+            if isinstance(model_class, type) and hasattr(model_class, "swagger_types"):
+                deserializer = cls._compileModelDeserializer(model_class)
+            else:
+                deserializer = cls._returnUnchanged
+        cls._deserializers[type_name] = deserializer
+        return deserializer
+
+    @classmethod
+    def _compileListDeserializer(cls, item_type: str) -> Deserializer:
+        """
+        Compiles the deserializer of a list.
+        :param item_type: The swagger type of the items.
+        :return: The function that deserializes the list.
+        """
+        deserialize_item = cls._getDeserializer(item_type)
+
+        def deserializeList(data: any) -> any:
+            if not isinstance(data, list):
+                return data
+            return [deserialize_item(item) for item in data]
+
+        return deserializeList
+
+    @classmethod
+    def _compileDictDeserializer(cls, value_type: str) -> Deserializer:
+        """
+        Compiles the deserializer of a dictionary.
+        :param value_type: The swagger type of the values.
+        :return: The function that deserializes the dictionary.
+        """
+        deserialize_value = cls._getDeserializer(value_type)
+
+        def deserializeDict(data: any) -> any:
+            if not isinstance(data, dict):
+                return data
+            return {key: deserialize_value(value) for key, value in data.items()}
+
+        return deserializeDict
+
+    @classmethod
+    def _compileModelDeserializer(cls, model_class: type) -> Deserializer:
+        """
+        Compiles the deserializer of a Kubernetes model.
+        :param model_class: The model class.
+        :return: The function that deserializes the model.
+        """
+        unchanged = cls._returnUnchanged
+        fields = None  # format: ((attribute_name, json_key, deserializer), ...)
+
+        def deserializeModel(data: any) -> any:
+            nonlocal fields
+            if not isinstance(data, dict):
+                return data
+            if fields is None:
+                # the fields are compiled on first use, as models may contain themselves
+                fields = tuple((attr, model_class.attribute_map[attr], cls._getDeserializer(attr_type))
+                               for attr, attr_type in (model_class.swagger_types or {}).items()
+                               if model_class.attribute_map.get(attr))
+            kwargs = {}
+            for attr, key, deserialize_field in fields:
+                value = data.get(key)
+                # primitive and missing values are passed as they are, without calling a deserializer
+                kwargs[attr] = value if value is None or deserialize_field is unchanged else deserialize_field(value)
+            return model_class(**kwargs)
+
+        return deserializeModel
+
+    @staticmethod
+    def _returnUnchanged(data: any) -> any:
+        """
+        Deserializes primitive values such as strings and numbers, by returning them unchanged.
+        :param data: The value.
+        :return: The same value.
+        """
+        return data
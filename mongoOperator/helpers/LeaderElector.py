@@ -0,0 +1,182 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from datetime import datetime, timezone
+from time import monotonic, sleep
+from typing import Callable, Optional, Tuple
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseSpec
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.services.KubernetesService import KubernetesService
+
+
+class LeaderElector:
+    """
+    Elects a single leader between the operator replicas by holding a Kubernetes Lease object.
+    The leader renews the lease every retry period. The other replicas take over once the lease has not been renewed
+    for the lease duration. Expiry is measured with our own clock, from the moment we saw the lease change, so the
+    clocks of the replicas do not have to be in sync.
+    """
+
+    def __init__(self, kubernetes_service: KubernetesService, name: str, namespace: str, identity: str,
+                 lease_duration: float = 15.0, renew_deadline: float = 10.0, retry_period: float = 2.0) -> None:
+        """
+        :param kubernetes_service: The Kubernetes service.
+        :param name: The name of the lease object.
+        :param namespace: The namespace of the lease object.
+        :param identity: The unique identity of this replica, e.g. the pod name.
+        :param lease_duration: How many seconds the other replicas wait before taking over a lease that is not renewed.
+        :param renew_deadline: How many seconds the leader keeps trying to renew the lease before it gives up.
+        :param retry_period: How many seconds we wait between attempts to acquire or renew the lease.
+        """
+        if renew_deadline >= lease_duration:
+            raise ValueError("The renew deadline ({}) must be shorter than the lease duration ({})"
+                             .format(renew_deadline, lease_duration))
+        self._kubernetes_service = kubernetes_service
+        self._name = name
+        self._namespace = namespace
+        self.identity = identity
+        self._lease_duration = lease_duration
+        self._renew_deadline = renew_deadline
+        self._retry_period = retry_period
+        self._observed_record: Optional[Tuple[str, datetime]] = None  # format: (holder_identity, renew_time)
+        self._observed_time = 0.0
+        self._is_leader = threading.Event()
+
+    @property
+    def is_leader(self) -> bool:
+        """
+        :return: Whether this replica currently holds the lease.
+        """
+        return self._is_leader.is_set()
+
+    def acquire(self) -> None:
+        """
+        Blocks until this replica holds the lease.
+        """
+        logging.info("Waiting to become the leader as %s.", self.identity)
+        while not self.tryAcquireOrRenew():
+            sleep(self._retry_period)
+        logging.info("Became the leader as %s.", self.identity)
+
+    def startRenewing(self, on_stopped_leading: Callable[[], None]) -> threading.Thread:
+        """
+        Keeps renewing the lease in a background thread until a renewal fails for longer than the renew deadline.
+        :param on_stopped_leading: Function called when the lease was lost. Work that requires the leadership must
+            be stopped immediately, as another replica will take over.
+        :return: The started thread.
+        """
+        thread = threading.Thread(target=self._renewForever, args=(on_stopped_leading,), name="leader-election",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def tryAcquireOrRenew(self) -> bool:
+        """
+        Tries to acquire the lease, or to renew it if we already hold it.
+        :return: Whether we hold the lease now.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            lease = self._kubernetes_service.getLease(self._name, self._namespace)
+        except ApiException as api_exception:
+            if api_exception.status != 404:
+                logging.warning("Could not read lease %s @ ns/%s: %s", self._name, self._namespace, api_exception)
+                return self._setLeader(False)
+            return self._setLeader(self._createLease(now))
+
+        spec = lease.spec or V1beta1LeaseSpec()
+        if self._isHeldByOther(spec):
+            return self._setLeader(False)
+        return self._setLeader(self._updateLease(lease, spec, now))
+
+    def _updateLease(self, lease: V1beta1Lease, spec: V1beta1LeaseSpec, now: datetime) -> bool:
+        """
+        Updates the existing lease with us as the holder, taking it over if another replica held it.
+        :param lease: The lease.
+        :param spec: The spec of the lease.
+        :param now: The current time.
+        :return: Whether the lease was updated.
+        """
+        if spec.holder_identity != self.identity:
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.holder_identity = self.identity
+        spec.renew_time = now
+        spec.lease_duration_seconds = int(self._lease_duration)
+        lease.spec = spec
+        try:
+            self._kubernetes_service.replaceLease(lease)
+        except ApiException as api_exception:
+            logging.info("Could not update lease %s @ ns/%s: %s", self._name, self._namespace, api_exception.reason)
+            return False
+        self._observed_record = (spec.holder_identity, spec.renew_time)
+        self._observed_time = monotonic()
+        return True
+
+    def _isHeldByOther(self, spec: V1beta1LeaseSpec) -> bool:
+        """
+        Checks whether the lease is held by another replica that renewed it recently.
+        The expiry is measured with our own clock, from the moment we first observed the current record, so it does
+        not depend on the clocks of the other replicas being in sync.
+        :param spec: The spec of the lease.
+        :return: Whether the lease is held by someone else and has not expired.
+        """
+        record = (spec.holder_identity, spec.renew_time)
+        if record != self._observed_record:
+            self._observed_record = record
+            self._observed_time = monotonic()
+        if not spec.holder_identity or spec.holder_identity == self.identity:
+            return False
+        return monotonic() < self._observed_time + (spec.lease_duration_seconds or self._lease_duration)
+
+    def _createLease(self, now: datetime) -> bool:
+        """
+        Creates the lease with us as the holder.
+        :param now: The current time.
+        :return: Whether the lease was created.
+        """
+        spec = V1beta1LeaseSpec(holder_identity=self.identity, acquire_time=now, renew_time=now,
+                                lease_duration_seconds=int(self._lease_duration), lease_transitions=0)
+        try:
+            lease: V1beta1Lease = self._kubernetes_service.createLease(self._name, self._namespace, spec)
+        except ApiException as api_exception:
+            logging.info("Could not create lease %s @ ns/%s: %s", self._name, self._namespace, api_exception.reason)
+            return False
+        self._observed_record = (lease.spec.holder_identity, lease.spec.renew_time)
+        self._observed_time = monotonic()
+        return True
+
+    def _renewForever(self, on_stopped_leading: Callable[[], None]) -> None:
+        """
+        Renews the lease every retry period, until the renew deadline passed without a successful renewal.
+        :param on_stopped_leading: Function called when the lease was lost.
+        """
+        last_renewal = monotonic()
+        while monotonic() < last_renewal + self._renew_deadline:
+            sleep(self._retry_period)
+            try:
+                renewed = self.tryAcquireOrRenew()
+            except Exception as err:
+                logging.exception("Could not renew lease %s @ ns/%s: %s", self._name, self._namespace, err)
+                renewed = False
+            if renewed:
+                last_renewal = monotonic()
+        self._setLeader(False)
+        logging.error("Lost the leadership of %s as %s.", self._name, self.identity)
+        on_stopped_leading()
+
+    def _setLeader(self, is_leader: bool) -> bool:
+        """
+        Stores whether we are the leader.
+        :param is_leader: Whether we hold the lease.
+        :return: The given value.
+        """
+        if is_leader:
+            self._is_leader.set()
+        else:
+            self._is_leader.clear()
+        return is_leader
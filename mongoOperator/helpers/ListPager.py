@@ -0,0 +1,63 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import Callable, Iterator, List, Optional, Tuple
+
+
+class ListPager:
+    """
+    Lists Kubernetes objects page by page, following the continue token of each page to request the next one.
+    Only one page is kept in memory at a time, so iterating over all objects uses the same amount of memory however
+    many objects there are.
+
+    Usage:
+        for secret in ListPager(core_api.list_secret_for_all_namespaces, page_size=500, label_selector=selector):
+            ...
+    """
+
+    def __init__(self, list_func: Callable, *args, page_size: Optional[int] = None, **kwargs) -> None:
+        """
+        :param list_func: The Kubernetes API list function, accepting the `limit` and `_continue` keyword arguments.
+        :param args: The positional arguments for the list function.
+        :param page_size: The amount of objects to request per page, or None to list in one request.
+        :param kwargs: The keyword arguments for the list function, e.g. the label selector.
+        """
+        self._list_func = list_func
+        self._args = args
+        self._page_size = page_size
+        self._kwargs = kwargs
+
+    def __iter__(self) -> Iterator[any]:
+        """
+        Requests the pages one at a time, as the objects are consumed.
+        :return: A generator of all listed objects.
+        """
+        for items, _ in self.pages():
+            yield from items
+
+    def pages(self) -> Iterator[Tuple[List[any], str]]:
+        """
+        Requests the pages one at a time, as they are consumed.
+        :return: A generator of tuples with the objects in the page and the resource version of the list.
+        """
+        kwargs = dict(self._kwargs)
+        if self._page_size:
+            kwargs["limit"] = self._page_size
+        while True:
+            items, resource_version, continue_token = self.parseList(self._list_func(*self._args, **kwargs))
+            yield items, resource_version
+            if not continue_token:
+                return
+            kwargs["_continue"] = continue_token
+
+    @staticmethod
+    def parseList(result: any) -> Tuple[List[any], str, Optional[str]]:
+        """
+        Gets the items, resource version and continue token of a list response.
+        :param result: The list response, either a Kubernetes model or a dictionary for custom objects.
+        :return: A tuple with the items, the resource version and the token to get the next page, if any.
+        """
+        if isinstance(result, dict):
+            metadata = result.get("metadata") or {}
+            return result.get("items") or [], metadata.get("resourceVersion"), metadata.get("continue")
+        return result.items or [], result.metadata.resource_version, result.metadata._continue
@@ -0,0 +1,89 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterator
+
+from kubernetes.client import models as k8s_models
+
+
+class ObjectView(Mapping):
+    """
+    Read-only view of a decoded JSON object, giving the same attribute access as the Kubernetes client models, e.g.
+    `view.metadata.resource_version` reads `data["metadata"]["resourceVersion"]`.
+    Nothing is converted up front: nested objects are wrapped only when they are accessed, so reading a few fields
+    of a large response costs a fraction of deserializing it into models.
+    The view is also a mapping of the original JSON keys, so maps such as labels can be used as dictionaries. Fields
+    named like a mapping method, e.g. `items`, must be read by key.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, any]) -> None:
+        """
+        :param data: The decoded JSON object.
+        """
+        self._data = data
+
+    def __getattr__(self, name: str) -> any:
+        return self.wrap(self._data.get(self._getJsonKey(name)))
+
+    def __getitem__(self, key: str) -> any:
+        return self.wrap(self._data[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return "ObjectView({!r})".format(self._data)
+
+    def toDict(self) -> Dict[str, any]:
+        """
+        :return: The decoded JSON object behind this view.
+        """
+        return self._data
+
+    @classmethod
+    def wrap(cls, value: any) -> any:
+        """
+        Wraps the objects in the given JSON value in views.
+        :param value: The decoded JSON value.
+        :return: A view for objects, a list with the wrapped values for lists, or the value itself.
+        """
+        if isinstance(value, dict):
+            return cls(value)
+        if isinstance(value, list):
+            return [cls.wrap(item) for item in value]
+        return value
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _getJsonKey(attribute: str) -> str:
+        """
+        Converts a model attribute name into its JSON key, e.g. `owner_references` into `ownerReferences`.
+        The attribute maps of the client models are used, so irregular keys such as `clusterIP` are also found.
+        :param attribute: The attribute name.
+        :return: The JSON key.
+        """
+        json_key = ObjectView._getAttributeMap().get(attribute)
+        if json_key:
+            return json_key
+        first, *others = attribute.lstrip("_").split("_")
+        return first + "".join(other.capitalize() for other in others)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _getAttributeMap() -> Dict[str, str]:
+        """
+        Merges the attribute maps of all Kubernetes client models.
+        :return: The JSON key of every model attribute, format: {attribute: json_key}.
+        """
+        attribute_map = {}
+        for model_class in vars(k8s_models).values():
+            if isinstance(model_class, type):
+                attribute_map.update(getattr(model_class, "attribute_map", None) or {})
+        return attribute_map
@@ -0,0 +1,102 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from functools import wraps
+from time import monotonic, sleep
+from typing import Callable, Dict
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that allows bursts of requests, refilled at a fixed rate.
+    Tokens are reserved in order, so every caller knows how long to wait and waits without holding the lock.
+    """
+
+    def __init__(self, qps: float, burst: int) -> None:
+        """
+        :param qps: The amount of tokens added per second. Zero or less disables the limit.
+        :param burst: The maximum amount of tokens in the bucket, i.e. how many requests may be done at once.
+        """
+        self._qps = qps
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._last_refill = monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token from the bucket.
+        :return: How many seconds the caller must wait before the token may be used.
+        """
+        if self._qps <= 0:
+            return 0.0
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._last_refill) * self._qps)
+            self._last_refill = now
+            self._tokens -= 1
+            return -self._tokens / self._qps if self._tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Limits the requests sent to the Kubernetes API, with separate token buckets for reads and writes, so a burst of
+    updates cannot starve the reads or the other way around. The time spent waiting for tokens is measured.
+
+    Usage:
+        api_client.call_api = rate_limiter.wrap(api_client.call_api)
+    """
+
+    # The HTTP methods that only read data.
+    READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+    def __init__(self, read_qps: float, read_burst: int, write_qps: float, write_burst: int) -> None:
+        """
+        :param read_qps: The amount of read requests per second.
+        :param read_burst: The amount of read requests that may be done at once.
+        :param write_qps: The amount of write requests per second.
+        :param write_burst: The amount of write requests that may be done at once.
+        """
+        self._buckets = {"read": TokenBucket(read_qps, read_burst), "write": TokenBucket(write_qps, write_burst)}
+        self._lock = threading.Lock()
+        self._stats = {budget: {"requests": 0, "throttled": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+                       for budget in self._buckets}
+
+    def acquire(self, method: str) -> float:
+        """
+        Blocks until a request with the given HTTP method may be sent.
+        :param method: The HTTP method, e.g. "GET" or "PATCH".
+        :return: How many seconds we waited.
+        """
+        budget = "read" if method.upper() in self.READ_METHODS else "write"
+        delay = self._buckets[budget].reserve()
+        with self._lock:
+            stats = self._stats[budget]
+            stats["requests"] += 1
+            if delay > 0:
+                stats["throttled"] += 1
+                stats["wait_seconds"] += delay
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], delay)
+        if delay > 0:
+            sleep(delay)
+        return delay
+
+    def wrap(self, call_api: Callable) -> Callable:
+        """
+        Wraps the `call_api` method of a Kubernetes API client, so every request waits for a token.
+        :param call_api: The method to wrap, called as `call_api(resource_path, method, ...)`.
+        :return: The wrapped method.
+        """
+        @wraps(call_api)
+        def limitedCallApi(resource_path: str, method: str, *args, **kwargs) -> any:
+            self.acquire(method)
+            return call_api(resource_path, method, *args, **kwargs)
+        return limitedCallApi
+
+    def getStats(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Per budget, the amount of requests, how many had to wait and the total and maximum waiting time.
+        """
+        with self._lock:
+            return {budget: dict(stats) for budget, stats in self._stats.items()}
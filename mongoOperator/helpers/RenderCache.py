@@ -0,0 +1,60 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+
+RenderedType = TypeVar("RenderedType")
+
+
+class RenderCache:
+    """
+    Thread-safe, size-bounded cache of rendered Kubernetes objects. When the cache is full, the least recently used
+    object is evicted.
+    The cached objects are shared between all callers, so they must not be modified.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        """
+        :param max_size: The maximum amount of objects in the cache.
+        """
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._objects: "OrderedDict[Hashable, any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def getOrRender(self, key: Hashable, render_func: Callable[[], RenderedType]) -> RenderedType:
+        """
+        Gets the object with the given key from the cache, rendering and storing it if it is not cached yet.
+        :param key: The cache key, e.g. (kind, cluster_uid, generation).
+        :param render_func: Function that renders the object.
+        :return: The rendered object.
+        """
+        with self._lock:
+            if key in self._objects:
+                self._objects.move_to_end(key)
+                self.hits += 1
+                return self._objects[key]
+            self.misses += 1
+
+        # rendering is done without holding the lock, a concurrent render of the same key gives the same result
+        obj = render_func()
+        with self._lock:
+            self._objects[key] = obj
+            self._objects.move_to_end(key)
+            while len(self._objects) > self._max_size:
+                self._objects.popitem(last=False)
+        return obj
+
+    def clear(self) -> None:
+        """
+        Removes all objects from the cache.
+        """
+        with self._lock:
+            self._objects.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._objects)
@@ -0,0 +1,160 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+ClusterKey = Tuple[str, str]  # format: (namespace, cluster_name)
+
+
+class ResourceCache:
+    """
+    Thread-safe in-memory store of Kubernetes objects, indexed by (namespace, name) and by their owning cluster.
+    Both Kubernetes model objects and plain dictionaries (as returned for custom objects) are supported.
+    """
+
+    def __init__(self, cluster_key_func: Callable[[any], Optional[ClusterKey]]) -> None:
+        """
+        :param cluster_key_func: Function that returns the key of the cluster that owns the given object.
+        """
+        self._cluster_key_func = cluster_key_func
+        self._lock = threading.RLock()
+        self._objects: Dict[Tuple[str, str], any] = {}  # format: {(namespace, name): object}
+        self._cluster_index: Dict[ClusterKey, Set[Tuple[str, str]]] = {}  # format: {cluster_key: {(namespace, name)}}
+        self._synced = threading.Event()
+
+    @staticmethod
+    def getObjectKey(obj: any) -> Tuple[str, str]:
+        """
+        Gets the namespace and name of the given object.
+        :param obj: The Kubernetes model object or dictionary.
+        :return: The object key, format: (namespace, name).
+        """
+        if isinstance(obj, dict):
+            metadata = obj.get("metadata") or {}
+            return metadata.get("namespace"), metadata.get("name")
+        return obj.metadata.namespace, obj.metadata.name
+
+    @staticmethod
+    def getResourceVersion(obj: any) -> Optional[str]:
+        """
+        Gets the resource version of the given object.
+        :param obj: The Kubernetes model object or dictionary.
+        :return: The resource version, or None if the object has none.
+        """
+        if isinstance(obj, dict):
+            return (obj.get("metadata") or {}).get("resourceVersion")
+        return obj.metadata.resource_version
+
+    @classmethod
+    def isOlder(cls, obj: any, other: any) -> bool:
+        """
+        Checks whether the given object is an older version than the other object.
+        Kubernetes does not promise resource versions are numbers, so they are only compared when both are integers.
+        :param obj: The Kubernetes model object or dictionary.
+        :param other: The Kubernetes model object or dictionary with the same key.
+        :return: Whether the object is known to be older, False if the versions cannot be compared.
+        """
+        try:
+            return int(cls.getResourceVersion(obj)) < int(cls.getResourceVersion(other))
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def synced(self) -> bool:
+        """
+        :return: Whether the cache was filled by a full list at least once.
+        """
+        return self._synced.is_set()
+
+    def waitForSync(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the cache was filled by a full list.
+        :param timeout: The maximum amount of seconds to wait, or None to wait forever.
+        :return: Whether the cache is synced.
+        """
+        return self._synced.wait(timeout)
+
+    def replace(self, objects: Iterable[any]) -> List[any]:
+        """
+        Replaces the full contents of the cache, e.g. after listing all objects.
+        :param objects: The objects that currently exist.
+        :return: The objects that were in the cache but are not in the new list, i.e. that have been deleted.
+        """
+        with self._lock:
+            previous = self._objects
+            self._objects = {}
+            self._cluster_index = {}
+            for obj in objects:
+                self._store(obj)
+            self._synced.set()
+            return [obj for key, obj in previous.items() if key not in self._objects]
+
+    def apply(self, event_type: str, obj: any) -> None:
+        """
+        Applies a watch event to the cache.
+        Both the watch and our own writes update the cache, so an object that is older than the cached one is ignored.
+        :param event_type: The type of the event, i.e. ADDED, MODIFIED or DELETED.
+        :param obj: The object in the event.
+        """
+        key = self.getObjectKey(obj)
+        with self._lock:
+            cached = self._objects.get(key)
+            if event_type != "DELETED" and cached is not None and self.isOlder(obj, cached):
+                return
+            self._remove(key)
+            if event_type != "DELETED":
+                self._store(obj)
+
+    def get(self, namespace: str, name: str) -> Optional[any]:
+        """
+        Gets a single object from the cache.
+        :param namespace: The namespace of the object.
+        :param name: The name of the object.
+        :return: The object, or None if it is not in the cache.
+        """
+        with self._lock:
+            return self._objects.get((namespace, name))
+
+    def list(self) -> List[any]:
+        """
+        :return: All objects in the cache.
+        """
+        with self._lock:
+            return list(self._objects.values())
+
+    def listByCluster(self, cluster_key: ClusterKey) -> List[any]:
+        """
+        Gets all objects owned by the given cluster.
+        :param cluster_key: The cluster key, format: (namespace, cluster_name).
+        :return: The objects owned by the cluster.
+        """
+        with self._lock:
+            return [self._objects[key] for key in self._cluster_index.get(cluster_key, ())]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._objects)
+
+    def _store(self, obj: any) -> None:
+        """
+        Adds the given object to the cache and its indexes. The lock must be held by the caller.
+        :param obj: The object to add.
+        """
+        key = self.getObjectKey(obj)
+        self._objects[key] = obj
+        cluster_key = self._cluster_key_func(obj)
+        if cluster_key:
+            self._cluster_index.setdefault(cluster_key, set()).add(key)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """
+        Removes the object with the given key from the cache and its indexes. The lock must be held by the caller.
+        :param key: The object key, format: (namespace, name).
+        """
+        obj = self._objects.pop(key, None)
+        cluster_key = obj is not None and self._cluster_key_func(obj)
+        if cluster_key and cluster_key in self._cluster_index:
+            self._cluster_index[cluster_key].discard(key)
+            if not self._cluster_index[cluster_key]:
+                del self._cluster_index[cluster_key]
@@ -4,9 +4,7 @@
 import glob
 import logging
 import os
-from subprocess import check_output, CalledProcessError
-
-from time import sleep
+from subprocess import check_output, CalledProcessError, SubprocessError
 
 from mongoOperator.helpers.MongoResources import MongoResources
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
@@ -20,8 +18,6 @@ class RestoreHelper:
     DEFAULT_BACKUP_PREFIX = "backups"
     BACKUP_FILE_FORMAT = "mongodb-backup-{namespace}-{name}-{date}.archive.gz"
     LATEST_BACKUP_KEY = "latest"
-    RESTORE_RETRIES = 4
-    RESTORE_WAIT = 15.0
 
     def __init__(self, kubernetes_service: KubernetesService) -> None:
         """
@@ -63,32 +59,31 @@ class RestoreHelper:
     def restore(self, cluster_object: V1MongoClusterConfiguration, backup_file: str) -> bool:
         """
         Attempts to restore the latest backup in the specified location to the given cluster.
-        Creates a new backup for the given cluster saving it in the NFS storage.
+        Failures are not retried here, the caller is expected to try again later.
         :param cluster_object: The cluster object from the YAML file.
         :param backup_file: The filename of the backup we want to restore.
+        :raise SubprocessError: If the restore failed.
         """
         hostnames = MongoResources.getMemberHostnames(cluster_object)
 
         logging.info("Restoring backup file %s to cluster %s @ ns/%s.", backup_file, cluster_object.metadata.name,
                      cluster_object.metadata.namespace)
 
-        # Wait for the replica set to become ready
-        for _ in range(self.RESTORE_RETRIES):
-            try:
-                logging.info("Running mongorestore --host %s --gzip --archive=%s", ",".join(hostnames), backup_file)
-                restore_output = check_output(["/opt/rh/rh-mongodb36/root/usr/bin/mongorestore", "--authenticationDatabase=admin", "-u", "admin",
-                                               "-p", cluster_object.spec.users.admin_password, "--host", ",".join(hostnames), "--gzip",
-                                               "--archive=" + backup_file])
-                logging.info("Restore output: %s", restore_output)
+        try:
+            logging.info("Running mongorestore --host %s --gzip --archive=%s", ",".join(hostnames), backup_file)
+            restore_output = check_output(["/opt/rh/rh-mongodb36/root/usr/bin/mongorestore",
+                                           "--authenticationDatabase=admin", "-u", "admin",
+                                           "-p", cluster_object.spec.users.admin_password,
+                                           "--host", ",".join(hostnames), "--gzip", "--archive=" + backup_file])
+        except CalledProcessError as err:
+            raise SubprocessError("Could not restore '{}' to '{}'. Return code: {}\n stderr: '{}'\n stdout: '{}'"
+                                  .format(backup_file, ",".join(hostnames), err.returncode, err.stderr, err.stdout))
+
+        logging.info("Restore output: %s", restore_output)
 
-                try:
-                    os.remove(backup_file)
-                except OSError as err:
-                    logging.error("Unable to remove '%s': %s", backup_file, err.strerror)
+        try:
+            os.remove(backup_file)
+        except OSError as err:
+            logging.error("Unable to remove '%s': %s", backup_file, err.strerror)
 
-                return True
-            except CalledProcessError as err:
-                logging.error("Could not restore '%s', attempt %d. Return code: %s stderr: '%s' stdout: '%s'",
-                              backup_file, _, err.returncode, err.stderr, err.stdout)
-                sleep(self.RESTORE_WAIT)
-        raise TimeoutError("Could not restore '{}' after {} retries!".format(backup_file, self.RESTORE_RETRIES))
+        return True
@@ -0,0 +1,135 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import logging
+from time import sleep
+from typing import Callable, Dict, Iterator, Optional
+
+from kubernetes.client.rest import ApiException
+from kubernetes.watch import Watch
+from kubernetes.watch.watch import iter_resp_lines
+from urllib3.exceptions import HTTPError
+
+
+class WatchExpiredError(Exception):
+    """
+    Raised when a watch cannot be resumed from its resource version, because it is too old (HTTP 410 Gone) or because
+    the stream failed in an unexpected way. The objects have to be listed again to get a new resource version.
+    """
+
+
+class ResumableWatch:
+    """
+    Watch stream that keeps track of the last resource version it has seen, and resumes from there whenever the
+    server closes the connection or a request fails, so no full relist is needed.
+    Bookmark events only advance the resource version and are not passed on.
+    """
+
+    # How many seconds the server keeps each watch request open before we resume it.
+    WATCH_TIMEOUT = 300
+
+    # How many seconds we wait before resuming after a failed request.
+    RETRY_WAIT = 5.0
+
+    # Deserializes the events into the model of the listed objects. It holds an API client with a thread pool, so
+    # a single instance is shared by all watches.
+    _decoder: Optional[Watch] = None
+
+    def __init__(self, list_func: Callable, *args, **kwargs) -> None:
+        """
+        :param list_func: The Kubernetes API list function, e.g. `CoreV1Api.list_namespaced_pod`.
+        :param args: The positional arguments for the list function.
+        :param kwargs: The keyword arguments for the list function, e.g. the label selector.
+        """
+        self._list_func = list_func
+        self._args = args
+        self._kwargs = kwargs
+        if ResumableWatch._decoder is None:
+            ResumableWatch._decoder = Watch()
+        self._return_type = self._decoder.get_return_type(list_func)
+        self.resource_version: Optional[str] = None
+
+    def stream(self, resource_version: Optional[str] = None) -> Iterator[Dict[str, any]]:
+        """
+        Streams the watch events forever.
+        Failed requests are resumed from the last seen resource version. Any other failure, e.g. an event that cannot
+        be decoded, would happen again on resuming, so it is raised as expired watch.
+        :param resource_version: The resource version to start from. If None, the server first sends an ADDED event
+            for every existing object.
+        :return: The watch events, see `kubernetes.watch.Watch.stream`.
+        :raise WatchExpiredError: If the watch cannot be resumed and the objects must be listed again.
+        """
+        self.resource_version = resource_version
+        while True:
+            try:
+                yield from self._streamOnce()
+            except WatchExpiredError:
+                raise
+            except (ApiException, HTTPError) as err:
+                self._waitAfterFailure(err)
+            except Exception as err:
+                self._waitAfterFailure(err)
+                raise WatchExpiredError("Cannot resume from version {}: {}".format(self.resource_version, err))
+
+    def _waitAfterFailure(self, err: Exception) -> None:
+        """
+        Logs the failure of the watch and waits before it is resumed or listed again.
+        :param err: The error.
+        """
+        logging.warning("Watch on %s failed at version %s, retrying in %s seconds: %s", self._list_func.__name__,
+                        self.resource_version, self.RETRY_WAIT, err)
+        sleep(self.RETRY_WAIT)
+
+    def _streamOnce(self) -> Iterator[Dict[str, any]]:
+        """
+        Streams the events of a single watch request, until the server closes it.
+        The lines of the response are read by us, so error events are recognized before they are deserialized into
+        the model of the watched objects, which a `Status` object does not fit.
+        :return: The watch events.
+        :raise WatchExpiredError: If the resource version expired.
+        :raise ApiException: If the request failed or the server sent any other error event.
+        """
+        response = self._request()
+        try:
+            for line in iter_resp_lines(response):
+                event = self._parseEvent(line)
+                if event["type"] != "BOOKMARK":
+                    yield event
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _request(self) -> any:
+        """
+        Starts a watch request from the last seen resource version.
+        :return: The streamed response.
+        :raise WatchExpiredError: If the resource version expired.
+        :raise ApiException: If the request failed.
+        """
+        kwargs = dict(self._kwargs, timeout_seconds=self.WATCH_TIMEOUT, watch=True, _preload_content=False)
+        if self.resource_version:
+            kwargs["resource_version"] = self.resource_version
+        try:
+            return self._list_func(*self._args, **kwargs)
+        except ApiException as api_exception:
+            if api_exception.status == 410:
+                raise WatchExpiredError(api_exception.reason)
+            raise
+
+    def _parseEvent(self, line: str) -> Dict[str, any]:
+        """
+        Parses a line of the watch response, keeping track of the resource version.
+        :param line: The JSON line.
+        :return: The event, see `kubernetes.watch.Watch.stream`.
+        :raise WatchExpiredError: If the event reports that the resource version expired.
+        :raise ApiException: If the event reports any other error.
+        """
+        raw_event = json.loads(line)
+        raw_object = raw_event.get("object") or {}
+        if raw_event.get("type") == "ERROR":
+            if raw_object.get("code") == 410:
+                raise WatchExpiredError(raw_object.get("message"))
+            raise ApiException(status=raw_object.get("code"), reason=raw_object.get("message"))
+        self.resource_version = (raw_object.get("metadata") or {}).get("resourceVersion") or self.resource_version
+        return self._decoder.unmarshal_event(line, self._return_type)
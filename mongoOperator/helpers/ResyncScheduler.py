@@ -0,0 +1,144 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+import random
+import threading
+from time import monotonic
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from mongoOperator.helpers.WorkQueue import WorkQueue
+
+
+class ResyncScheduler:
+    """
+    Periodically adds every known cluster to the work queue, so drift is corrected even when no events arrive.
+    Healthy clusters are resynced less often than degraded ones. When there are many clusters, the intervals are
+    stretched so the total amount of resyncs per minute never exceeds the configured budget, and random jitter spreads
+    the resyncs out evenly instead of letting them fire in bursts.
+    Every cluster has at most one resync pending; scheduling a cluster again replaces its previous resync.
+    """
+
+    # The fraction of the budget that degraded clusters may use at most.
+    DEGRADED_BUDGET_SHARE = 0.5
+
+    def __init__(self, work_queue: WorkQueue, interval: float, degraded_interval: float, budget_per_minute: float,
+                 jitter: float = 0.2) -> None:
+        """
+        :param work_queue: The queue to add the clusters to.
+        :param interval: The minimum amount of seconds between resyncs of a healthy cluster.
+        :param degraded_interval: The minimum amount of seconds between resyncs of a degraded cluster.
+        :param budget_per_minute: The maximum amount of resyncs per minute, over all clusters.
+        :param jitter: The fraction by which each interval is randomly shortened or lengthened.
+        """
+        self._work_queue = work_queue
+        self._interval = interval
+        self._degraded_interval = degraded_interval
+        self._budget_per_minute = budget_per_minute
+        self._jitter = jitter
+        self._condition = threading.Condition()
+        self._due_times: Dict[Hashable, float] = {}  # format: {key: due_time}
+        self._healthy: Dict[Hashable, bool] = {}  # format: {key: healthy}
+        self._schedule: List[Tuple[float, Hashable]] = []  # heap with format: (due_time, key)
+        self._stopped = False
+
+    def schedule(self, key: Hashable, healthy: bool) -> float:
+        """
+        Schedules the next resync of the given cluster, replacing any resync that was scheduled before.
+        :param key: The cluster key, e.g. a tuple (namespace, cluster_name).
+        :param healthy: Whether the cluster was healthy when it was last checked.
+        :return: The amount of seconds until the resync.
+        """
+        with self._condition:
+            self._healthy[key] = healthy
+            delay = self._getInterval(healthy) * random.uniform(1 - self._jitter, 1 + self._jitter)
+            self._push(key, monotonic() + delay)
+            return delay
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Stops resyncing the given cluster, e.g. because it was removed.
+        :param key: The cluster key.
+        """
+        with self._condition:
+            self._due_times.pop(key, None)
+            self._healthy.pop(key, None)
+
+    def run(self) -> None:
+        """
+        Adds the clusters to the work queue when their resync is due, until `stop` is called.
+        """
+        while True:
+            due = self._popDue()
+            if due is None:
+                return
+            for key in due:
+                logging.debug("Resyncing cluster %s.", key)
+                self._work_queue.add(key)
+
+    def stop(self) -> None:
+        """
+        Stops adding clusters to the work queue, making `run` return.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def getIntervals(self) -> Dict[str, float]:
+        """
+        :return: A dictionary with the current resync interval of healthy and degraded clusters.
+        """
+        with self._condition:
+            return {"healthy": self._getInterval(True), "degraded": self._getInterval(False)}
+
+    def _popDue(self) -> Optional[List[Hashable]]:
+        """
+        Waits until at least one resync is due.
+        :return: The keys of the clusters that are due, or None if the scheduler was stopped.
+        """
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                now = monotonic()
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    due_time, key = heapq.heappop(self._schedule)
+                    if self._due_times.get(key) == due_time:  # otherwise the entry was replaced or forgotten
+                        del self._due_times[key]
+                        due.append(key)
+                if due:
+                    return due
+                self._condition.wait(self._schedule[0][0] - now if self._schedule else None)
+
+    def _push(self, key: Hashable, due_time: float) -> None:
+        """
+        Stores the due time of the given key. The lock must be held by the caller.
+        :param key: The cluster key.
+        :param due_time: The monotonic time at which the resync is due.
+        """
+        self._due_times[key] = due_time
+        heapq.heappush(self._schedule, (due_time, key))
+        if len(self._schedule) > 2 * len(self._due_times) + 16:
+            # drop the entries that were replaced, so the heap does not keep growing
+            self._schedule = [(time, other_key) for other_key, time in self._due_times.items()]
+            heapq.heapify(self._schedule)
+        self._condition.notify()
+
+    def _getInterval(self, healthy: bool) -> float:
+        """
+        Calculates the resync interval, stretched so the amount of resyncs stays within the budget.
+        The lock must be held by the caller.
+        :param healthy: Whether to calculate the interval for healthy or for degraded clusters.
+        :return: The amount of seconds between resyncs.
+        """
+        degraded_count = sum(1 for is_healthy in self._healthy.values() if not is_healthy)
+        if healthy:
+            # the healthy clusters get what the degraded ones leave of the budget
+            degraded_rate = min(degraded_count * 60 / self._getInterval(False),
+                                self._budget_per_minute * self.DEGRADED_BUDGET_SHARE) if degraded_count else 0
+            healthy_count = len(self._healthy) - degraded_count
+            return max(self._interval, 60 * healthy_count / (self._budget_per_minute - degraded_rate))
+        degraded_budget = self._budget_per_minute * self.DEGRADED_BUDGET_SHARE
+        return max(self._degraded_interval, 60 * degraded_count / degraded_budget)
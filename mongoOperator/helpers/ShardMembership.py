@@ -0,0 +1,166 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from time import monotonic, sleep
+from typing import Callable, Dict, Set, Tuple
+
+from kubernetes.client import V1beta1LeaseSpec
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.ConsistentHashRing import ConsistentHashRing
+from mongoOperator.services.KubernetesService import KubernetesService
+
+
+class ShardMembership:
+    """
+    Splits the Mongo clusters between the operator replicas.
+    Every replica holds its own Lease object and renews it periodically. The replicas whose lease was renewed within
+    the lease duration are the members of a consistent hash ring, which decides which replica owns each cluster.
+    When a replica joins or leaves, only the clusters in its slices of the ring move to another replica.
+    Like the leader election, expiry is measured with our own clock from the moment we saw a lease change.
+    """
+
+    # The label that identifies the membership leases.
+    MEMBER_LABEL = "mongo-operator-shard"
+
+    # Leases that were not renewed for this many lease durations are deleted.
+    STALE_LEASE_FACTOR = 4
+
+    def __init__(self, kubernetes_service: KubernetesService, name: str, namespace: str, identity: str,
+                 lease_duration: float = 15.0, renew_period: float = 5.0, virtual_nodes: int = 100) -> None:
+        """
+        :param kubernetes_service: The Kubernetes service.
+        :param name: The name shared by all members, used as label value and as prefix of the lease names.
+        :param namespace: The namespace of the lease objects.
+        :param identity: The unique identity of this replica.
+        :param lease_duration: How many seconds a member stays in the ring after its last renewal.
+        :param renew_period: How many seconds we wait between renewals of our lease.
+        :param virtual_nodes: How many times each member is placed on the hash ring.
+        """
+        self._kubernetes_service = kubernetes_service
+        self._namespace = namespace
+        self._labels = {self.MEMBER_LABEL: name}
+        self._lease_name = "{}-{}".format(name, hashlib.sha1(identity.encode()).hexdigest()[:10])
+        self.identity = identity
+        self._lease_duration = lease_duration
+        self._renew_period = renew_period
+        self._virtual_nodes = virtual_nodes
+        self._observed: Dict[str, Tuple[datetime, float]] = {}  # format: {holder: (renew_time, observed_time)}
+        self._last_renewal = monotonic()
+        self.ring = ConsistentHashRing((identity,), virtual_nodes)
+
+    def isOwner(self, key: Tuple[str, str]) -> bool:
+        """
+        Checks whether this replica owns the given cluster.
+        :param key: The cluster key, format: (namespace, cluster_name).
+        :return: Whether we should reconcile and back up the cluster.
+        """
+        if monotonic() > self._last_renewal + self._lease_duration:
+            # our lease expired, so the other replicas have taken over our clusters
+            return False
+        return self.ring.getOwner(key) == self.identity
+
+    def start(self, on_members_changed: Callable[[], None]) -> threading.Thread:
+        """
+        Keeps renewing our lease and refreshing the members in a background thread.
+        :param on_members_changed: Function called after the members changed.
+        :return: The started thread.
+        """
+        thread = threading.Thread(target=self._refreshForever, args=(on_members_changed,), name="shard-membership",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self) -> bool:
+        """
+        Renews our lease and rebuilds the hash ring from the leases that are still alive.
+        :return: Whether the members changed.
+        """
+        self._renew()
+        return self._rebuildRing(self._listMembers())
+
+    def _listMembers(self) -> Set[str]:
+        """
+        Lists the replicas whose lease is still alive, and deletes the leases that were abandoned long ago.
+        :return: The identities of the members, including our own.
+        """
+        now = monotonic()
+        members = {self.identity}
+        for lease in self._kubernetes_service.listLeases(self._namespace, self._labels).items:
+            spec = lease.spec or V1beta1LeaseSpec()
+            if not spec.holder_identity:
+                continue
+            observed = self._observed.get(spec.holder_identity)
+            if not observed or observed[0] != spec.renew_time:
+                observed = self._observed[spec.holder_identity] = (spec.renew_time, now)
+            lease_duration = spec.lease_duration_seconds or self._lease_duration
+            if now < observed[1] + lease_duration:
+                members.add(spec.holder_identity)
+            elif now > observed[1] + self.STALE_LEASE_FACTOR * lease_duration:
+                # the replica is gone for a long time without cleaning up its lease, e.g. because it crashed
+                self._observed.pop(spec.holder_identity)
+                self._deleteLease(lease.metadata.name)
+        return members
+
+    def _rebuildRing(self, members: Set[str]) -> bool:
+        """
+        Rebuilds the hash ring if the members changed.
+        :param members: The identities of the members.
+        :return: Whether the members changed.
+        """
+        if members == self.ring.members:
+            return False
+        logging.info("Shard members changed from %s to %s.", sorted(self.ring.members), sorted(members))
+        self.ring = ConsistentHashRing(members, self._virtual_nodes)
+        return True
+
+    def leave(self) -> None:
+        """
+        Deletes our lease, so the other replicas take over our clusters without waiting for it to expire.
+        """
+        self._deleteLease(self._lease_name)
+
+    def _deleteLease(self, name: str) -> None:
+        """
+        Deletes the given membership lease, ignoring failures.
+        :param name: The name of the lease.
+        """
+        try:
+            self._kubernetes_service.deleteLease(name, self._namespace)
+        except ApiException as api_exception:
+            logging.warning("Could not delete lease %s @ ns/%s: %s", name, self._namespace, api_exception.reason)
+
+    def _renew(self) -> None:
+        """
+        Creates or renews our own lease.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            lease = self._kubernetes_service.getLease(self._lease_name, self._namespace)
+        except ApiException as api_exception:
+            if api_exception.status != 404:
+                raise
+            spec = V1beta1LeaseSpec(holder_identity=self.identity, acquire_time=now, renew_time=now,
+                                    lease_duration_seconds=int(self._lease_duration))
+            self._kubernetes_service.createLease(self._lease_name, self._namespace, spec, self._labels)
+        else:
+            lease.spec.renew_time = now
+            self._kubernetes_service.replaceLease(lease)
+        self._last_renewal = monotonic()
+
+    def _refreshForever(self, on_members_changed: Callable[[], None]) -> None:
+        """
+        Refreshes the members every renew period, forever.
+        :param on_members_changed: Function called after the members changed.
+        """
+        while True:
+            try:
+                if self.refresh():
+                    on_members_changed()
+            except Exception as err:
+                logging.exception("Could not refresh the shard members: %s", err)
+            sleep(self._renew_period)
@@ -0,0 +1,161 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import threading
+from time import monotonic
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+
+class WorkQueue:
+    """
+    Thread-safe FIFO queue of keys that coalesces duplicates.
+    A key that is already waiting in the queue is not added a second time. A key that is added while it is being
+    processed is marked dirty and handed out again once `done` is called for it, so the same key is never processed
+    by two consumers at the same time.
+    Keys can also be added with a delay, e.g. to retry a failed key later without blocking any thread meanwhile.
+
+    Usage:
+        queue.add(("namespace", "cluster"))
+        key = queue.get()
+        try:
+            process(key)
+        finally:
+            queue.done(key)
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._queue: List[Hashable] = []
+        self._dirty: Set[Hashable] = set()
+        self._processing: Set[Hashable] = set()
+        self._waiting: List[Tuple[float, int, Hashable]] = []  # heap with format: (ready_time, sequence, key)
+        self._sequence = itertools.count()
+        self._added = 0
+        self._deduplicated = 0
+        self._shut_down = False
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Adds the given key to the queue, unless it is already waiting to be processed.
+        :param key: The key to add, e.g. a tuple (namespace, cluster_name).
+        :return: True if the key was added, False if it was coalesced with a pending entry.
+        """
+        with self._condition:
+            self._added += 1
+            if not self._enqueue(key):
+                self._deduplicated += 1
+                return False
+            return True
+
+    def addAfter(self, key: Hashable, delay: float) -> None:
+        """
+        Adds the given key to the queue once the given delay has passed.
+        :param key: The key to add, e.g. a tuple (namespace, cluster_name).
+        :param delay: The amount of seconds to wait before the key is added.
+        """
+        if delay <= 0:
+            self.add(key)
+            return
+        with self._condition:
+            heapq.heappush(self._waiting, (monotonic() + delay, next(self._sequence), key))
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Hashable]:
+        """
+        Takes the next key from the queue, blocking until one is available.
+        :param timeout: The maximum amount of seconds to wait, or None to wait forever.
+        :return: The key, or None if the timeout expired or the queue was shut down.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._shut_down:
+                    return None
+                self._promoteWaiting()
+                if self._queue:
+                    break
+                now = monotonic()
+                if deadline is not None and deadline <= now:
+                    return None
+                wait_times = [deadline - now] if deadline is not None else []
+                if self._waiting:
+                    wait_times.append(self._waiting[0][0] - now)
+                self._condition.wait(min(wait_times) if wait_times else None)
+            key = self._queue.pop(0)
+            self._dirty.discard(key)
+            self._processing.add(key)
+            return key
+
+    def done(self, key: Hashable) -> None:
+        """
+        Marks the given key as processed. If it was added again in the meantime, it is queued once more.
+        :param key: The key that was returned by `get`.
+        """
+        with self._condition:
+            self._processing.discard(key)
+            if key in self._dirty:
+                self._queue.append(key)
+                self._condition.notify()
+
+    def shutDown(self) -> None:
+        """
+        Stops handing out keys, e.g. when the operator stops. The consumers waiting in `get` are woken up and every
+        call to `get` returns None from now on. The keys that are being processed can still be marked as done.
+        """
+        with self._condition:
+            self._shut_down = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        """
+        :return: The amount of keys waiting to be processed.
+        """
+        with self._condition:
+            return len(self._queue)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """
+        :return: The fraction of `add` calls that were coalesced with an entry that was already pending.
+        """
+        with self._condition:
+            return self._deduplicated / self._added if self._added else 0.0
+
+    def getStats(self) -> Dict[str, float]:
+        """
+        :return: A dictionary with the queue depth, amount of keys in progress and the deduplication counters.
+        """
+        with self._condition:
+            return {
+                "depth": len(self._queue),
+                "processing": len(self._processing),
+                "waiting": len(self._waiting),
+                "added": self._added,
+                "deduplicated": self._deduplicated,
+                "dedup_ratio": self._deduplicated / self._added if self._added else 0.0,
+            }
+
+    def _enqueue(self, key: Hashable) -> bool:
+        """
+        Adds the given key to the queue unless it is already pending. The lock must be held by the caller.
+        :param key: The key to add.
+        :return: True if the key was added, False if it was already pending.
+        """
+        if key in self._dirty:
+            return False
+        self._dirty.add(key)
+        if key not in self._processing:
+            self._queue.append(key)
+            self._condition.notify()
+        return True
+
+    def _promoteWaiting(self) -> None:
+        """
+        Moves the delayed keys whose delay has passed to the queue. The lock must be held by the caller.
+        """
+        now = monotonic()
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, key = heapq.heappop(self._waiting)
+            self._enqueue(key)
@@ -6,8 +6,10 @@ from os import urandom
 from base64 import b64encode
 
 from kubernetes.client import V1Secret, V1Status
-from typing import List, Dict
+from typing import Dict, Iterator, Optional
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.ResourceCache import ClusterKey
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
@@ -25,6 +27,10 @@ class AdminSecretChecker(BaseResourceChecker):
     def getClusterName(cls, resource_name: str) -> str:
         return resource_name.replace(cls.NAME_FORMAT.format(""), "")
 
+    @staticmethod
+    def getClusterKey(resource: V1Secret) -> Optional[ClusterKey]:
+        return KubernetesResources.getSecretClusterKey(resource)
+
     @classmethod
     def getSecretName(cls, cluster_name: str) -> str:
         """ Returns the correctly formatted name of the secret for this cluster."""
@@ -39,20 +45,40 @@ class AdminSecretChecker(BaseResourceChecker):
                 "database-name": cluster_object.spec.users.database_name
                 }
 
-    def listResources(self) -> List[V1Secret]:
-        return self.kubernetes_service.listAllSecretsWithLabels().items
+    def listResources(self) -> Iterator[V1Secret]:
+        return self.kubernetes_service.listAllSecretsWithLabels()
 
     def getResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
         name = self.getSecretName(cluster_object.metadata.name)
-        return self.kubernetes_service.getSecret(name, cluster_object.metadata.namespace)
+        return self.kubernetes_service.getSecretMetadata(name, cluster_object.metadata.namespace)
+
+    def buildResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
+        name = self.getSecretName(cluster_object.metadata.name)
+        owner_references = KubernetesResources.createOwnerReferences(cluster_object)
+        return KubernetesResources.createSecretBody(name, cluster_object.metadata.namespace,
+                                                    self._generateSecretData(cluster_object=cluster_object),
+                                                    owner_references=owner_references)
 
     def createResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
         name = self.getSecretName(cluster_object.metadata.name)
-        return self.kubernetes_service.createSecret(name, cluster_object.metadata.namespace, self._generateSecretData(cluster_object=cluster_object))
+        owner_references = KubernetesResources.createOwnerReferences(cluster_object)
+        return self.kubernetes_service.createSecret(name, cluster_object.metadata.namespace,
+                                                    self._generateSecretData(cluster_object=cluster_object),
+                                                    owner_references=owner_references)
 
     def updateResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
         name = self.getSecretName(cluster_object.metadata.name)
-        return self.kubernetes_service.updateSecret(name, cluster_object.metadata.namespace, self._generateSecretData(cluster_object=cluster_object))
+        owner_references = KubernetesResources.createOwnerReferences(cluster_object)
+        return self.kubernetes_service.updateSecret(name, cluster_object.metadata.namespace,
+                                                    self._generateSecretData(cluster_object=cluster_object),
+                                                    owner_references=owner_references)
+
+    def applyResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
+        name = self.getSecretName(cluster_object.metadata.name)
+        owner_references = KubernetesResources.createOwnerReferences(cluster_object)
+        return self.kubernetes_service.applySecret(name, cluster_object.metadata.namespace,
+                                                   self._generateSecretData(cluster_object=cluster_object),
+                                                   owner_references=owner_references)
 
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         secret_name = self.getSecretName(cluster_name)
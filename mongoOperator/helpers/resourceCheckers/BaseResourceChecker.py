@@ -1,14 +1,19 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
 from abc import abstractmethod
 
 from kubernetes.client import V1Status
 from kubernetes.client.rest import ApiException
-from typing import TypeVar, List
+from typing import TypeVar, Dict, Iterator, Optional, Set, Tuple
 
+from Settings import Settings
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.ResourceCache import ClusterKey
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.AsyncKubernetesService import AsyncKubernetesService
 from mongoOperator.services.KubernetesService import KubernetesService
 
 GenericType = TypeVar("GenericType")
@@ -19,6 +24,9 @@ class BaseResourceChecker:
     Base class for services that can check Kubernetes resources.
     """
 
+    # The class names of the checkers whose resources must exist before this checker may run.
+    DEPENDS_ON: Tuple[str, ...] = ()
+
     def __init__(self, kubernetes_service: KubernetesService):
         self.kubernetes_service = kubernetes_service
 
@@ -31,9 +39,20 @@ class BaseResourceChecker:
         """
         return resource_name
 
+    @staticmethod
+    def getClusterKey(resource: GenericType) -> Optional[ClusterKey]:
+        """
+        Gets the key of the cluster that owns the given resource. By default this is based on the resource labels.
+        :param resource: The resource.
+        :return: The cluster key, format: (namespace, cluster_name), or None if the resource is not labelled.
+        """
+        return KubernetesResources.getClusterKey(resource)
+
     def checkResource(self, cluster_object: V1MongoClusterConfiguration) -> GenericType:
         """
         Checks whether the resource is up-to-date in Kubernetes, creating or updating it if necessary.
+        The resource is only updated when the spec hash stamped on it differs from the hash of the desired resource.
+        With server-side apply enabled, the resource is created or updated in a single request.
         :param cluster_object: The cluster object from the YAML file.
         :return: An instance of the resource.
         """
@@ -43,8 +62,25 @@ class BaseResourceChecker:
             resource = None
             if api_exception.status != 404:
                 raise
+        return self._syncResource(cluster_object, resource)
+
+    def _syncResource(self, cluster_object: V1MongoClusterConfiguration,
+                      resource: Optional[GenericType]) -> GenericType:
+        """
+        Creates or updates the resource, unless its spec hash shows it is up to date.
+        :param cluster_object: The cluster object from the YAML file.
+        :param resource: The existing resource, or None if it does not exist.
+        :return: An instance of the resource.
+        """
+        if resource and self.isUpToDate(cluster_object, resource):
+            logging.debug("%s for %s @ ns/%s is up to date.", type(self).__name__, cluster_object.metadata.name,
+                          cluster_object.metadata.namespace)
+            return resource
 
-        if resource:
+        if Settings.SERVER_SIDE_APPLY:
+            # Creates or updates the resource in a single request.
+            resource = self.applyResource(cluster_object)
+        elif resource:
             # We update the resource to ensure it is up to date.
             resource = self.updateResource(cluster_object)
         else:
@@ -56,29 +92,68 @@ class BaseResourceChecker:
                      cluster_object.metadata.namespace, resource.metadata.resource_version)
         return resource
 
-    def cleanResources(self) -> None:
+    def isUpToDate(self, cluster_object: V1MongoClusterConfiguration, resource: GenericType) -> bool:
         """
-        Deletes any resources for which the original cluster cannot be found.
+        Compares the spec hash of the existing resource with the hash of the desired resource.
+        :param cluster_object: The cluster object from the YAML file.
+        :param resource: The existing resource.
+        :return: True if the resource does not need to be updated.
         """
-        for resource in self.listResources():
-            resource_name = resource.metadata.name
-            cluster_name = self.getClusterName(resource_name)
-            namespace = resource.metadata.namespace
-            try:
-                self.kubernetes_service.getMongoObject(cluster_name, namespace)
-                continue
-            except ApiException as api_exception:
-                if api_exception.status != 404:
-                    raise
+        desired = self.buildResource(cluster_object)
+        if desired is None:
+            return False
+        live_hash = KubernetesResources.getSpecHash(resource)
+        return live_hash is not None and live_hash == KubernetesResources.getSpecHash(desired)
 
-            # The service exists but the Mongo object it belonged to does not, we have to delete it.
-            #self.deleteResource(cluster_name, namespace)
+    def buildResource(self, cluster_object: V1MongoClusterConfiguration) -> Optional[GenericType]:
+        """
+        Renders the desired resource for the given cluster, with its spec hash annotation.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The desired resource, or None if this checker cannot compare resources, so they are always updated.
+        """
+        return None
+
+    async def cleanResources(self, cluster_keys: Set[ClusterKey],
+                             async_kubernetes_service: AsyncKubernetesService) -> None:
+        """
+        Deletes any resources for which the original cluster cannot be found.
+        The resources are joined in memory against the clusters that exist, and deleted in rate-limited batches. The
+        resources in a batch are deleted concurrently.
+        :param cluster_keys: The keys of all existing clusters, format: {(namespace, cluster_name)}.
+        :param async_kubernetes_service: The service that makes the requests without blocking the event loop.
+        """
+        orphans: Dict[ClusterKey, None] = {}  # an ordered set, format: {(namespace, cluster_name): None}
+        async for resource in async_kubernetes_service.iterate(self.listResources):
+            key = self.getClusterKey(resource)
+            if key and key not in cluster_keys:
+                orphans[key] = None
+
+        orphan_keys = list(orphans)
+        for index in range(0, len(orphan_keys), Settings.GC_BATCH_SIZE):
+            if index:
+                await asyncio.sleep(Settings.GC_BATCH_INTERVAL)
+            # The resources exist but the Mongo objects they belonged to do not, we have to delete them.
+            await asyncio.gather(*(async_kubernetes_service.run(self._deleteOrphan, cluster_name, namespace)
+                                   for namespace, cluster_name in orphan_keys[index:index + Settings.GC_BATCH_SIZE]))
+
+    def _deleteOrphan(self, cluster_name: str, namespace: str) -> None:
+        """
+        Deletes the resource of a removed cluster, logging any failure so the other resources are still cleaned.
+        :param cluster_name: The name of the cluster.
+        :param namespace: The cluster's namespace.
+        """
+        try:
+            self.deleteResource(cluster_name, namespace)
+        except ApiException as api_exception:
+            if api_exception.status != 404:
+                logging.warning("%s could not delete the resource of %s @ ns/%s: %s", type(self).__name__,
+                                cluster_name, namespace, api_exception.reason)
 
     @abstractmethod
-    def listResources(self) -> List[GenericType]:
+    def listResources(self) -> Iterator[GenericType]:
         """
-        Retrieves a list of resource objects.
-        :return: The list of available resources.
+        Retrieves all resource objects, page by page as they are consumed.
+        :return: A generator of the available resources.
         """
         raise NotImplementedError
 
@@ -110,6 +185,16 @@ class BaseResourceChecker:
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def applyResource(self, cluster_object: V1MongoClusterConfiguration) -> GenericType:
+        """
+        Creates or updates the resource with server-side apply.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: An instance of the resource.
+        :raise ApplyConflictError: If any of the fields is owned by another field manager.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         """
@@ -1,10 +1,11 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Iterator
 
 from kubernetes.client import V1Service, V1Status
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
@@ -15,17 +16,23 @@ class ServiceChecker(BaseResourceChecker):
     The inherited methods do not have documentation, see the parent class for more details.
     """
 
-    def listResources(self) -> List[V1Service]:
-        return self.kubernetes_service.listAllServicesWithLabels().items
+    def listResources(self) -> Iterator[V1Service]:
+        return self.kubernetes_service.listAllServicesWithLabels(metadata_only=True)
 
     def getResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
         return self.kubernetes_service.getService(cluster_object.metadata.name, cluster_object.metadata.namespace)
 
+    def buildResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
+        return KubernetesResources.createServiceBody(cluster_object)
+
     def createResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
         return self.kubernetes_service.createService(cluster_object)
 
     def updateResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
         return self.kubernetes_service.updateService(cluster_object)
 
+    def applyResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
+        return self.kubernetes_service.applyService(cluster_object)
+
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         return self.kubernetes_service.deleteService(cluster_name, namespace)
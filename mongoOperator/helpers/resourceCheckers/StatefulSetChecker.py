@@ -1,10 +1,11 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Iterator
 
 from kubernetes.client import V1StatefulSet, V1Status
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
@@ -15,17 +16,26 @@ class StatefulSetChecker(BaseResourceChecker):
     The inherited methods do not have documentation, see the parent class for more details.
     """
 
-    def listResources(self) -> List[V1StatefulSet]:
-        return self.kubernetes_service.listAllStatefulSetsWithLabels().items
+    # The pods need the admin credentials and the headless service to start the replica set.
+    DEPENDS_ON = ("AdminSecretChecker", "HeadlessServiceChecker")
+
+    def listResources(self) -> Iterator[V1StatefulSet]:
+        return self.kubernetes_service.listAllStatefulSetsWithLabels(metadata_only=True)
 
     def getResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
         return self.kubernetes_service.getStatefulSet(cluster_object.metadata.name, cluster_object.metadata.namespace)
 
+    def buildResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
+        return KubernetesResources.createStatefulSetBody(cluster_object)
+
     def createResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
         return self.kubernetes_service.createStatefulSet(cluster_object)
 
     def updateResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
         return self.kubernetes_service.updateStatefulSet(cluster_object)
 
+    def applyResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
+        return self.kubernetes_service.applyStatefulSet(cluster_object)
+
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         return self.kubernetes_service.deleteStatefulSet(cluster_name, namespace)
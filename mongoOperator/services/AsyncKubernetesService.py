@@ -0,0 +1,72 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable
+
+from Settings import Settings
+from mongoOperator.services.KubernetesService import KubernetesService
+
+
+class AsyncKubernetesService:
+    """
+    Runs the Kubernetes requests of the garbage collection on the event loop.
+    The kubernetes client only makes blocking requests, so each request is made by a small pool of worker threads
+    while the event loop awaits it.
+
+    Usage:
+        async for cluster_dict in async_kubernetes_service.listMongoObjects():
+            ...
+        await async_kubernetes_service.run(kubernetes_service.deleteSecret, name, namespace)
+    """
+
+    def __init__(self, kubernetes_service: KubernetesService, concurrency: int = Settings.GC_BATCH_SIZE) -> None:
+        """
+        :param kubernetes_service: The service that makes the requests.
+        :param concurrency: The maximum amount of requests in flight at once, by default one garbage collection batch.
+        """
+        self.kubernetes_service = kubernetes_service
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="kubernetes-async")
+
+    async def run(self, func: Callable, *args, **kwargs) -> any:
+        """
+        Runs the given blocking function in the worker threads, without blocking the event loop.
+        :param func: The function to run, e.g. a method of the Kubernetes service.
+        :param args: The positional arguments for the function.
+        :param kwargs: The keyword arguments for the function.
+        :return: The result of the function.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def iterate(self, iterable_factory: Callable[[], Iterable[any]],
+                      page_size: int = KubernetesService.LIST_PAGE_SIZE) -> AsyncIterator[any]:
+        """
+        Iterates over a blocking iterable, e.g. the paged objects of a list method, without blocking the event loop.
+        The items are fetched in the worker threads one page at a time, as they are consumed.
+        :param iterable_factory: Function that creates the iterable. It is called in the worker threads.
+        :param page_size: The amount of items to fetch at once.
+        :return: An asynchronous generator of the items.
+        """
+        iterator = await self.run(lambda: iter(iterable_factory()))
+        while True:
+            items = await self.run(list, islice(iterator, page_size))
+            if not items:
+                return
+            for item in items:
+                yield item
+
+    def listMongoObjects(self) -> AsyncIterator[Dict[str, any]]:
+        """
+        Gets all Kubernetes objects of our custom resource type, requesting them page by page as they are consumed.
+        :return: An asynchronous generator of the objects, as dictionaries.
+        """
+        return self.iterate(self.kubernetes_service.listMongoObjects)
+
+    def close(self) -> None:
+        """
+        Stops the worker threads once the requests in flight have finished.
+        """
+        self._executor.shutdown(wait=False)
@@ -1,78 +1,232 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import json
 import logging
-from os import environ
-from time import sleep
+import threading
 from unittest.mock import patch
 import yaml
 
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 
 from kubernetes.config import load_incluster_config
-from kubernetes import client, watch
-from kubernetes.client import Configuration, V1DeleteOptions, V1ServiceList, V1StatefulSetList, V1SecretList, \
-    V1beta1CustomResourceDefinition
+from kubernetes import client
+from kubernetes.client import Configuration, V1DeleteOptions, V1beta1CustomResourceDefinition
 from kubernetes.client.rest import ApiException
-from kubernetes.watch import Watch
 
 from Settings import Settings
 from mongoOperator.helpers.IgnoreIfExists import IgnoreIfExists
+from mongoOperator.helpers.Informer import Informer
 from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.ListPager import ListPager
+from mongoOperator.helpers.ObjectView import ObjectView
+from mongoOperator.helpers.RateLimiter import RateLimiter
+from mongoOperator.helpers.ResourceCache import ResourceCache
+from mongoOperator.helpers.ResumableWatch import ResumableWatch, WatchExpiredError
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
 
+class ApplyConflictError(ApiException):
+    """
+    Raised when a server-side apply was rejected because some of the applied fields are owned by another field
+    manager, e.g. because someone edited the object by hand.
+    """
+
+    def __init__(self, kind: str, name: str, namespace: str, api_exception: ApiException) -> None:
+        super().__init__(status=api_exception.status, reason=api_exception.reason)
+        self.body = api_exception.body
+        try:
+            causes = (json.loads(api_exception.body or "{}").get("details") or {}).get("causes") or []
+        except ValueError:
+            causes = []
+        self.conflicts: List[str] = [cause.get("message") or cause.get("field") for cause in causes]
+        self.kind = kind
+        self.name = name
+        self.namespace = namespace
+
+    def __str__(self) -> str:
+        return "Conflict applying {} {} @ ns/{}: {}".format(self.kind, self.name, self.namespace,
+                                                            "; ".join(self.conflicts) or self.reason)
+
+
 class KubernetesService:
     """
     Bundled methods for interacting with the Kubernetes API.
     """
 
+    # The field manager that owns the fields we set with server-side apply.
+    FIELD_MANAGER = "mongo-operator"
+
     DEFAULT_LABELS = KubernetesResources.createDefaultLabels()
 
-    # after creating a new object definition we can get 404 not found from K8s.
-    # below we can configure how many times we retry and how long we wait in between.
-    LIST_CUSTOM_OBJECTS_RETRIES = 3
-    LIST_CUSTOM_OBJECTS_WAIT = 5.0
+    # How many seconds we wait for the informer caches to be filled on start up.
+    CACHE_SYNC_TIMEOUT = 60.0
+
+    # How many watches keep a connection open: one per informer and one for the pods.
+    WATCH_COUNT = 6
+
+    # How many objects we request per page when listing all objects of a type.
+    LIST_PAGE_SIZE = 500
+
+    # The name of our custom resource definition.
+    MONGO_DEFINITION_NAME = "{}.{}".format(Settings.CUSTOM_OBJECT_RESOURCE_PLURAL, Settings.CUSTOM_OBJECT_API_GROUP)
+
+    # The content types that we accept for metadata-only lists ("List") and watch events (""), falling back to JSON.
+    METADATA_ACCEPT = "application/json;as=PartialObjectMetadata{};g=meta.k8s.io;v=v1,application/json"
 
     def __init__(self):
         # Create Kubernetes config.
         load_incluster_config()
         config = Configuration()
         config.debug = Settings.KUBERNETES_SERVICE_DEBUG
+        # Keep a connection for each resource check of each reconcile worker, for each watch and for each request of
+        # a garbage collection batch.
+        config.connection_pool_maxsize = (Settings.RECONCILE_WORKERS * Settings.CHECKER_THREADS + self.WATCH_COUNT
+                                          + Settings.GC_BATCH_SIZE)
         self.api_client = client.ApiClient(config)
 
+        # All API methods send their requests through `call_api`, so limiting it throttles the whole operator.
+        self.rate_limiter = RateLimiter(Settings.KUBERNETES_READ_QPS, Settings.KUBERNETES_READ_BURST,
+                                        Settings.KUBERNETES_WRITE_QPS, Settings.KUBERNETES_WRITE_BURST)
+        self.api_client.call_api = self.rate_limiter.wrap(self.api_client.call_api)
+
         # Re-usable API client instances.
         self.core_api = client.CoreV1Api(self.api_client)
         self.custom_objects_api = client.CustomObjectsApi(self.api_client)
         self.extensions_api = client.ApiextensionsV1beta1Api(self.api_client)
         self.apps_api = client.AppsV1beta1Api(self.api_client)
-
-    def streamPodsOperatedByMe(self, watch: Watch):
-        """
-        Stream events emited by pods operated by this operator.
-        :param watch: watch object to use.
+        self.coordination_api = client.CoordinationV1beta1Api(self.api_client)
+
+        # Local caches of the watched objects. All reads go to the caches once they are synced.
+        label_selector = KubernetesResources.createLabelSelector(self.DEFAULT_LABELS)
+        # The generated API method cannot page custom objects, so they are listed as raw JSON.
+        self.mongo_informer = Informer("mongos", self._listRaw, "/apis/{group}/{version}/{plural}",
+                                       group=Settings.CUSTOM_OBJECT_API_GROUP,
+                                       version=Settings.CUSTOM_OBJECT_API_VERSION,
+                                       plural=Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
+                                       cluster_key_func=ResourceCache.getObjectKey, page_size=self.LIST_PAGE_SIZE)
+        self.stateful_set_informer = Informer("statefulsets", self.apps_api.list_stateful_set_for_all_namespaces,
+                                              cluster_key_func=KubernetesResources.getClusterKey,
+                                              page_size=self.LIST_PAGE_SIZE, label_selector=label_selector)
+        self.service_informer = Informer("services", self.core_api.list_service_for_all_namespaces,
+                                         cluster_key_func=KubernetesResources.getClusterKey,
+                                         page_size=self.LIST_PAGE_SIZE, label_selector=label_selector)
+        # Only the metadata of the secrets is cached, so their data is never held in memory.
+        self.secret_informer = Informer("secrets", self._listRaw, "/api/v1/secrets", metadata_only=True,
+                                        cluster_key_func=KubernetesResources.getSecretClusterKey,
+                                        page_size=self.LIST_PAGE_SIZE, decode_func=ObjectView,
+                                        label_selector=label_selector)
+        # The custom resource definition is cached once it was ensured, and refreshed when it changes.
+        self._mongo_definition: Optional[V1beta1CustomResourceDefinition] = None
+        self._mongo_definition_lock = threading.Lock()
+        self.definition_informer = Informer("customresourcedefinitions",
+                                            self.extensions_api.list_custom_resource_definition,
+                                            cluster_key_func=lambda definition: None,
+                                            field_selector="metadata.name=" + self.MONGO_DEFINITION_NAME)
+        self.definition_informer.addEventHandler(self._onMongoDefinitionEvent)
+        self.informers = [self.definition_informer, self.mongo_informer, self.stateful_set_informer,
+                          self.service_informer, self.secret_informer]
+
+    def startInformers(self) -> None:
+        """
+        Ensures the custom resource definition exists and starts all informers, waiting until their caches are filled.
+        :raise TimeoutError: If the caches were not synced in time.
+        """
+        self.getMongoObjectDefinition()
+        for informer in self.informers:
+            informer.start()
+        for informer in self.informers:
+            if not informer.cache.waitForSync(self.CACHE_SYNC_TIMEOUT):
+                raise TimeoutError("Could not sync the {} cache after {} seconds"
+                                   .format(informer.name, self.CACHE_SYNC_TIMEOUT))
+        logging.info("Informer caches synced: %s", {i.name: len(i.cache) for i in self.informers})
+
+    @staticmethod
+    def _getCached(informer: Informer, name: str, namespace: str, read_func: Callable[[str, str], any]) -> any:
+        """
+        Gets an object from the informer cache, or from the API if the cache is not synced yet.
+        :param informer: The informer of the object type.
+        :param name: The name of the object.
+        :param namespace: The namespace of the object.
+        :param read_func: The function that reads the object from the API.
+        :return: The object.
+        :raise ApiException(404): If the object does not exist.
+        """
+        if not informer.cache.synced:
+            return read_func(name, namespace)
+        obj = informer.cache.get(namespace, name)
+        if obj is None:
+            raise ApiException(status=404, reason="Not Found")
+        return obj
+
+    @staticmethod
+    def _storeInCache(informer: Informer, obj: Optional[any]) -> Optional[any]:
+        """
+        Writes an object returned by the API to the informer cache, so reads see our own writes immediately.
+        The cache keeps the cached object if the watch already delivered a newer version.
+        :param informer: The informer of the object type.
+        :param obj: The object returned by a create or update call, or None if nothing was written.
+        :return: The given object.
+        """
+        if obj is not None and informer.cache.synced:
+            informer.cache.apply("MODIFIED", obj)
+        return obj
+
+    def _apply(self, path: str, body: any, response_type: str) -> any:
+        """
+        Sends the given object as server-side apply patch, creating the object or updating the fields we manage.
+        The generated API methods do not support the apply patch type, so the request is sent directly.
+        :param path: The path of the object, with placeholders for the namespace and name.
+        :param body: The Kubernetes model object or manifest, including its API version and kind.
+        :param response_type: The name of the model to deserialize the response into.
+        :return: The applied object.
+        :raise ApplyConflictError: If any of the fields is owned by another field manager.
+        """
+        manifest = body if isinstance(body, dict) else KubernetesResources.serialize(body)
+        name, namespace = manifest["metadata"]["name"], manifest["metadata"]["namespace"]
+        query_params = [("fieldManager", self.FIELD_MANAGER)]
+        if Settings.SERVER_SIDE_APPLY_FORCE:
+            query_params.append(("force", "true"))
+        try:
+            return self.api_client.call_api(
+                path, "PATCH", path_params={"namespace": namespace, "name": name},
+                query_params=query_params,
+                header_params={"Accept": "application/json", "Content-Type": "application/apply-patch+yaml"},
+                body=json.dumps(manifest),  # JSON is valid YAML
+                response_type=response_type, auth_settings=["BearerToken"], _return_http_data_only=True)
+        except ApiException as api_exception:
+            if api_exception.status == 409:
+                raise ApplyConflictError(manifest["kind"], name, namespace, api_exception)
+            raise
+
+    def streamPodsOperatedByMe(self) -> Iterator[Dict[str, any]]:
+        """
+        Stream events emited by pods operated by this operator, forever.
+        The watch resumes from the last seen resource version. If that version expired, the watch starts over,
+        reporting all existing pods as added again.
         :return: stream of Events related to given pods
         """
-        return watch.stream(self.core_api.list_namespaced_pod, namespace=environ['KUBERNETES_NAMESPACE'], label_selector='operated-by=operators.javamachr.cz')
+        watch = ResumableWatch(self.core_api.list_namespaced_pod, namespace=Settings.KUBERNETES_NAMESPACE,
+                               label_selector='operated-by=operators.javamachr.cz')
+        while True:
+            try:
+                yield from watch.stream()
+            except WatchExpiredError as err:
+                logging.info("Pod watch expired (%s), starting over.", err)
 
-    def streamStatefulSetsOperatedByMe(self, watch: Watch):
+    def createMongoObjectDefinition(self) -> V1beta1CustomResourceDefinition:
         """
-        Stream events emited by StatefulSet operated by this operator.
-        :param watch: watch object to use.
-        :return: stream of Events related to given StatefulSets
+        Gets the custom resource definition, creating it if it does not exist yet.
+        :return: The custom resource definition.
         """
-        return watch.stream(self.apps_api.list_namespaced_stateful_set,namespace=environ['KUBERNETES_NAMESPACE'], label_selector='operated-by=operators.javamachr.cz')
-
-    def createMongoObjectDefinition(self) -> V1beta1CustomResourceDefinition:
-        """Create the custom resource definition."""
-        available_resources = {crd.spec.names.plural: crd for crd in
-                               self.extensions_api.list_custom_resource_definition().items}
-        if Settings.CUSTOM_OBJECT_RESOURCE_PLURAL in available_resources:
-            return available_resources[Settings.CUSTOM_OBJECT_RESOURCE_PLURAL]
+        try:
+            return self.extensions_api.read_custom_resource_definition(self.MONGO_DEFINITION_NAME)
+        except ApiException as api_exception:
+            if api_exception.status != 404:
+                raise
 
         # Create it if our CRD doesn't exists yet.
-        logging.info("Custom resource definition %s not found in cluster (available: %s), creating it...",
-                     Settings.CUSTOM_OBJECT_RESOURCE_PLURAL, available_resources)
+        logging.info("Custom resource definition %s not found in cluster, creating it...", self.MONGO_DEFINITION_NAME)
         with open("mongo_crd.yaml") as custom_resource_file:
             definition_dict = yaml.load(custom_resource_file)
         body = KubernetesResources.deserialize(definition_dict, "V1beta1CustomResourceDefinition")
@@ -82,98 +236,232 @@ class KubernetesService:
         with patch("kubernetes.client.models.v1beta1_custom_resource_definition_status.V1beta1CustomResourceDefinitionStatus.conditions"):  # noqa: E501 pylint: disable=C0301
             return self.extensions_api.create_custom_resource_definition(body)
 
-    def listMongoObjects(self, **kwargs) -> Dict[str, any]:
+    def getMongoObjectDefinition(self) -> V1beta1CustomResourceDefinition:
         """
-        Get all Kubernetes objects of our custom resource type.
-        IMPORTANT: Kubernetes uses the :return: value to deserialize the results, so it must be a class name.
-        :param kwargs: Additional API flags.
-        :return: dict(str, object)
+        Gets the custom resource definition, creating it if needed. The definition is cached after the first call,
+        and kept up to date by the definition informer.
+        :return: The custom resource definition.
         """
-        definition = self.createMongoObjectDefinition()
-        for _ in range(self.LIST_CUSTOM_OBJECTS_RETRIES):
-            try:
-                logging.debug("Listing resources based on definition %s", definition.metadata.uid)
-                return self.custom_objects_api.list_cluster_custom_object(Settings.CUSTOM_OBJECT_API_GROUP,
-                                                                          Settings.CUSTOM_OBJECT_API_VERSION,
-                                                                          Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
-                                                                          **kwargs)
-            except ApiException as api_exception:
-                if api_exception.status != 404:
-                    raise
-                logging.info("Could not list the custom Mongo objects: %s. The definition is probably being "
-                             "initialized, we wait %s seconds.", api_exception.reason, self.LIST_CUSTOM_OBJECTS_WAIT)
-                sleep(self.LIST_CUSTOM_OBJECTS_WAIT)
-
-        raise TimeoutError("Could not list the custom mongo objects after {} retries"
-                           .format(self.LIST_CUSTOM_OBJECTS_RETRIES))
+        with self._mongo_definition_lock:
+            if self._mongo_definition is None:
+                self._mongo_definition = self.createMongoObjectDefinition()
+            return self._mongo_definition
+
+    def _onMongoDefinitionEvent(self, event_type: str, definition: V1beta1CustomResourceDefinition) -> None:
+        """
+        Updates the cached custom resource definition when the definition informer reports a change.
+        A deleted definition is created again on the next call to `getMongoObjectDefinition`.
+        :param event_type: The type of the event, i.e. ADDED, MODIFIED or DELETED.
+        :param definition: The custom resource definition.
+        """
+        logging.info("Custom resource definition %s was %s.", definition.metadata.name, event_type.lower())
+        with self._mongo_definition_lock:
+            self._mongo_definition = None if event_type == "DELETED" else definition
+
+    def listMongoObjects(self, **kwargs) -> Iterator[Dict[str, any]]:
+        """
+        Get all Kubernetes objects of our custom resource type, requesting them page by page as they are consumed.
+        :param kwargs: Additional API flags, e.g. the label selector.
+        :return: A generator of the objects, as dictionaries.
+        :raise ApiException(404): If the definition was just created and is still being initialized. The cached
+            definition is then refreshed on the next call.
+        """
+        definition = self.getMongoObjectDefinition()
+        logging.debug("Listing resources based on definition %s", definition.metadata.uid)
+        try:
+            yield from ListPager(self._listRaw, "/apis/{group}/{version}/{plural}", page_size=self.LIST_PAGE_SIZE,
+                                 group=Settings.CUSTOM_OBJECT_API_GROUP, version=Settings.CUSTOM_OBJECT_API_VERSION,
+                                 plural=Settings.CUSTOM_OBJECT_RESOURCE_PLURAL, **kwargs)
+        except ApiException as api_exception:
+            if api_exception.status == 404:
+                with self._mongo_definition_lock:
+                    self._mongo_definition = None
+            raise
+
+    def _listRaw(self, path: str, limit: Optional[int] = None, _continue: Optional[str] = None,
+                 label_selector: Optional[str] = None, resource_version: Optional[str] = None,
+                 timeout_seconds: Optional[int] = None, watch: bool = False, metadata_only: bool = False,
+                 _preload_content: bool = True, **path_params) -> any:
+        """
+        Lists a single page of objects as plain JSON instead of client models, or watches them.
+        The generated API methods cannot request gzip or metadata only, nor page custom objects, so we send the
+        request ourselves. Lists are requested gzip-encoded, the watch streams are not as they are read undecoded.
+        IMPORTANT: Kubernetes uses the :return: value to deserialize the watch events, so it must be a type name.
+        :param path: The resource path of the list, e.g. "/api/v1/secrets".
+        :param limit: The maximum amount of objects in the page.
+        :param _continue: The continue token of the previous page, if any.
+        :param label_selector: The label selector, if any.
+        :param resource_version: The resource version to start watching from, if any.
+        :param timeout_seconds: How many seconds the server keeps the watch open, if set.
+        :param watch: Whether to watch the objects instead of listing them.
+        :param metadata_only: Whether to get the objects as PartialObjectMetadata, leaving out everything but the
+            metadata. Servers older than Kubernetes 1.15 send the full objects instead.
+        :param _preload_content: Ignored, the response of a watch is always streamed.
+        :param path_params: The parameters of the resource path.
+        :return: object
+        """
+        query_params = [(name, value) for name, value in (
+            ("labelSelector", label_selector), ("limit", limit), ("continue", _continue),
+            ("resourceVersion", resource_version), ("timeoutSeconds", timeout_seconds), ("watch", watch and "true")
+        ) if value]
+        header_params = {"Accept": "application/json"}
+        if metadata_only:
+            header_params["Accept"] = self.METADATA_ACCEPT.format("" if watch else "List")
+        if not watch:
+            header_params["Accept-Encoding"] = "gzip"
+        response = self.api_client.call_api(path, "GET", path_params=path_params, query_params=query_params,
+                                            header_params=header_params, auth_settings=["BearerToken"],
+                                            _return_http_data_only=True, _preload_content=False)
+        return response if watch else json.loads(response.data)  # urllib3 decompresses the data
+
+    def _listWithLabels(self, kind: str, list_func: Optional[Callable], raw_path: str,
+                        labels: Optional[Dict[str, str]], metadata_only: bool = False) -> Iterator[any]:
+        """
+        Lists all objects with the given labels page by page, either as client models or as views of the raw JSON.
+        :param kind: The kind of objects, used for logging.
+        :param list_func: The API method that lists the objects as client models.
+        :param raw_path: The resource path to list the objects as raw JSON.
+        :param labels: The labels to select, or None for all objects operated by us.
+        :param metadata_only: Whether to list only the metadata of the objects, as views.
+        :return: A generator of the objects.
+        """
+        label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
+        logging.debug("Getting all %s with labels %s", kind, label_selector)
+        if metadata_only or Settings.RAW_LIST_RESPONSES:
+            return map(ObjectView, ListPager(self._listRaw, raw_path, page_size=self.LIST_PAGE_SIZE,
+                                             label_selector=label_selector, metadata_only=metadata_only))
+        return iter(ListPager(list_func, page_size=self.LIST_PAGE_SIZE, label_selector=label_selector))
 
     def getMongoObject(self, name: str, namespace: str) -> V1MongoClusterConfiguration:
         """
         Get a single Kubernetes Mongo object.
         :param name: The name of the object to get.
         :param namespace: The namespace in which to get the object.
-        :return: The custom resource object if existing, otherwise None
+        :return: The custom resource object.
+        :raise ApiException(404): If the object does not exist.
         """
-        return self.custom_objects_api.get_namespaced_custom_object(Settings.CUSTOM_OBJECT_API_GROUP,
-                                                                    Settings.CUSTOM_OBJECT_API_VERSION,
-                                                                    namespace,
-                                                                    Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
-                                                                    name)
+        return self._getCached(self.mongo_informer, name, namespace, lambda name, namespace:
+                               self.custom_objects_api.get_namespaced_custom_object(
+                                   Settings.CUSTOM_OBJECT_API_GROUP, Settings.CUSTOM_OBJECT_API_VERSION, namespace,
+                                   Settings.CUSTOM_OBJECT_RESOURCE_PLURAL, name))
 
-    def listAllServicesWithLabels(self, labels: Optional[Dict[str, str]] = None) -> V1ServiceList:
-        """Get all services with the given labels."""
-        label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
-        logging.debug("Getting all services with labels %s", label_selector)
-        return self.core_api.list_service_for_all_namespaces(label_selector=label_selector)
+    def listAllServicesWithLabels(self, labels: Optional[Dict[str, str]] = None,
+                                  metadata_only: bool = False) -> Iterator[client.V1Service]:
+        """
+        Get all services with the given labels, requesting them page by page as they are consumed.
+        :param labels: The labels to select, or None for all services operated by us.
+        :param metadata_only: Whether only the metadata is needed, which is then listed as views if not cached.
+        :return: A generator of the services.
+        """
+        if labels is None and self.service_informer.cache.synced:
+            return iter(self.service_informer.cache.list())
+        return self._listWithLabels("services", self.core_api.list_service_for_all_namespaces, "/api/v1/services",
+                                    labels, metadata_only)
 
-    def listAllStatefulSetsWithLabels(self, labels: Dict[str, str] = None) -> V1StatefulSetList:
-        """Get all stateful sets with the given labels."""
-        label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
-        logging.debug("Getting all stateful sets with labels %s", label_selector)
-        return self.apps_api.list_stateful_set_for_all_namespaces(label_selector=label_selector)
+    def listAllStatefulSetsWithLabels(self, labels: Dict[str, str] = None,
+                                      metadata_only: bool = False) -> Iterator[client.V1beta1StatefulSet]:
+        """
+        Get all stateful sets with the given labels, requesting them page by page as they are consumed.
+        :param labels: The labels to select, or None for all stateful sets operated by us.
+        :param metadata_only: Whether only the metadata is needed, which is then listed as views if not cached.
+        :return: A generator of the stateful sets.
+        """
+        if labels is None and self.stateful_set_informer.cache.synced:
+            return iter(self.stateful_set_informer.cache.list())
+        return self._listWithLabels("stateful sets", self.apps_api.list_stateful_set_for_all_namespaces,
+                                    "/apis/apps/v1beta1/statefulsets", labels, metadata_only)
 
-    def listAllSecretsWithLabels(self, labels: Dict[str, str] = None) -> V1SecretList:
-        """Get al secrets with the given labels."""
-        label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
-        logging.debug("Getting all secrets with labels %s", label_selector)
-        return self.core_api.list_secret_for_all_namespaces(label_selector=label_selector)
+    def listAllSecretsWithLabels(self, labels: Dict[str, str] = None) -> Iterator[ObjectView]:
+        """
+        Get the metadata of all secrets with the given labels, requesting them page by page as they are consumed.
+        The secret data is never listed, use `getSecret` to read it.
+        :param labels: The labels to select, or None for all secrets operated by us.
+        :return: A generator of views of the secret metadata.
+        """
+        if labels is None and self.secret_informer.cache.synced:
+            return iter(self.secret_informer.cache.list())
+        return self._listWithLabels("secrets", None, "/api/v1/secrets", labels, metadata_only=True)
 
     def getSecret(self, secret_name: str, namespace: str) -> client.V1Secret:
         """
-        Retrieves the secret with the given name.
+        Retrieves the secret with the given name, including its data. The data is not cached, so it is always read
+        from the API.
         :param secret_name: The name of the secret.
         :param namespace: The namespace of the secret.
         :return: The secret object.
         """
         return self.core_api.read_namespaced_secret(secret_name, namespace)
 
+    def getSecretMetadata(self, secret_name: str, namespace: str) -> ObjectView:
+        """
+        Retrieves the metadata of the secret with the given name, e.g. to compare its spec hash.
+        :param secret_name: The name of the secret.
+        :param namespace: The namespace of the secret.
+        :return: A view of the secret metadata, or the secret object if the cache is not synced yet.
+        :raise ApiException(404): If the secret does not exist.
+        """
+        return self._getCached(self.secret_informer, secret_name, namespace, self.core_api.read_namespaced_secret)
+
+    def _storeSecretMetadata(self, secret: Optional[client.V1Secret]) -> Optional[client.V1Secret]:
+        """
+        Writes the metadata of a secret returned by the API to the informer cache, which never holds secret data.
+        :param secret: The secret returned by a create or update call, or None if nothing was written.
+        :return: The given secret.
+        """
+        if secret is not None and self.secret_informer.cache.synced:
+            self.secret_informer.cache.apply("MODIFIED",
+                                             ObjectView({"metadata": KubernetesResources.serialize(secret.metadata)}))
+        return secret
+
     def createSecret(self, secret_name: str, namespace: str, secret_data: Dict[str, str],
-                     labels: Optional[Dict[str, str]] = None) -> Optional[client.V1Secret]:
+                     labels: Optional[Dict[str, str]] = None,
+                     owner_references: Optional[List[client.V1OwnerReference]] = None) -> Optional[client.V1Secret]:
         """
         Creates a new Kubernetes secret.
         :param secret_name: Unique name of the secret.
         :param namespace: Namespace to add secret to.
         :param secret_data: The data to store in the secret as key/value pair dict.
         :param labels: Optional labels for this secret, defaults to the default labels (see `cls.createDefaultLabels`).
+        :param owner_references: Optional owners of this secret, which make Kubernetes delete it together with them.
         :return: The secret if successful, None otherwise.
         """
-        secret_body = KubernetesResources.createSecret(secret_name, namespace, secret_data, labels)
+        secret_body = KubernetesResources.createSecretBody(secret_name, namespace, secret_data, labels,
+                                                           owner_references)
         logging.info("Creating secret %s in namespace %s", secret_name, namespace)
         with IgnoreIfExists():
-            return self.core_api.create_namespaced_secret(namespace, secret_body)
+            return self._storeSecretMetadata(self.core_api.create_namespaced_secret(namespace, secret_body))
 
-    def updateSecret(self, secret_name: str, namespace: str, secret_data: Dict[str, str]) -> client.V1Secret:
+    def updateSecret(self, secret_name: str, namespace: str, secret_data: Dict[str, str],
+                     owner_references: Optional[List[client.V1OwnerReference]] = None) -> client.V1Secret:
         """
         Updates the given Kubernetes secret.
         :param secret_name: Unique name of the secret.
         :param namespace: Namespace to add secret to.
         :param secret_data: The data to store in the secret as key/value pair dict.
+        :param owner_references: Optional owners of this secret, which make Kubernetes delete it together with them.
         :return: The secret if successful, None otherwise.
         """
-        secret = self.getSecret(secret_name, namespace)
-        secret.string_data = secret_data
+        secret_body = KubernetesResources.createSecretBody(secret_name, namespace, secret_data,
+                                                           owner_references=owner_references)
         logging.info("Updating secret %s @ ns/%s", secret_name, namespace)
-        return self.core_api.patch_namespaced_secret(secret_name, namespace, secret)
+        return self._storeSecretMetadata(self.core_api.patch_namespaced_secret(secret_name, namespace, secret_body))
+
+    def applySecret(self, secret_name: str, namespace: str, secret_data: Dict[str, str],
+                    owner_references: Optional[List[client.V1OwnerReference]] = None) -> client.V1Secret:
+        """
+        Creates or updates the given Kubernetes secret in a single request, using server-side apply.
+        :param secret_name: Unique name of the secret.
+        :param namespace: Namespace to add secret to.
+        :param secret_data: The data to store in the secret as key/value pair dict.
+        :param owner_references: Optional owners of this secret, which make Kubernetes delete it together with them.
+        :return: The applied secret.
+        :raise ApplyConflictError: If any of the fields is owned by another field manager.
+        """
+        body = KubernetesResources.withType(KubernetesResources.createSecretBody(
+            secret_name, namespace, secret_data, owner_references=owner_references), "v1", "Secret")
+        logging.info("Applying secret %s @ ns/%s", secret_name, namespace)
+        return self._storeSecretMetadata(self._apply("/api/v1/namespaces/{namespace}/secrets/{name}", body,
+                                                     "V1Secret"))
 
     def deleteSecret(self, name: str, namespace: str) -> client.V1Status:
         """
@@ -193,7 +481,7 @@ class KubernetesService:
         :param namespace: The namespace in which to get the service.
         :return: The service object if it exists, otherwise None.
         """
-        return self.core_api.read_namespaced_service(name, namespace)
+        return self._getCached(self.service_informer, name, namespace, self.core_api.read_namespaced_service)
 
     def createService(self, cluster_object: V1MongoClusterConfiguration) -> Optional[client.V1Service]:
         """
@@ -202,10 +490,10 @@ class KubernetesService:
         :return: The created service.
         """
         namespace = cluster_object.metadata.namespace
-        body = KubernetesResources.createService(cluster_object)
-        logging.info("Creating service %s @ ns/%s.", body.metadata.name, namespace)
+        body = KubernetesResources.createServiceBody(cluster_object)
+        logging.info("Creating service %s @ ns/%s.", cluster_object.metadata.name, namespace)
         with IgnoreIfExists():
-            return self.core_api.create_namespaced_service(namespace, body)
+            return self._storeInCache(self.service_informer, self.core_api.create_namespaced_service(namespace, body))
 
     def createHeadlessService(self, cluster_object: V1MongoClusterConfiguration) -> Optional[client.V1Service]:
         """
@@ -214,10 +502,10 @@ class KubernetesService:
         :return: The created service.
         """
         namespace = cluster_object.metadata.namespace
-        body = KubernetesResources.createHeadlessService(cluster_object)
-        logging.info("Creating service %s @ ns/%s.", body.metadata.name, namespace)
+        body = KubernetesResources.createHeadlessServiceBody(cluster_object)
+        logging.info("Creating service svc-%s-internal @ ns/%s.", cluster_object.metadata.name, namespace)
         with IgnoreIfExists():
-            return self.core_api.create_namespaced_service(namespace, body)
+            return self._storeInCache(self.service_informer, self.core_api.create_namespaced_service(namespace, body))
 
     def updateService(self, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
         """
@@ -227,9 +515,9 @@ class KubernetesService:
         """
         name = cluster_object.metadata.name
         namespace = cluster_object.metadata.namespace
-        body = KubernetesResources.createService(cluster_object)
+        body = KubernetesResources.createServiceBody(cluster_object)
         logging.info("Updating service %s @ ns/%s.", name, namespace)
-        return self.core_api.patch_namespaced_service(name, namespace, body)
+        return self._storeInCache(self.service_informer, self.core_api.patch_namespaced_service(name, namespace, body))
 
     def updateHeadlessService(self, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
         """
@@ -239,9 +527,43 @@ class KubernetesService:
         """
         name = "svc-" + cluster_object.metadata.name + "-internal"
         namespace = cluster_object.metadata.namespace
-        body = KubernetesResources.createHeadlessService(cluster_object)
+        body = KubernetesResources.createHeadlessServiceBody(cluster_object)
         logging.info("Updating service %s @ ns/%s.", name, namespace)
-        return self.core_api.patch_namespaced_service(name, namespace, body)
+        return self._storeInCache(self.service_informer, self.core_api.patch_namespaced_service(name, namespace, body))
+
+    def applyService(self, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
+        """
+        Creates or updates the service in a single request, using server-side apply.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The applied service.
+        :raise ApplyConflictError: If any of the fields is owned by another field manager.
+        """
+        return self._applyService(cluster_object.metadata.name, cluster_object.metadata.namespace,
+                                  KubernetesResources.createServiceBody(cluster_object))
+
+    def applyHeadlessService(self, cluster_object: V1MongoClusterConfiguration) -> client.V1Service:
+        """
+        Creates or updates the headless service in a single request, using server-side apply.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The applied service.
+        :raise ApplyConflictError: If any of the fields is owned by another field manager.
+        """
+        return self._applyService("svc-" + cluster_object.metadata.name + "-internal",
+                                  cluster_object.metadata.namespace,
+                                  KubernetesResources.createHeadlessServiceBody(cluster_object))
+
+    def _applyService(self, name: str, namespace: str, body: any) -> client.V1Service:
+        """
+        Applies the given service.
+        :param name: The name of the service.
+        :param namespace: The namespace of the service.
+        :param body: The service model object or manifest.
+        :return: The applied service.
+        """
+        body = KubernetesResources.withType(body, "v1", "Service")
+        logging.info("Applying service %s @ ns/%s.", name, namespace)
+        return self._storeInCache(self.service_informer,
+                                  self._apply("/api/v1/namespaces/{namespace}/services/{name}", body, "V1Service"))
 
     def deleteService(self, name: str, namespace: str) -> client.V1Status:
         """
@@ -266,7 +588,8 @@ class KubernetesService:
         :param namespace: The namespace in which to get the stateful set.
         :return: The stateful set object if existing, otherwise None.
         """
-        return self.apps_api.read_namespaced_stateful_set(name, namespace)
+        return self._getCached(self.stateful_set_informer, name, namespace,
+                               self.apps_api.read_namespaced_stateful_set)
 
     def createStatefulSet(self, cluster_object: V1MongoClusterConfiguration) -> Optional[client.V1beta1StatefulSet]:
         """
@@ -275,10 +598,11 @@ class KubernetesService:
         :return: The created stateful set.
         """
         namespace = cluster_object.metadata.namespace
-        body = KubernetesResources.createStatefulSet(cluster_object)
+        body = KubernetesResources.createStatefulSetBody(cluster_object)
         with IgnoreIfExists():
-            logging.info("Creating stateful set %s @ ns/%s.", body.metadata.name, namespace)
-            return self.apps_api.create_namespaced_stateful_set(namespace, body)
+            logging.info("Creating stateful set %s @ ns/%s.", cluster_object.metadata.name, namespace)
+            return self._storeInCache(self.stateful_set_informer,
+                                      self.apps_api.create_namespaced_stateful_set(namespace, body))
 
     def updateStatefulSet(self, cluster_object: V1MongoClusterConfiguration) -> client.V1beta1StatefulSet:
         """
@@ -288,11 +612,27 @@ class KubernetesService:
         """
         name = cluster_object.metadata.name
         namespace = cluster_object.metadata.namespace
-        body = KubernetesResources.createStatefulSet(cluster_object)
-        body._api_version = "apps/v1beta1"
-        body._kind = "StatefulSet"
+        body = KubernetesResources.withType(KubernetesResources.createStatefulSetBody(cluster_object),
+                                            "apps/v1beta1", "StatefulSet")
         logging.info("Updating stateful set %s @ ns/%s.", name, namespace)
-        return self.apps_api.patch_namespaced_stateful_set(name, namespace, body)
+        return self._storeInCache(self.stateful_set_informer,
+                                  self.apps_api.patch_namespaced_stateful_set(name, namespace, body))
+
+    def applyStatefulSet(self, cluster_object: V1MongoClusterConfiguration) -> client.V1beta1StatefulSet:
+        """
+        Creates or updates the stateful set in a single request, using server-side apply.
+        The same API version as the other stateful set calls is used, so the informer cache holds a single model type.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The applied stateful set.
+        :raise ApplyConflictError: If any of the fields is owned by another field manager.
+        """
+        body = KubernetesResources.withType(KubernetesResources.createStatefulSetBody(cluster_object),
+                                            "apps/v1beta1", "StatefulSet")
+        logging.info("Applying stateful set %s @ ns/%s.", cluster_object.metadata.name,
+                     cluster_object.metadata.namespace)
+        return self._storeInCache(self.stateful_set_informer,
+                                  self._apply("/apis/apps/v1beta1/namespaces/{namespace}/statefulsets/{name}", body,
+                                              "V1beta1StatefulSet"))
 
     def deleteStatefulSet(self, name: str, namespace: str) -> bool:
         """
@@ -304,3 +644,59 @@ class KubernetesService:
         body = V1DeleteOptions()
         logging.info("Deleting stateful set %s @ ns/%s.", name, namespace)
         return self.apps_api.delete_namespaced_stateful_set(name, namespace, body)
+
+    def getLease(self, name: str, namespace: str) -> client.V1beta1Lease:
+        """
+        Gets a lease from the cluster. Leases are not cached, as they change on every renewal.
+        :param name: The name of the lease to get.
+        :param namespace: The namespace in which to get the lease.
+        :return: The lease object.
+        :raise ApiException(404): If the lease does not exist.
+        """
+        return self.coordination_api.read_namespaced_lease(name, namespace)
+
+    def createLease(self, name: str, namespace: str, spec: client.V1beta1LeaseSpec,
+                    labels: Optional[Dict[str, str]] = None) -> client.V1beta1Lease:
+        """
+        Creates a new lease.
+        :param name: The name of the lease.
+        :param namespace: The namespace in which to create the lease.
+        :param spec: The lease specification, with the holder and the renew time.
+        :param labels: Optional labels for the lease.
+        :return: The created lease.
+        :raise ApiException(409): If the lease was created by someone else in the meantime.
+        """
+        body = client.V1beta1Lease(metadata=client.V1ObjectMeta(name=name, namespace=namespace, labels=labels),
+                                   spec=spec)
+        logging.debug("Creating lease %s @ ns/%s.", name, namespace)
+        return self.coordination_api.create_namespaced_lease(namespace, body)
+
+    def listLeases(self, namespace: str, labels: Dict[str, str]) -> client.V1beta1LeaseList:
+        """
+        Gets all leases with the given labels.
+        :param namespace: The namespace in which to list the leases.
+        :param labels: The labels of the leases.
+        :return: The leases.
+        """
+        label_selector = KubernetesResources.createLabelSelector(labels)
+        return self.coordination_api.list_namespaced_lease(namespace, label_selector=label_selector)
+
+    def deleteLease(self, name: str, namespace: str) -> client.V1Status:
+        """
+        Deletes the given lease.
+        :param name: The name of the lease to delete.
+        :param namespace: The namespace in which to delete the lease.
+        :return: The deletion status.
+        """
+        logging.info("Deleting lease %s @ ns/%s.", name, namespace)
+        return self.coordination_api.delete_namespaced_lease(name, namespace, V1DeleteOptions())
+
+    def replaceLease(self, lease: client.V1beta1Lease) -> client.V1beta1Lease:
+        """
+        Replaces the given lease. The resource version in the lease makes sure we do not overwrite the changes of
+        someone else.
+        :param lease: The lease, as read by `getLease` and then modified.
+        :return: The updated lease.
+        :raise ApiException(409): If the lease was changed by someone else in the meantime.
+        """
+        return self.coordination_api.replace_namespaced_lease(lease.metadata.name, lease.metadata.namespace, lease)
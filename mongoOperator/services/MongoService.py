@@ -2,12 +2,16 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import logging
-from time import sleep
-from typing import Dict, Optional, List
+import threading
+from subprocess import SubprocessError
+from typing import Callable, Dict, Optional, List, Set, Tuple
 
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 
+from Settings import Settings
+from mongoOperator.helpers.ClusterLocks import ClusterLock, ClusterLocks
+from mongoOperator.helpers.ResourceCache import ClusterKey
 from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
 from mongoOperator.helpers.MongoResources import MongoResources
 from mongoOperator.helpers.RestoreHelper import RestoreHelper
@@ -26,16 +30,27 @@ class MongoService:
     CONTAINER = "mongodb"
     NO_REPLICA_SET_RESPONSE = "no replset config has been received"
 
-    # after creating a new object definition we can get handshake failures.
-    # below we can configure how many times we retry and how long we wait in between.
-    MONGO_COMMAND_RETRIES = 4
-    MONGO_COMMAND_WAIT = 15.0
+    # The replica set member states that we consider healthy, i.e. PRIMARY and SECONDARY.
+    HEALTHY_MEMBER_STATES = {1, 2}
 
-    def __init__(self, kubernetes_service: KubernetesService) -> None:
+    def __init__(self, kubernetes_service: KubernetesService, cluster_locks: Optional[ClusterLocks] = None,
+                 is_owner: Optional[Callable[[ClusterKey], bool]] = None) -> None:
+        """
+        :param kubernetes_service: The Kubernetes service.
+        :param cluster_locks: The locks of the clusters, taken by the replica set callbacks before acting on a cluster.
+        :param is_owner: Function that checks whether this operator replica owns a cluster, by default all of them.
+        """
         self._kubernetes_service = kubernetes_service
+        self._cluster_locks = cluster_locks or ClusterLocks()
+        self._is_owner = is_owner or (lambda key: True)
         self._restore_helper = RestoreHelper(self._kubernetes_service)
         self._connected_replica_sets: Dict[str, MongoClient] = {}
+        self._connect_lock = threading.Lock()  # guards the connected replica sets
+        self._restore_lock = threading.Lock()  # guards the restored and pending cluster names
         self._restored_cluster_names: List[str] = []
+        self._pending_restore_names: Set[str] = set()
+        self._active = False
+        self._replica_set_health: Dict[Tuple[str, str], bool] = {}  # format: {(namespace, cluster_name): healthy}
 
     def checkOrCreateReplicaSet(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
@@ -49,6 +64,7 @@ class MongoService:
         replicas = cluster_object.spec.mongodb.replicas
 
         create_status_command = MongoResources.createStatusCommand()
+        self._replica_set_health[(namespace, cluster_name)] = False
 
         try:
             logging.debug("Will execute status command.")
@@ -66,6 +82,13 @@ class MongoService:
             # The amount of replicas is not the same as configured, we need to fix this
             if replicas != len(create_status_response["members"]):
                 self._reconfigureReplicaSet(cluster_object)
+            else:
+                self._replica_set_health[(namespace, cluster_name)] = all(
+                    member.get("health") == 1 and member.get("state") in self.HEALTHY_MEMBER_STATES
+                    for member in create_status_response["members"]
+                )
+
+            self._restorePending(cluster_object)
 
         except OperationFailure as err:
             logging.debug("Failed with %s", err)
@@ -77,6 +100,40 @@ class MongoService:
             logging.debug("Replicaset is not initialized, will initialize now.")
             self._initializeReplicaSet(cluster_object)
 
+    def isReplicaSetHealthy(self, cluster_object: V1MongoClusterConfiguration) -> bool:
+        """
+        Checks whether the replica set was healthy according to the last `replSetGetStatus` response, i.e. it had the
+        configured amount of members and all of them were up as primary or secondary.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: True if the replica set was healthy, False if it was not or if it has not been checked yet.
+        """
+        return self._replica_set_health.get((cluster_object.metadata.namespace, cluster_object.metadata.name), False)
+
+    def connect(self, cluster_object: V1MongoClusterConfiguration) -> None:
+        """
+        Creates the client for the given replica set if it does not exist yet, so its connections are ready when
+        we need them.
+        :param cluster_object: The cluster object from the YAML file.
+        """
+        name = cluster_object.metadata.name
+        with self._connect_lock:
+            if name not in self._connected_replica_sets:
+                self._connected_replica_sets[name] = self._createMongoClientForReplicaSet(cluster_object)
+
+    def activate(self) -> None:
+        """
+        Starts acting on the replica set callbacks, e.g. once this operator replica became the leader.
+        Until then, the restores triggered by the callbacks are postponed to the next check of the replica set.
+        """
+        self._active = True
+
+    def deactivate(self) -> None:
+        """
+        Stops acting on the replica set callbacks, e.g. once this operator replica lost the leadership.
+        The restores that are already running are finished.
+        """
+        self._active = False
+
     def createUsers(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
         Creates the users required for each of the pods in the replica.
@@ -166,8 +223,10 @@ class MongoService:
         :return: The mongo client.
         """
         logging.info("Creating MongoClient for replicaset %s.", cluster_object.metadata.name)
-        client = MongoClient(MongoResources.getMemberHostnames(cluster_object), connectTimeoutMS=120000,
-                             serverSelectionTimeoutMS=120000, replicaSet=cluster_object.metadata.name, username='admin',
+        client = MongoClient(MongoResources.getMemberHostnames(cluster_object),
+                             connectTimeoutMS=int(Settings.MONGO_CONNECT_TIMEOUT * 1000),
+                             serverSelectionTimeoutMS=int(Settings.MONGO_SERVER_SELECTION_TIMEOUT * 1000),
+                             replicaSet=cluster_object.metadata.name, username='admin',
                              password=cluster_object.spec.users.admin_password, authSource='admin',
                              event_listeners=[CommandLogger(),
                                               ServerLogger(),
@@ -183,42 +242,87 @@ class MongoService:
         If a restore is still needed for the given replica set, it will be executed at this stage.
         :param cluster_object: The cluster configuration object for the replica set.
         """
-        if cluster_object.metadata.name in self._restored_cluster_names:
-            # A restore was already done for this replica set, so we don't have to do anything.
+        cluster_name = cluster_object.metadata.name
+        with self._restore_lock:
+            if cluster_name in self._restored_cluster_names:
+                # A restore was already done for this replica set, so we don't have to do anything.
+                return
+            # Until it succeeds, the restore is retried during every check of the replica set by its owner.
+            self._pending_restore_names.add(cluster_name)
+        lock = self._tryLockOwnedCluster(cluster_object)
+        if not lock:
             return
+        try:
+            self._restorePending(cluster_object)
+        except SubprocessError as err:
+            # This callback runs in a pymongo thread, so we retry during the next check of the replica set instead.
+            logging.error("Restore of replica set %s failed, it will be retried: %s", cluster_name, err)
+        finally:
+            lock.release()
+
+    def _restorePending(self, cluster_object: V1MongoClusterConfiguration) -> None:
+        """
+        Executes the restore of the given replica set if it was postponed or if it failed before.
+        The cluster lock must be held by the caller.
+        :param cluster_object: The cluster configuration object for the replica set.
+        :raise SubprocessError: If the restore failed again.
+        """
+        cluster_name = cluster_object.metadata.name
+        with self._restore_lock:
+            if cluster_name not in self._pending_restore_names:
+                return
         self._restore_helper.restoreIfNeeded(cluster_object)
-        self._restored_cluster_names.append(cluster_object.metadata.name)
+        with self._restore_lock:
+            self._pending_restore_names.discard(cluster_name)
+            self._restored_cluster_names.append(cluster_name)
 
     def _onAllHostsReady(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
         Callback triggered when all hosts in the would-be replica set are available.
         :param cluster_object: The cluster configuration object for the hosts in the would-be replica set.
         """
-        self.checkOrCreateReplicaSet(cluster_object)
+        lock = self._tryLockOwnedCluster(cluster_object)
+        if not lock:
+            return
+        try:
+            self.checkOrCreateReplicaSet(cluster_object)
+        finally:
+            lock.release()
+
+    def _tryLockOwnedCluster(self, cluster_object: V1MongoClusterConfiguration) -> Optional[ClusterLock]:
+        """
+        Takes the lock of the given cluster for a replica set callback, if this replica may act on the cluster.
+        The lock is not waited for, as the callbacks run in the pymongo monitor threads. When the cluster is locked,
+        it is being reconciled, which checks the replica set and does any pending restore anyway.
+        :param cluster_object: The cluster configuration object for the replica set.
+        :return: The acquired lock, which must be released by the caller, or None if we are on standby, the cluster
+            is owned by another operator replica, or it is locked.
+        """
+        key = cluster_object.metadata.namespace, cluster_object.metadata.name
+        if not self._active or not self._is_owner(key):
+            return None
+        lock = self._cluster_locks.get(key)
+        if not lock.acquire(blocking=False):
+            return None
+        return lock
 
     def _executeAdminCommand(self, cluster_object: V1MongoClusterConfiguration, mongo_command: str, *args, **kwargs
                              ) -> Optional[Dict[str, any]]:
         """
         Executes the given mongo command on the MongoDB cluster.
-        Retries a few times in case we receive a handshake failure.
-        :param name: The name of the cluster.
-        :param namespace: The namespace of the cluster.
+        Connection failures are not retried here, the caller is expected to retry the whole check later.
+        :param cluster_object: The cluster object from the YAML file.
         :param mongo_command: The command to be executed in mongo.
         :return: The response from MongoDB. See files in `tests/fixtures/mongo_responses` for examples.
         :raise ValueError: If the result could not be parsed.
-        :raise TimeoutError: If we could not connect after retrying.
-        """
-        logging.info("Execution of admin command %s in %d connected replicas.", mongo_command, self._connected_replica_sets.__len__())
-        for _ in range(self.MONGO_COMMAND_RETRIES):
-            try:
-                name = cluster_object.metadata.name
-                if name not in self._connected_replica_sets:
-                    self._connected_replica_sets[name] = self._createMongoClientForReplicaSet(cluster_object)
-                return self._connected_replica_sets[name].admin.command(mongo_command, *args, **kwargs)
-            except ConnectionFailure as err:
-                logging.error("Exception while trying to connect to Mongo: %s", str(err))
-            logging.info("Command timed out, waiting %s seconds before trying again (attempt %s/%s)",
-                         self.MONGO_COMMAND_WAIT, _, self.MONGO_COMMAND_RETRIES)
-            sleep(self.MONGO_COMMAND_WAIT)
-
-        raise TimeoutError("Could not execute command after {} retries!".format(self.MONGO_COMMAND_RETRIES))
+        :raise ConnectionFailure: If we could not connect to the replica set.
+        """
+        logging.info("Execution of admin command %s in %d connected replicas.", mongo_command,
+                     len(self._connected_replica_sets))
+        self.connect(cluster_object)
+        try:
+            client = self._connected_replica_sets[cluster_object.metadata.name]
+            return client.admin.command(mongo_command, *args, **kwargs)
+        except ConnectionFailure as err:
+            logging.error("Exception while trying to connect to Mongo: %s", str(err))
+            raise
@@ -1,45 +1,50 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-import threading
 from unittest import TestCase
-from unittest.mock import patch, call
+from unittest.mock import patch, call, ANY
 
 from mongoOperator.MongoOperator import MongoOperator
 
 
+@patch("mongoOperator.MongoOperator.Settings.SHARDING_ENABLED", False)
+@patch("mongoOperator.MongoOperator.Settings.SPEC_HASH_KEY", "test-key")
+@patch("mongoOperator.MongoOperator.asyncio")
+@patch("mongoOperator.MongoOperator.ClusterManager")
 class TestMongoOperator(TestCase):
     maxDiff = None
 
-    @patch("mongoOperator.MongoOperator.sleep")
-    @patch("mongoOperator.MongoOperator.ClusterManager")
-    def test_run(self, checker_mock, sleep_mock):
-        checker_mock.return_value.collectGarbage.side_effect = None, Exception()  # break the 2nd run
+    def test_run_with_interrupt(self, manager_mock, asyncio_mock):
+        asyncio_mock.get_event_loop.return_value.run_forever.side_effect = KeyboardInterrupt
 
-        operator = MongoOperator(sleep_per_run=0.01)
-        with self.assertRaises(Exception):
-            operator.run_forever()
-
-        expected_calls = [
-            call(),
-            call().checkExistingClusters(), call().collectGarbage(),
-            call().checkExistingClusters(), call().collectGarbage(),
-        ]
-        self.assertEqual(expected_calls, checker_mock.mock_calls)
-        self.assertEqual([call(0.01)], sleep_mock.mock_calls)
-
-    @patch("mongoOperator.MongoOperator.sleep")
-    @patch("mongoOperator.MongoOperator.ClusterManager")
-    def test_run_with_interrupt(self, checker_mock, sleep_mock):
-        sleep_mock.side_effect = None, KeyboardInterrupt  # we force stop on the 2nd run
-
-        operator = MongoOperator(sleep_per_run=0.01)
+        operator = MongoOperator()
         operator.run_forever()
 
-        expected_calls = [
-            call(),
-            call().checkExistingClusters(), call().collectGarbage(),
-            call().checkExistingClusters(), call().collectGarbage(),
-        ]
-        self.assertEqual(expected_calls, checker_mock.mock_calls)
-        self.assertEqual([call(0.01), call(0.01)], sleep_mock.mock_calls)
+        manager = manager_mock.return_value
+        self.assertEqual([call.startInformers(), call.warmUp(), call.lead(on_stopped_leading=operator._stopLeading)],
+                         manager.mock_calls[:3])
+        manager.leaveShards.assert_called_once_with()
+        manager.stop.assert_called_once_with()
+        manager.processQueue.assert_called_with()
+        manager.checkAndBackupIfNeeded.assert_called_once_with()
+        manager.resyncPeriodically.assert_called_once_with()
+
+    def test___init___without_spec_hash_key(self, manager_mock, asyncio_mock):
+        with patch("mongoOperator.MongoOperator.Settings.SPEC_HASH_KEY", ""), self.assertRaises(ValueError):
+            MongoOperator()
+        manager_mock.assert_not_called()
+
+    def test_stopLeading(self, manager_mock, asyncio_mock):
+        operator = MongoOperator()
+        ioloop = asyncio_mock.get_event_loop.return_value
+        ioloop.run_forever.side_effect = operator._stopLeading
+
+        with self.assertRaises(SystemExit) as context:
+            operator.run_forever()
+
+        self.assertEqual(1, context.exception.code)
+        ioloop.call_soon_threadsafe.assert_called_once_with(ioloop.stop)
+        manager = manager_mock.return_value
+        self.assertEqual([call(), call()], manager.stop.mock_calls)  # by the lost leadership and after the loop
+        manager.leaveShards.assert_not_called()
+        self.assertEqual([call(ANY), call(ANY)], ioloop.create_task.mock_calls)
@@ -4,6 +4,7 @@
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from tests.test_utils import getExampleClusterDefinition
@@ -21,16 +22,20 @@ class TestAdminSecretChecker(TestCase):
     def test_getClusterName(self):
         self.assertEqual("mongo_cluster", self.checker.getClusterName("mongo_cluster-admin-credentials"))
 
+    def test_getClusterKey(self):
+        secret = KubernetesResources.createSecret(self.secret_name, "ns", {})
+        self.assertEqual(("ns", self.cluster_object.metadata.name), self.checker.getClusterKey(secret))
+
     def test_listResources(self):
         result = self.checker.listResources()
-        self.assertEqual(self.kubernetes_service.listAllSecretsWithLabels.return_value.items, result)
+        self.assertEqual(self.kubernetes_service.listAllSecretsWithLabels.return_value, result)
         self.kubernetes_service.listAllSecretsWithLabels.assert_called_once_with()
 
     def test_getResource(self):
         result = self.checker.getResource(self.cluster_object)
-        self.kubernetes_service.getSecret.assert_called_once_with(self.secret_name,
-                                                                  self.cluster_object.metadata.namespace)
-        self.assertEqual(self.kubernetes_service.getSecret.return_value, result)
+        self.kubernetes_service.getSecretMetadata.assert_called_once_with(self.secret_name,
+                                                                          self.cluster_object.metadata.namespace)
+        self.assertEqual(self.kubernetes_service.getSecretMetadata.return_value, result)
 
     @patch("mongoOperator.helpers.resourceCheckers.AdminSecretChecker.b64encode")
     def test_createResource(self, b64encode_mock):
@@ -39,7 +44,8 @@ class TestAdminSecretChecker(TestCase):
         self.assertEqual(self.kubernetes_service.createSecret.return_value, result)
         self.kubernetes_service.createSecret.assert_called_once_with(
             self.secret_name, self.cluster_object.metadata.namespace, {"username": "root",
-                                                                       "password": "random-password"}
+                                                                       "password": "random-password"},
+            owner_references=None
         )
 
     @patch("mongoOperator.helpers.resourceCheckers.AdminSecretChecker.b64encode")
@@ -49,7 +55,8 @@ class TestAdminSecretChecker(TestCase):
         self.assertEqual(self.kubernetes_service.updateSecret.return_value, result)
         self.kubernetes_service.updateSecret.assert_called_once_with(
             self.secret_name, self.cluster_object.metadata.namespace, {"username": "root",
-                                                                       "password": "random-password"}
+                                                                       "password": "random-password"},
+            owner_references=None
         )
 
     def test_deleteResource(self):
@@ -0,0 +1,51 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+from unittest import TestCase
+
+from mongoOperator.helpers.AsyncWatch import AsyncWatch
+
+
+class TestAsyncWatch(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        super().tearDown()
+
+    @staticmethod
+    async def _collect(stream_factory):
+        return [event async for event in AsyncWatch(stream_factory)]
+
+    def test_events(self):
+        events = [{"type": "ADDED"}, {"type": "DELETED"}]
+        self.assertEqual(events, self.loop.run_until_complete(self._collect(lambda: iter(events))))
+
+    def test_error(self):
+        def stream():
+            yield {"type": "ADDED"}
+            raise ValueError("stream broken")
+
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(self._collect(stream))
+
+    def test_concurrent_watches(self):
+        # the first watch blocks until the second one produced its event, which requires both to run concurrently.
+        second_received = threading.Event()
+
+        def blocking_stream():
+            second_received.wait(5)
+            yield {"type": "FIRST"}
+
+        async def second():
+            result = await self._collect(lambda: iter([{"type": "SECOND"}]))
+            second_received.set()
+            return result
+
+        results = self.loop.run_until_complete(asyncio.gather(self._collect(blocking_stream), second()))
+        self.assertEqual([[{"type": "FIRST"}], [{"type": "SECOND"}]], results)
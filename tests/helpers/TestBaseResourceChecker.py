@@ -1,13 +1,19 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
 from unittest import TestCase
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock, call, patch
 
+from kubernetes.client import V1ObjectMeta, V1Service
 from kubernetes.client.rest import ApiException
 
+from Settings import Settings
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.AsyncKubernetesService import AsyncKubernetesService
 from tests.test_utils import getExampleClusterDefinition
 
 
@@ -18,6 +24,16 @@ class TestBaseResourceChecker(TestCase):
         self.kubernetes_service = MagicMock()
         self.checker = BaseResourceChecker(self.kubernetes_service)
         self.cluster_object = V1MongoClusterConfiguration(**getExampleClusterDefinition())
+        self.async_kubernetes_service = AsyncKubernetesService(self.kubernetes_service, concurrency=4)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        self.async_kubernetes_service.close()
+        super().tearDown()
+
+    def _cleanResources(self, cluster_keys):
+        self.loop.run_until_complete(self.checker.cleanResources(cluster_keys, self.async_kubernetes_service))
 
     def test_getClusterName(self):
         self.assertEqual("", self.checker.getClusterName(""))
@@ -41,6 +57,31 @@ class TestBaseResourceChecker(TestCase):
         self.checker.updateResource.assert_called_once_with(self.cluster_object)
         self.assertEqual([], self.kubernetes_service.mock_calls)
 
+    def test_checkResource_up_to_date(self):
+        desired = V1Service(metadata=V1ObjectMeta(annotations={KubernetesResources.SPEC_HASH_ANNOTATION: "abc"}))
+        self.checker.getResource = MagicMock(return_value=desired)
+        self.checker.buildResource = MagicMock(return_value=desired)
+        self.checker.updateResource = MagicMock()
+        self.assertEqual(desired, self.checker.checkResource(self.cluster_object))
+        self.checker.updateResource.assert_not_called()
+
+    def test_checkResource_changed(self):
+        live = V1Service(metadata=V1ObjectMeta(annotations={KubernetesResources.SPEC_HASH_ANNOTATION: "abc"}))
+        desired = V1Service(metadata=V1ObjectMeta(annotations={KubernetesResources.SPEC_HASH_ANNOTATION: "def"}))
+        self.checker.getResource = MagicMock(return_value=live)
+        self.checker.buildResource = MagicMock(return_value=desired)
+        self.checker.updateResource = MagicMock()
+        self.assertEqual(self.checker.updateResource.return_value, self.checker.checkResource(self.cluster_object))
+        self.checker.updateResource.assert_called_once_with(self.cluster_object)
+
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.Settings.SERVER_SIDE_APPLY", True)
+    def test_checkResource_apply(self):
+        self.checker.getResource = MagicMock(side_effect=ApiException(404))
+        self.checker.applyResource = MagicMock()
+        result = self.checker.checkResource(self.cluster_object)
+        self.assertEqual(self.checker.applyResource.return_value, result)
+        self.checker.applyResource.assert_called_once_with(self.cluster_object)
+
     def test_checkResource_error(self):
         self.checker.getResource = MagicMock(side_effect=ApiException(400))
         with self.assertRaises(ApiException):
@@ -49,32 +90,50 @@ class TestBaseResourceChecker(TestCase):
 
     def test_cleanResources_empty(self):
         self.checker.listResources = MagicMock(return_value=[])
-        self.checker.cleanResources()
+        self._cleanResources(set())
         self.assertEqual([], self.kubernetes_service.mock_calls)
 
+    @staticmethod
+    def _createService(name, namespace="mongo-operator-cluster", labels=None):
+        return V1Service(metadata=V1ObjectMeta(name=name, namespace=namespace, labels=labels))
+
     def test_cleanResources_found(self):
-        self.kubernetes_service.getMongoObject.return_value = self.cluster_object
-        self.checker.listResources = MagicMock(return_value=[self.cluster_object])
-        self.checker.cleanResources()
-        self.assertEqual([call.getMongoObject("mongo-cluster", "mongo-operator-cluster")],
-                         self.kubernetes_service.mock_calls)
-
-    def test_cleanResources_not_found(self):
-        self.kubernetes_service.getMongoObject.side_effect = ApiException(404)
-        self.checker.listResources = MagicMock(return_value=[self.cluster_object])
+        self.checker.listResources = MagicMock(return_value=[
+            self._createService("mongo-cluster", labels=KubernetesResources.createDefaultLabels("mongo-cluster")),
+            self._createService("unlabelled"),
+        ])
         self.checker.deleteResource = MagicMock()
-        self.checker.cleanResources()
-        self.assertEqual([call.getMongoObject("mongo-cluster", "mongo-operator-cluster")],
-                         self.kubernetes_service.mock_calls)
-        self.checker.deleteResource.assert_called_once_with("mongo-cluster", "mongo-operator-cluster")
+        self._cleanResources({("mongo-operator-cluster", "mongo-cluster")})
+        self.checker.deleteResource.assert_not_called()
+        self.assertEqual([], self.kubernetes_service.mock_calls)
+
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.asyncio.sleep")
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.Settings.GC_BATCH_SIZE", 2)
+    def test_cleanResources_not_found(self, sleep_mock):
+        labels = KubernetesResources.createDefaultLabels("mongo-cluster")
+        self.checker.listResources = MagicMock(return_value=[
+            self._createService("mongo-cluster", labels=labels),
+            self._createService("svc-mongo-cluster-internal", labels=labels),
+            self._createService("other", labels=KubernetesResources.createDefaultLabels("other")),
+            self._createService("third", namespace="other-ns", labels=KubernetesResources.createDefaultLabels("third")),
+        ])
+        self.checker.deleteResource = MagicMock()
+        self._cleanResources(set())
+        self.assertCountEqual([call("mongo-cluster", "mongo-operator-cluster"), call("other", "mongo-operator-cluster"),
+                               call("third", "other-ns")], self.checker.deleteResource.mock_calls)
+        sleep_mock.assert_called_once_with(Settings.GC_BATCH_INTERVAL)
+        self.assertEqual([], self.kubernetes_service.mock_calls)
 
     def test_cleanResources_error(self):
-        self.kubernetes_service.getMongoObject.side_effect = ApiException(400)
-        self.checker.listResources = MagicMock(return_value=[self.cluster_object])
-        with self.assertRaises(ApiException):
-            self.checker.cleanResources()
-        self.assertEqual([call.getMongoObject("mongo-cluster", "mongo-operator-cluster")],
-                         self.kubernetes_service.mock_calls)
+        labels = KubernetesResources.createDefaultLabels
+        self.checker.listResources = MagicMock(return_value=[
+            self._createService("mongo-cluster", labels=labels("mongo-cluster")),
+            self._createService("other", labels=labels("other")),
+        ])
+        self.checker.deleteResource = MagicMock(side_effect=[ApiException(400), None])
+        self._cleanResources(set())
+        expected = [call("mongo-cluster", "mongo-operator-cluster"), call("other", "mongo-operator-cluster")]
+        self.assertCountEqual(expected, self.checker.deleteResource.mock_calls)
 
     def test_listResources(self):
         with self.assertRaises(NotImplementedError):
@@ -92,6 +151,10 @@ class TestBaseResourceChecker(TestCase):
         with self.assertRaises(NotImplementedError):
             self.checker.updateResource(self.cluster_object)
 
+    def test_applyResource(self):
+        with self.assertRaises(NotImplementedError):
+            self.checker.applyResource(self.cluster_object)
+
     def test_deleteResource(self):
         with self.assertRaises(NotImplementedError):
             self.checker.deleteResource("name", "namespace")
@@ -1,8 +1,13 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
+import threading
 from unittest import TestCase
-from unittest.mock import patch, call
+from unittest.mock import patch, call, MagicMock
+
+from kubernetes.client.rest import ApiException
+
 from mongoOperator.ClusterManager import ClusterManager
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from tests.test_utils import getExampleClusterDefinition
@@ -28,10 +33,17 @@ class TestClusterManager(TestCase):
 
     def test___init__(self):
         self.assertEqual(self.kubernetes_service, self.checker._kubernetes_service)
+        self.assertEqual(self.kubernetes_service, self.checker._async_kubernetes_service.kubernetes_service)
         self.assertEqual(self.kubernetes_service, self.checker._mongo_service._kubernetes_service)
         self.assertEqual(3, len(self.checker._resource_checkers), self.checker._resource_checkers)
         self.assertEqual({}, self.checker._cluster_versions)
 
+    def test___init___event_handlers(self):
+        self.kubernetes_service.mongo_informer.addEventHandler.assert_called_once_with(
+            self.checker._onMongoObjectEvent)
+        self.kubernetes_service.stateful_set_informer.addEventHandler.assert_called_once_with(
+            self.checker._onResourceEvent)
+
     def test__parseConfiguration_ok(self):
         self.assertEqual(self.cluster_object, self.checker._parseConfiguration(self.cluster_dict))
 
@@ -39,24 +51,22 @@ class TestClusterManager(TestCase):
         self.assertIsNone(self.checker._parseConfiguration({"invalid": "dict"}))
 
     def test_checkExistingClusters_empty(self):
-        self.kubernetes_service.listMongoObjects.return_value = {"items": []}
+        self.kubernetes_service.listMongoObjects.return_value = iter([])
         self.checker.checkExistingClusters()
-        expected = [call.listMongoObjects()]
-        self.assertEqual(expected, self.kubernetes_service.mock_calls)
+        self.kubernetes_service.listMongoObjects.assert_called_once_with()
         self.assertEqual({}, self.checker._cluster_versions)
 
     def test_checkExistingClusters_bad_format(self):
-        self.kubernetes_service.listMongoObjects.return_value = {"items": [{"invalid": "object"}]}
+        self.kubernetes_service.listMongoObjects.return_value = iter([{"invalid": "object"}])
         self.checker.checkExistingClusters()
-        expected = [call.listMongoObjects()]
-        self.assertEqual(expected, self.kubernetes_service.mock_calls)
+        self.kubernetes_service.listMongoObjects.assert_called_once_with()
         self.assertEqual({}, self.checker._cluster_versions)
 
     @patch("mongoOperator.services.MongoService.MongoClient")
     @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
     def test_checkExistingClusters(self, backup_mock, mongo_client_mock):
         self.checker._cluster_versions[("mongo-cluster", self.cluster_object.metadata.namespace)] = "100"
-        self.kubernetes_service.listMongoObjects.return_value = {"items": [self.cluster_dict]}
+        self.kubernetes_service.listMongoObjects.return_value = iter([self.cluster_dict])
         mongo_client_mock.return_value.admin.command.return_value = self._getMongoFixture("replica-status-ok")
         self.checker.checkExistingClusters()
         self.assertEqual({("mongo-cluster", self.cluster_object.metadata.namespace): "100"},
@@ -66,12 +76,38 @@ class TestClusterManager(TestCase):
         backup_mock.assert_called_once_with(self.cluster_object)
 
     @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.cleanResources")
-    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.listResources")
-    def test_collectGarbage(self, list_mock, clean_mock):
-        list_mock.return_value = [self.cluster_object]
-        self.checker.collectGarbage()
-        self.assertEqual([call()] * 3, clean_mock.mock_calls)
-        self.assertEqual([], self.kubernetes_service.mock_calls)  # k8s is not called because we mocked everything
+    def test_collectGarbage(self, clean_mock):
+        created_dict = {"metadata": {"name": "created", "namespace": "default"}}
+        self.kubernetes_service.listMongoObjects.return_value = iter([self.cluster_dict])
+        self.kubernetes_service.mongo_informer.cache.synced = True
+        self.kubernetes_service.mongo_informer.cache.list.return_value = [created_dict]
+        asyncio.run(self.checker.collectGarbage())
+        expected = call({(self.cluster_object.metadata.namespace, "mongo-cluster"), ("default", "created")},
+                        self.checker._async_kubernetes_service)
+        self.assertEqual([expected] * len(self.checker._resource_checkers), clean_mock.mock_calls)
+        self.kubernetes_service.listMongoObjects.assert_called_once_with()
+
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.cleanResources")
+    def test_collectGarbage_not_synced(self, clean_mock):
+        self.kubernetes_service.mongo_informer.cache.synced = False
+        self.kubernetes_service.listMongoObjects.return_value = iter([self.cluster_dict])
+        asyncio.run(self.checker.collectGarbage())
+        expected = call({(self.cluster_object.metadata.namespace, "mongo-cluster")},
+                        self.checker._async_kubernetes_service)
+        self.assertEqual([expected] * len(self.checker._resource_checkers), clean_mock.mock_calls)
+        self.kubernetes_service.mongo_informer.cache.list.assert_not_called()
+
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.cleanResources")
+    def test_collectGarbage_list_failed(self, clean_mock):
+        def listMongoObjects():
+            yield self.cluster_dict
+            raise ApiException(status=500)
+
+        self.kubernetes_service.mongo_informer.cache.synced = True
+        self.kubernetes_service.listMongoObjects.side_effect = listMongoObjects
+        with self.assertRaises(ApiException):
+            asyncio.run(self.checker.collectGarbage())
+        clean_mock.assert_not_called()
 
     @patch("mongoOperator.services.MongoService.MongoClient")
     @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
@@ -98,3 +134,105 @@ class TestClusterManager(TestCase):
         self.assertEqual([call(self.cluster_object)] * 3, check_mock.mock_calls)
         backup_mock.assert_called_once_with(self.cluster_object)
         self.assertEqual([call(self.kubernetes_service.getSecret())], admin_mock.mock_calls)
+
+    @patch("mongoOperator.ClusterManager.ClusterManager._checkCluster")
+    def test_reconcile(self, check_mock):
+        namespace = self.cluster_object.metadata.namespace
+        self.kubernetes_service.getMongoObject.return_value = self.cluster_dict
+        self.checker.reconcile((namespace, "mongo-cluster"))
+        self.kubernetes_service.getMongoObject.assert_called_once_with("mongo-cluster", namespace)
+        check_mock.assert_called_once_with(self.cluster_object)
+
+    @patch("mongoOperator.ClusterManager.ClusterManager.collectGarbage")
+    def test_reconcile_removed(self, garbage_mock):
+        self.checker._cluster_versions[("mongo-cluster", "mongo-operator-cluster")] = "100"
+        self.kubernetes_service.getMongoObject.side_effect = ApiException(status=404)
+        self.checker.reconcile(("mongo-operator-cluster", "mongo-cluster"))
+        self.assertEqual({}, self.checker._cluster_versions)
+        self.assertEqual({}, self.checker._cluster_locks._locks)  # the lock of the removed cluster is dropped
+        garbage_mock.assert_not_called()
+
+    def test__onMongoObjectEvent(self):
+        self.checker._onMongoObjectEvent("ADDED", self.cluster_dict)
+        self.checker._onMongoObjectEvent("MODIFIED", self.cluster_dict)
+        self.assertEqual(1, len(self.checker._work_queue))
+        self.assertEqual((self.cluster_object.metadata.namespace, "mongo-cluster"),
+                         self.checker._work_queue.get(timeout=0))
+
+    def test__onResourceEvent(self):
+        stateful_set = MagicMock()
+        stateful_set.metadata.namespace = "mongo-operator-cluster"
+        stateful_set.metadata.labels = {"name": "mongo-cluster"}
+        self.checker._onResourceEvent("MODIFIED", stateful_set)
+        stateful_set.metadata.labels = {}
+        self.checker._onResourceEvent("MODIFIED", stateful_set)
+        self.assertEqual(1, len(self.checker._work_queue))
+        self.assertEqual(("mongo-operator-cluster", "mongo-cluster"), self.checker._work_queue.get(timeout=0))
+
+    def test__onMongoObjectEvent_not_owner(self):
+        self.checker._shard_membership = MagicMock()
+        self.checker._shard_membership.isOwner.return_value = False
+        self.checker._onMongoObjectEvent("ADDED", self.cluster_dict)
+        self.assertEqual(0, len(self.checker._work_queue))
+        self.checker._shard_membership.isOwner.assert_called_once_with((self.cluster_object.metadata.namespace,
+                                                                        "mongo-cluster"))
+
+    def test__onShardMembersChanged(self):
+        namespace = self.cluster_object.metadata.namespace
+        other_dict = {"metadata": {"name": "other", "namespace": namespace}}
+        self.kubernetes_service.mongo_informer.cache.list.return_value = [self.cluster_dict, other_dict]
+        self.checker._shard_membership = MagicMock()
+        self.checker._shard_membership.isOwner.side_effect = lambda key: key[1] == "other"
+        self.checker._onShardMembersChanged()
+        self.assertEqual(1, len(self.checker._work_queue))
+        self.assertEqual((namespace, "other"), self.checker._work_queue.get(timeout=0))
+
+    def test__runCheckers(self):
+        order = []
+        for checker in self.checker._resource_checkers:
+            checker.checkResource = MagicMock(side_effect=lambda _, name=type(checker).__name__: order.append(name))
+        self.checker._runCheckers(self.cluster_object)
+        self.assertEqual(len(self.checker._resource_checkers), len(order))
+        self.assertEqual("StatefulSetChecker", order[-1])
+        for checker in self.checker._resource_checkers:
+            checker.checkResource.assert_called_once_with(self.cluster_object)
+
+    def test_checkAndBackupIfNeeded(self):
+        key = (self.cluster_object.metadata.namespace, "mongo-cluster")
+        self.kubernetes_service.mongo_informer.cache.list.return_value = [self.cluster_dict]
+        self.kubernetes_service.mongo_informer.cache.get.return_value = self.cluster_dict
+        self.checker._backup_checker = MagicMock()
+        acquired = []
+
+        def backup(cluster_object):
+            thread = threading.Thread(target=lambda: acquired.append(self.checker._cluster_locks.acquire(key, False)))
+            thread.start()
+            thread.join(5)
+            self.checker._stopping.set()
+
+        self.checker._backup_checker.backup_if_needed.side_effect = backup
+        self.checker.checkAndBackupIfNeeded()
+        self.kubernetes_service.mongo_informer.cache.get.assert_called_once_with(*key)
+        self.checker._backup_checker.is_backup_needed.assert_called_once_with(self.cluster_object)
+        self.checker._backup_checker.backup_if_needed.assert_called_once_with(self.cluster_object)
+        self.assertEqual([True], acquired)  # the cluster was not locked during the backup
+
+    def test_checkAndBackupIfNeeded_not_needed(self):
+        self.kubernetes_service.mongo_informer.cache.list.return_value = [self.cluster_dict]
+        self.kubernetes_service.mongo_informer.cache.get.return_value = self.cluster_dict
+        self.checker._backup_checker = MagicMock()
+        self.checker._backup_checker.is_backup_needed.side_effect = lambda _: self.checker._stopping.set() or False
+        self.checker.checkAndBackupIfNeeded()
+        self.checker._backup_checker.backup_if_needed.assert_not_called()
+        self.assertEqual({}, self.checker._cluster_locks._locks)
+
+    def test_stop(self):
+        self.checker._work_queue.add(("mongo-operator-cluster", "mongo-cluster"))
+        self.checker.stop()
+        # all loops return at once, without starting any new work
+        self.checker.processQueue()
+        self.checker.resyncPeriodically()
+        self.checker.checkAndBackupIfNeeded()
+        self.kubernetes_service.getMongoObject.assert_not_called()
+        self.kubernetes_service.mongo_informer.cache.list.assert_not_called()
+        self.assertFalse(self.checker._mongo_service._active)
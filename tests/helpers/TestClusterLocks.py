@@ -0,0 +1,55 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from unittest import TestCase
+
+from mongoOperator.helpers.ClusterLocks import ClusterLocks
+
+
+class TestClusterLocks(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.locks = ClusterLocks()
+
+    def test_reentrant(self):
+        with self.locks.get(("ns", "one")):
+            with self.locks.get(("ns", "one")):
+                self.assertEqual(1, len(self.locks._locks))
+            self.assertEqual(1, len(self.locks._locks))
+        self.assertEqual({}, self.locks._locks)
+
+    def test_release_not_held(self):
+        with self.assertRaises(RuntimeError):
+            self.locks.release(("ns", "one"))
+
+    def test_exclusive(self):
+        acquired = []
+
+        def acquire(key):
+            acquired.append(self.locks.get(key).acquire(blocking=False))
+
+        with self.locks.get(("ns", "one")):
+            for key in (("ns", "one"), ("ns", "two")):
+                thread = threading.Thread(target=acquire, args=(key,))
+                thread.start()
+                thread.join()
+        self.assertEqual([False, True], acquired)
+
+    def test_dropped_after_waiters(self):
+        lock = self.locks.get(("ns", "one"))
+        acquired = threading.Event()
+
+        def wait():
+            with self.locks.get(("ns", "one")):
+                acquired.set()
+
+        with lock:
+            thread = threading.Thread(target=wait)
+            thread.start()
+            while self.locks._locks[("ns", "one")][1] < 2:  # the thread is waiting for the lock
+                thread.join(0.01)
+            self.assertFalse(acquired.is_set())
+        thread.join(5)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual({}, self.locks._locks)
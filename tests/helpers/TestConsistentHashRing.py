@@ -0,0 +1,40 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import Counter
+from unittest import TestCase
+
+from mongoOperator.helpers.ConsistentHashRing import ConsistentHashRing
+
+
+class TestConsistentHashRing(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.keys = [("ns-{}".format(index % 7), "cluster-{}".format(index)) for index in range(3000)]
+
+    def test_getOwner_empty(self):
+        self.assertIsNone(ConsistentHashRing().getOwner(("ns", "cluster")))
+
+    def test_getOwner_balanced(self):
+        ring = ConsistentHashRing(["a", "b", "c"])
+        counts = Counter(ring.getOwner(key) for key in self.keys)
+        self.assertEqual({"a", "b", "c"}, set(counts))
+        for count in counts.values():
+            self.assertTrue(700 < count < 1300, counts)
+
+    def test_getOwner_stable(self):
+        self.assertEqual([ConsistentHashRing(["a", "b"]).getOwner(key) for key in self.keys],
+                         [ConsistentHashRing(["b", "a"]).getOwner(key) for key in self.keys])
+
+    def test_getOwner_member_joins(self):
+        before = ConsistentHashRing(["a", "b", "c"])
+        after = ConsistentHashRing(["a", "b", "c", "d"])
+        moved = [key for key in self.keys if before.getOwner(key) != after.getOwner(key)]
+        self.assertTrue(all(after.getOwner(key) == "d" for key in moved))
+        self.assertTrue(len(moved) < len(self.keys) / 3, len(moved))
+
+    def test_getOwner_member_leaves(self):
+        before = ConsistentHashRing(["a", "b", "c"])
+        after = ConsistentHashRing(["a", "c"])
+        moved = [key for key in self.keys if before.getOwner(key) != after.getOwner(key)]
+        self.assertTrue(all(before.getOwner(key) == "b" for key in moved))
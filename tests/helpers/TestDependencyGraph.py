@@ -0,0 +1,66 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.DependencyGraph import DependencyGraph
+
+
+class TestDependencyGraph(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = ThreadPoolExecutor(4)
+        self.graph = DependencyGraph()
+        self.order = []
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super().tearDown()
+
+    def _task(self, name, barrier=None):
+        def task():
+            if barrier:
+                barrier.wait(timeout=5)  # fails unless the other task runs at the same time
+            self.order.append(name)
+        return task
+
+    def test_run(self):
+        barrier = threading.Barrier(2)
+        self.graph.add("stateful_set", self._task("stateful_set"), depends_on=["secret", "headless"])
+        self.graph.add("secret", self._task("secret", barrier))
+        self.graph.add("headless", self._task("headless", barrier))
+        self.graph.add("service", self._task("service"))
+        self.graph.run(self.executor)
+        self.assertEqual(4, len(self.order))
+        self.assertEqual("stateful_set", self.order[-1])
+
+    def test_run_failure(self):
+        dependant = MagicMock()
+        self.graph.add("secret", MagicMock(side_effect=ValueError("failed")))
+        self.graph.add("service", self._task("service"))
+        self.graph.add("stateful_set", dependant, depends_on=["secret"])
+        with self.assertRaises(ValueError):
+            self.graph.run(self.executor)
+        dependant.assert_not_called()
+        self.assertEqual(["service"], self.order)
+
+    def test_run_unknown(self):
+        self.graph.add("stateful_set", MagicMock(), depends_on=["secret"])
+        with self.assertRaises(ValueError) as context:
+            self.graph.run(self.executor)
+        self.assertEqual("Task stateful_set depends on unknown tasks ['secret']", str(context.exception))
+
+    def test_run_cycle(self):
+        self.graph.add("a", MagicMock(), depends_on=["b"])
+        self.graph.add("b", MagicMock(), depends_on=["a"])
+        with self.assertRaises(ValueError) as context:
+            self.graph.run(self.executor)
+        self.assertEqual("The dependencies of tasks ['a', 'b'] contain a cycle", str(context.exception))
+
+    def test_add_twice(self):
+        self.graph.add("a", MagicMock())
+        with self.assertRaises(ValueError):
+            self.graph.add("a", MagicMock())
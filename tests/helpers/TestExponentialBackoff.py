@@ -0,0 +1,31 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+
+from mongoOperator.helpers.ExponentialBackoff import ExponentialBackoff
+
+
+class TestExponentialBackoff(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.backoff = ExponentialBackoff(base_delay=1.0, max_delay=10.0)
+
+    @patch("mongoOperator.helpers.ExponentialBackoff.random.uniform", lambda low, high: 1.0)
+    def test_failed(self):
+        self.assertEqual([1.0, 2.0, 4.0, 8.0, 10.0, 10.0], [self.backoff.failed("key") for _ in range(6)])
+        self.assertEqual(6, self.backoff.getFailures("key"))
+        self.assertEqual(1.0, self.backoff.failed("other"))
+
+    def test_jitter(self):
+        for _ in range(3):
+            self.backoff.failed("key")
+        delay = self.backoff.failed("key")
+        self.assertTrue(6.4 <= delay <= 9.6, delay)
+
+    def test_succeeded(self):
+        self.backoff.failed("key")
+        self.backoff.succeeded("key")
+        self.assertEqual(0, self.backoff.getFailures("key"))
+        self.backoff.succeeded("unknown")
@@ -0,0 +1,84 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch, call, MagicMock
+
+from mongoOperator.helpers.Informer import Informer
+from mongoOperator.helpers.ObjectView import ObjectView
+from mongoOperator.helpers.ResourceCache import ResourceCache
+from mongoOperator.helpers.ResumableWatch import WatchExpiredError
+
+
+class TestInformer(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_func = MagicMock()
+        self.handler = MagicMock()
+        self.informer = Informer("mongos", self.list_func, "group", cluster_key_func=ResourceCache.getObjectKey,
+                                 label_selector="a=b")
+        self.informer.addEventHandler(self.handler)
+        self.first = {"metadata": {"name": "first", "namespace": "default"}}
+        self.second = {"metadata": {"name": "second", "namespace": "default"}}
+
+    def test__list(self):
+        self.informer.cache.replace([self.first])
+        self.list_func.return_value = {"items": [self.second], "metadata": {"resourceVersion": "12"}}
+        self.assertEqual("12", self.informer._list())
+        self.list_func.assert_called_once_with("group", label_selector="a=b")
+        self.assertEqual([self.second], self.informer.cache.list())
+        self.assertEqual([call("DELETED", self.first), call("ADDED", self.second)], self.handler.mock_calls)
+
+    def test__list_pages(self):
+        self.informer._page_size = 1
+        self.informer.cache.replace([])
+        self.list_func.side_effect = [
+            {"items": [self.first], "metadata": {"resourceVersion": "12", "continue": "token"}},
+            {"items": [self.second], "metadata": {"resourceVersion": "12"}},
+        ]
+        self.assertEqual("12", self.informer._list())
+        self.assertEqual([call("group", label_selector="a=b", limit=1),
+                          call("group", label_selector="a=b", limit=1, _continue="token")],
+                         self.list_func.mock_calls)
+        self.assertEqual([self.first, self.second], self.informer.cache.list())
+
+    @patch("mongoOperator.helpers.Informer.ResumableWatch.stream")
+    def test_decode_func(self, stream_mock):
+        informer = Informer("secrets", self.list_func, cluster_key_func=ResourceCache.getObjectKey,
+                            decode_func=ObjectView)
+        self.list_func.return_value = {"items": [self.first], "metadata": {"resourceVersion": "12"}}
+        stream_mock.return_value = [{"type": "ADDED", "object": self.second}]
+        informer._list()
+        informer._watchFrom("12")
+        self.assertEqual([ObjectView(self.first), ObjectView(self.second)], informer.cache.list())
+        self.assertTrue(all(isinstance(obj, ObjectView) for obj in informer.cache.list()))
+
+    @patch("mongoOperator.helpers.Informer.ResumableWatch.stream")
+    def test__watchFrom(self, stream_mock):
+        stream_mock.return_value = [
+            {"type": "ADDED", "object": self.first},
+            {"type": "MODIFIED", "object": self.second},
+        ]
+        self.informer.cache.replace([])
+        self.informer._watchFrom("12")
+        stream_mock.assert_called_once_with("12")
+        self.assertEqual([self.first, self.second], self.informer.cache.list())
+        self.assertEqual([call("ADDED", self.first), call("MODIFIED", self.second)], self.handler.mock_calls)
+
+    @patch("mongoOperator.helpers.Informer.sleep")
+    @patch("mongoOperator.helpers.Informer.Informer._watchFrom")
+    @patch("mongoOperator.helpers.Informer.Informer._list")
+    def test_run_relists_when_expired(self, list_mock, watch_mock, sleep_mock):
+        list_mock.side_effect = "12", "15", KeyboardInterrupt  # break the 3rd run
+        watch_mock.side_effect = WatchExpiredError("too old")
+        with self.assertRaises(KeyboardInterrupt):
+            self.informer.run()
+        self.assertEqual([call("12"), call("15")], watch_mock.mock_calls)
+        self.assertEqual([], sleep_mock.mock_calls)
+
+    def test__notify_handler_error(self):
+        self.handler.side_effect = ValueError()
+        other_handler = MagicMock()
+        self.informer.addEventHandler(other_handler)
+        self.informer._notify("ADDED", self.first)
+        other_handler.assert_called_once_with("ADDED", self.first)
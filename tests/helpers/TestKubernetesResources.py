@@ -0,0 +1,108 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+import yaml
+from kubernetes.client import V1beta1CustomResourceDefinition, V1beta1JSONSchemaProps, V1Container, \
+    V1SecretKeySelector
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from tests.test_utils import getExampleClusterDefinition
+
+
+class TestKubernetesResources(TestCase):
+    def setUp(self):
+        super().setUp()
+        KubernetesResources.render_cache.clear()
+        self.cluster_object = V1MongoClusterConfiguration(**getExampleClusterDefinition())
+        self.cluster_object.metadata.uid = "a1b2c3"
+        self.cluster_object.metadata.generation = 1
+
+    def test_createStatefulSet_cached(self):
+        stateful_set = KubernetesResources.createStatefulSet(self.cluster_object)
+        self.assertIs(stateful_set, KubernetesResources.createStatefulSet(self.cluster_object))
+        rendered = KubernetesResources._renderStatefulSet(self.cluster_object)
+        self.assertEqual(KubernetesResources.getSpecHash(rendered), KubernetesResources.getSpecHash(stateful_set))
+
+    def test_createStatefulSet_new_generation(self):
+        stateful_set = KubernetesResources.createStatefulSet(self.cluster_object)
+        self.cluster_object.metadata.generation = 2
+        self.cluster_object.spec.mongodb.replicas = 5
+        changed = KubernetesResources.createStatefulSet(self.cluster_object)
+        self.assertEqual(5, changed.spec.replicas)
+        self.assertNotEqual(KubernetesResources.getSpecHash(stateful_set), KubernetesResources.getSpecHash(changed))
+
+    def test_createService_not_stored(self):
+        self.cluster_object.metadata.uid = None
+        service = KubernetesResources.createService(self.cluster_object)
+        self.assertIsNot(service, KubernetesResources.createService(self.cluster_object))
+        self.assertEqual(service, KubernetesResources.createService(self.cluster_object))
+        self.assertEqual(0, len(KubernetesResources.render_cache))
+
+    def test_manifests_equal_models(self):
+        for uid in (None, "a1b2c3"):
+            self.cluster_object.metadata.uid = uid
+            self.assertEqual(KubernetesResources.serialize(KubernetesResources._renderService(self.cluster_object)),
+                             KubernetesResources._renderServiceManifest(self.cluster_object))
+            self.assertEqual(
+                KubernetesResources.serialize(KubernetesResources._renderHeadlessService(self.cluster_object)),
+                KubernetesResources._renderHeadlessServiceManifest(self.cluster_object))
+            self.assertEqual(
+                KubernetesResources.serialize(KubernetesResources._renderStatefulSet(self.cluster_object)),
+                KubernetesResources._renderStatefulSetManifest(self.cluster_object))
+
+    @patch("mongoOperator.helpers.KubernetesResources.Settings.PLAIN_MANIFESTS", True)
+    def test_createSecretBody_plain(self):
+        secret = KubernetesResources.createSecret("name", "ns", {"user": "root"})
+        manifest = KubernetesResources.createSecretBody("name", "ns", {"user": "root"})
+        self.assertEqual(KubernetesResources.serialize(secret), manifest)
+        self.assertEqual(KubernetesResources.getSpecHash(secret), KubernetesResources.getSpecHash(manifest))
+
+    def test_secret_hash_keyed(self):
+        secret = KubernetesResources.createSecret("name", "ns", {"password": "secret"})
+        manifest = KubernetesResources.serialize(secret)
+        del manifest["metadata"]["annotations"]
+        unkeyed_hash = hashlib.sha1(json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        self.assertNotEqual(unkeyed_hash, KubernetesResources.getSpecHash(secret))
+        with patch.object(KubernetesResources, "SPEC_HASH_KEY", b"other-key"):
+            other = KubernetesResources.createSecret("name", "ns", {"password": "secret"})
+        self.assertNotEqual(KubernetesResources.getSpecHash(secret), KubernetesResources.getSpecHash(other))
+
+    @patch("mongoOperator.helpers.KubernetesResources.Settings.PLAIN_MANIFESTS", True)
+    def test_withType_plain(self):
+        manifest = KubernetesResources.createStatefulSetBody(self.cluster_object)
+        typed = KubernetesResources.withType(manifest, "apps/v1", "StatefulSet")
+        self.assertEqual(("apps/v1", "StatefulSet"), (typed["apiVersion"], typed["kind"]))
+        self.assertNotIn("kind", manifest)
+        self.assertIs(manifest, KubernetesResources.createStatefulSetBody(self.cluster_object))
+
+    def test_deserialize_crd(self):
+        with open("mongo_crd.yaml") as crd_file:
+            crd_dict = yaml.safe_load(crd_file)
+        crd = KubernetesResources.deserialize(crd_dict, "V1beta1CustomResourceDefinition")
+        self.assertIsInstance(crd, V1beta1CustomResourceDefinition)
+        self.assertEqual("Mongo", crd.spec.names.kind)
+        self.assertEqual(crd_dict, KubernetesResources.serialize(crd))
+
+    def test_deserialize_stateful_set(self):
+        stateful_set = KubernetesResources._renderStatefulSet(self.cluster_object)
+        result = KubernetesResources.deserialize(KubernetesResources.serialize(stateful_set), "V1beta1StatefulSet")
+        self.assertEqual(stateful_set, result)
+        container = result.spec.template.spec.containers[0]
+        self.assertIsInstance(container, V1Container)
+        self.assertIsInstance(container.env[1].value_from.secret_key_ref, V1SecretKeySelector)
+
+    def test_deserialize_lists_and_dicts(self):
+        schema = KubernetesResources.deserialize({"properties": {"spec": {"properties": {"replicas": {
+            "type": "integer"}}}}, "required": ["spec"]}, "V1beta1JSONSchemaProps")
+        self.assertIsInstance(schema.properties["spec"].properties["replicas"], V1beta1JSONSchemaProps)
+        self.assertEqual(["spec"], schema.required)
+        self.assertEqual([V1Container(name="a")], KubernetesResources.deserialize([{"name": "a"}], "list[V1Container]"))
+        self.assertEqual({"a": 1}, KubernetesResources.deserialize({"a": 1}, "dict(str, int)"))
+        self.assertEqual("text", KubernetesResources.deserialize("text", "V1Container"))
+        self.assertIsNone(KubernetesResources.deserialize(None, "list[str]"))
@@ -0,0 +1,91 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseSpec, V1ObjectMeta
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.LeaderElector import LeaderElector
+
+
+@patch("mongoOperator.helpers.LeaderElector.monotonic")
+class TestLeaderElector(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.kubernetes_service = MagicMock()
+        self.elector = LeaderElector(self.kubernetes_service, "mongo-operator", "default", "me",
+                                     lease_duration=15, renew_deadline=10, retry_period=2)
+        self.lease = V1beta1Lease(
+            metadata=V1ObjectMeta(name="mongo-operator", namespace="default", resource_version="1"),
+            spec=V1beta1LeaseSpec(holder_identity="other", lease_duration_seconds=15, lease_transitions=3,
+                                  renew_time=datetime(2019, 1, 1, tzinfo=timezone.utc)),
+        )
+
+    def test_init_invalid(self, monotonic_mock):
+        with self.assertRaises(ValueError):
+            LeaderElector(self.kubernetes_service, "mongo-operator", "default", "me", lease_duration=10,
+                          renew_deadline=10)
+
+    def test_tryAcquireOrRenew_create(self, monotonic_mock):
+        self.kubernetes_service.getLease.side_effect = ApiException(status=404)
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.assertTrue(self.elector.is_leader)
+        name, namespace, spec = self.kubernetes_service.createLease.call_args[0]
+        self.assertEqual(("mongo-operator", "default", "me", 15),
+                         (name, namespace, spec.holder_identity, spec.lease_duration_seconds))
+
+    def test_tryAcquireOrRenew_create_conflict(self, monotonic_mock):
+        self.kubernetes_service.getLease.side_effect = ApiException(status=404)
+        self.kubernetes_service.createLease.side_effect = ApiException(status=409)
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        self.assertFalse(self.elector.is_leader)
+
+    def test_tryAcquireOrRenew_held_by_other(self, monotonic_mock):
+        self.kubernetes_service.getLease.return_value = self.lease
+        monotonic_mock.return_value = 100.0
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        monotonic_mock.return_value = 114.0
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        self.kubernetes_service.replaceLease.assert_not_called()
+
+        # the lease was not renewed during the lease duration, so we take over.
+        monotonic_mock.return_value = 116.0
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.kubernetes_service.replaceLease.assert_called_once_with(self.lease)
+        self.assertEqual("me", self.lease.spec.holder_identity)
+        self.assertEqual(4, self.lease.spec.lease_transitions)
+
+    def test_tryAcquireOrRenew_renewed_by_other(self, monotonic_mock):
+        self.kubernetes_service.getLease.return_value = self.lease
+        monotonic_mock.return_value = 100.0
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        self.lease.spec.renew_time = datetime(2019, 1, 1, 0, 0, 10, tzinfo=timezone.utc)
+        monotonic_mock.return_value = 116.0
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+
+    def test_tryAcquireOrRenew_renew(self, monotonic_mock):
+        self.lease.spec.holder_identity = "me"
+        self.kubernetes_service.getLease.return_value = self.lease
+        monotonic_mock.return_value = 100.0
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.assertEqual(3, self.lease.spec.lease_transitions)
+
+    def test_tryAcquireOrRenew_conflict(self, monotonic_mock):
+        self.lease.spec.holder_identity = "me"
+        self.kubernetes_service.getLease.return_value = self.lease
+        self.kubernetes_service.replaceLease.side_effect = ApiException(status=409)
+        monotonic_mock.return_value = 100.0
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+
+    @patch("mongoOperator.helpers.LeaderElector.sleep")
+    def test__renewForever(self, sleep_mock, monotonic_mock):
+        times = iter(range(0, 100, 2))
+        monotonic_mock.side_effect = lambda: next(times)
+        self.elector.tryAcquireOrRenew = MagicMock(side_effect=[True, False, False, False, False, False, False])
+        on_stopped_leading = MagicMock()
+        self.elector._renewForever(on_stopped_leading)
+        on_stopped_leading.assert_called_once_with()
+        self.assertFalse(self.elector.is_leader)
@@ -0,0 +1,39 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import call, MagicMock
+
+from mongoOperator.helpers.ListPager import ListPager
+
+
+class TestListPager(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_func = MagicMock()
+        self.first = {"metadata": {"name": "first", "namespace": "default"}}
+        self.second = {"metadata": {"name": "second", "namespace": "default"}}
+
+    def test___iter__(self):
+        self.list_func.side_effect = [
+            {"items": [self.first], "metadata": {"resourceVersion": "12", "continue": "token"}},
+            {"items": [self.second], "metadata": {"resourceVersion": "12"}},
+        ]
+        items = iter(ListPager(self.list_func, "group", page_size=1, label_selector="a=b"))
+        self.assertEqual(self.first, next(items))
+        self.assertEqual(1, self.list_func.call_count)  # the next page is only requested when it is needed
+        self.assertEqual([self.second], list(items))
+        self.assertEqual([call("group", label_selector="a=b", limit=1),
+                          call("group", label_selector="a=b", limit=1, _continue="token")],
+                         self.list_func.mock_calls)
+
+    def test_pages_without_page_size(self):
+        self.list_func.return_value = {"items": None, "metadata": {"resourceVersion": "12"}}
+        self.assertEqual([([], "12")], list(ListPager(self.list_func, label_selector="a=b").pages()))
+        self.list_func.assert_called_once_with(label_selector="a=b")
+
+    def test_parseList_model(self):
+        result = MagicMock(items=[self.first])
+        result.metadata.resource_version = "5"
+        result.metadata._continue = "token"
+        self.assertEqual(([self.first], "5", "token"), ListPager.parseList(result))
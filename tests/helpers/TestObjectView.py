@@ -0,0 +1,44 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from mongoOperator.helpers.ObjectView import ObjectView
+
+
+class TestObjectView(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = {
+            "metadata": {"name": "mongo-cluster", "namespace": "default", "resourceVersion": "12",
+                         "labels": {"name": "mongo-cluster"}, "ownerReferences": [{"kind": "Mongo", "uid": "1"}]},
+            "spec": {"clusterIP": "None", "ports": [{"port": 27017}]},
+            "items": [1, 2],
+        }
+        self.view = ObjectView(self.data)
+
+    def test_attributes(self):
+        self.assertEqual("mongo-cluster", self.view.metadata.name)
+        self.assertEqual("12", self.view.metadata.resource_version)
+        self.assertEqual("Mongo", self.view.metadata.owner_references[0].kind)
+        self.assertEqual("None", self.view.spec.cluster_ip)
+        self.assertEqual(27017, self.view.spec.ports[0].port)
+        self.assertIsNone(self.view.status)
+        self.assertIsNone(self.view.metadata.annotations)
+
+    def test_mapping(self):
+        self.assertEqual("mongo-cluster", self.view.metadata.labels.get("name"))
+        self.assertEqual({"name": "mongo-cluster"}, dict(self.view.metadata.labels))
+        self.assertEqual([1, 2], self.view["items"])
+        self.assertEqual(["metadata", "spec", "items"], list(self.view))
+        self.assertEqual(3, len(self.view))
+        self.assertIs(self.data, self.view.toDict())
+
+    def test_wrap(self):
+        self.assertEqual([ObjectView({"a": 1}), 2], ObjectView.wrap([{"a": 1}, 2]))
+        self.assertEqual("value", ObjectView.wrap("value"))
+
+    def test__getJsonKey(self):
+        self.assertEqual("continue", ObjectView._getJsonKey("_continue"))
+        self.assertEqual("externalIPs", ObjectView._getJsonKey("external_i_ps"))
+        self.assertEqual("someNewField", ObjectView._getJsonKey("some_new_field"))
@@ -0,0 +1,50 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock, patch, call
+
+from mongoOperator.helpers.RateLimiter import RateLimiter, TokenBucket
+
+
+@patch("mongoOperator.helpers.RateLimiter.monotonic")
+class TestTokenBucket(TestCase):
+    def test_reserve(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        bucket = TokenBucket(qps=2, burst=2)
+        self.assertEqual([0.0, 0.0, 0.5, 1.0], [bucket.reserve() for _ in range(4)])
+        monotonic_mock.return_value = 102.0  # refilled 4 tokens, of which 2 were already reserved
+        self.assertEqual([0.0, 0.0, 0.5], [bucket.reserve() for _ in range(3)])
+
+    def test_reserve_unlimited(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        bucket = TokenBucket(qps=0, burst=1)
+        self.assertEqual([0.0] * 5, [bucket.reserve() for _ in range(5)])
+
+
+@patch("mongoOperator.helpers.RateLimiter.sleep")
+@patch("mongoOperator.helpers.RateLimiter.monotonic")
+class TestRateLimiter(TestCase):
+    def test_acquire(self, monotonic_mock, sleep_mock):
+        monotonic_mock.return_value = 100.0
+        limiter = RateLimiter(read_qps=10, read_burst=1, write_qps=1, write_burst=1)
+        self.assertEqual(0.0, limiter.acquire("GET"))
+        self.assertEqual(0.1, limiter.acquire("get"))
+        self.assertEqual(0.0, limiter.acquire("PATCH"))  # the writes have their own budget
+        self.assertEqual(1.0, limiter.acquire("DELETE"))
+        self.assertEqual([call(0.1), call(1.0)], sleep_mock.mock_calls)
+        self.assertEqual({
+            "read": {"requests": 2, "throttled": 1, "wait_seconds": 0.1, "max_wait_seconds": 0.1},
+            "write": {"requests": 2, "throttled": 1, "wait_seconds": 1.0, "max_wait_seconds": 1.0},
+        }, limiter.getStats())
+
+    def test_wrap(self, monotonic_mock, sleep_mock):
+        monotonic_mock.return_value = 100.0
+        limiter = RateLimiter(read_qps=1, read_burst=1, write_qps=1, write_burst=1)
+        call_api = MagicMock()
+        limited = limiter.wrap(call_api)
+        self.assertEqual(call_api.return_value, limited("/api/v1/secrets", "GET", query_params=[]))
+        limited("/api/v1/secrets", "GET")
+        self.assertEqual([call("/api/v1/secrets", "GET", query_params=[]), call("/api/v1/secrets", "GET")],
+                         call_api.call_args_list)
+        sleep_mock.assert_called_once_with(1.0)
@@ -0,0 +1,35 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.RenderCache import RenderCache
+
+
+class TestRenderCache(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = RenderCache(max_size=2)
+
+    def test_getOrRender(self):
+        render = MagicMock(side_effect=["one", "two"])
+        self.assertEqual("one", self.cache.getOrRender("a", render))
+        self.assertEqual("one", self.cache.getOrRender("a", render))
+        self.assertEqual("two", self.cache.getOrRender("b", render))
+        self.assertEqual(2, render.call_count)
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+
+    def test_getOrRender_evicts_least_recently_used(self):
+        self.cache.getOrRender("a", lambda: "a")
+        self.cache.getOrRender("b", lambda: "b")
+        self.cache.getOrRender("a", lambda: "unused")
+        self.cache.getOrRender("c", lambda: "c")
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual("a", self.cache.getOrRender("a", lambda: "new"))
+        self.assertEqual("new b", self.cache.getOrRender("b", lambda: "new b"))
+
+    def test_clear(self):
+        self.cache.getOrRender("a", lambda: "a")
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
@@ -0,0 +1,78 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from kubernetes.client import V1ObjectMeta, V1Service
+
+from mongoOperator.helpers.ResourceCache import ResourceCache
+
+
+class TestResourceCache(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ResourceCache(lambda obj: (obj.metadata.namespace, obj.metadata.labels["name"]))
+        self.service = self._createService("mongo-cluster", "mongo-cluster")
+        self.headless_service = self._createService("svc-mongo-cluster-internal", "mongo-cluster")
+
+    @staticmethod
+    def _createService(name: str, cluster_name: str) -> V1Service:
+        return V1Service(metadata=V1ObjectMeta(name=name, namespace="default",
+                                               labels={"name": cluster_name}))
+
+    def test_replace(self):
+        self.assertFalse(self.cache.synced)
+        self.assertEqual([], self.cache.replace([self.service, self.headless_service]))
+        self.assertTrue(self.cache.synced)
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual([self.service], self.cache.replace([self.headless_service]))
+        self.assertIsNone(self.cache.get("default", "mongo-cluster"))
+
+    def test_get(self):
+        self.cache.replace([self.service])
+        self.assertEqual(self.service, self.cache.get("default", "mongo-cluster"))
+        self.assertIsNone(self.cache.get("other", "mongo-cluster"))
+
+    def test_listByCluster(self):
+        self.cache.replace([self.service, self.headless_service])
+        self.assertCountEqual([self.service, self.headless_service],
+                              self.cache.listByCluster(("default", "mongo-cluster")))
+        self.assertEqual([], self.cache.listByCluster(("other", "mongo-cluster")))
+
+    def test_apply(self):
+        self.cache.replace([])
+        self.cache.apply("ADDED", self.service)
+        self.assertEqual([self.service], self.cache.list())
+        updated = self._createService("mongo-cluster", "mongo-cluster")
+        self.cache.apply("MODIFIED", updated)
+        self.assertIs(updated, self.cache.get("default", "mongo-cluster"))
+        self.cache.apply("DELETED", updated)
+        self.assertEqual([], self.cache.list())
+        self.assertEqual([], self.cache.listByCluster(("default", "mongo-cluster")))
+
+    def test_apply_older(self):
+        self.cache.replace([])
+        self.service.metadata.resource_version = "10"
+        self.cache.apply("MODIFIED", self.service)
+        older = self._createService("mongo-cluster", "mongo-cluster")
+        older.metadata.resource_version = "9"
+        self.cache.apply("MODIFIED", older)
+        self.assertIs(self.service, self.cache.get("default", "mongo-cluster"))
+        self.cache.apply("DELETED", older)
+        self.assertIsNone(self.cache.get("default", "mongo-cluster"))
+
+    def test_apply_not_comparable(self):
+        self.cache.replace([])
+        self.service.metadata.resource_version = "10"
+        self.cache.apply("MODIFIED", self.service)
+        opaque = self._createService("mongo-cluster", "mongo-cluster")
+        opaque.metadata.resource_version = "abc"
+        self.cache.apply("MODIFIED", opaque)
+        self.assertIs(opaque, self.cache.get("default", "mongo-cluster"))
+
+    def test_dict_objects(self):
+        cache = ResourceCache(ResourceCache.getObjectKey)
+        cluster_dict = {"metadata": {"name": "mongo-cluster", "namespace": "default"}}
+        cache.replace([cluster_dict])
+        self.assertEqual(cluster_dict, cache.get("default", "mongo-cluster"))
+        self.assertEqual([cluster_dict], cache.listByCluster(("default", "mongo-cluster")))
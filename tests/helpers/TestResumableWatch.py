@@ -0,0 +1,115 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+from unittest import TestCase
+from unittest.mock import patch, call, MagicMock
+
+from kubernetes.client import AppsV1beta1Api, V1beta1StatefulSet
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import ProtocolError
+
+from mongoOperator.helpers.ResumableWatch import ResumableWatch, WatchExpiredError
+
+
+class FakeResponse:
+    """ Streamed watch response, sending the given events as JSON lines. """
+
+    def __init__(self, *events):
+        self.lines = [json.dumps(event) + "\n" for event in events]
+        self.closed = False
+
+    def read_chunked(self, decode_content=False):
+        for line in self.lines:
+            yield line.encode()
+
+    def close(self):
+        self.closed = True
+
+    def release_conn(self):
+        pass
+
+
+@patch("mongoOperator.helpers.ResumableWatch.sleep")
+class TestResumableWatch(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_func = MagicMock(__name__="list_namespaced_pod")
+        self.watch = ResumableWatch(self.list_func, namespace="default")
+
+    @staticmethod
+    def _event(event_type: str, resource_version: str) -> dict:
+        return {"type": event_type, "object": {"metadata": {"name": "pod", "resourceVersion": resource_version}}}
+
+    @staticmethod
+    def _expired() -> dict:
+        return {"type": "ERROR", "object": {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Failure",
+                                            "message": "too old resource version: 123 (456)", "reason": "Expired",
+                                            "code": 410}}
+
+    def _call(self, **kwargs) -> call:
+        return call(namespace="default", timeout_seconds=300, watch=True, _preload_content=False, **kwargs)
+
+    def test_stream_resumes(self, sleep_mock):
+        self.list_func.side_effect = [
+            FakeResponse(self._event("ADDED", "10"), self._event("BOOKMARK", "12")),  # server closed the connection
+            ApiException(status=500),
+            FakeResponse(self._event("MODIFIED", "14"), self._expired()),
+        ]
+        events = []
+        with self.assertRaises(WatchExpiredError):
+            for event in self.watch.stream("5"):
+                events.append((event["type"], event["object"]["metadata"]["resourceVersion"]))
+
+        self.assertEqual([("ADDED", "10"), ("MODIFIED", "14")], events)
+        self.assertEqual("14", self.watch.resource_version)
+        self.assertEqual([self._call(resource_version="5"), self._call(resource_version="12"),
+                          self._call(resource_version="12")], self.list_func.mock_calls)
+        sleep_mock.assert_called_once_with(ResumableWatch.RETRY_WAIT)
+
+    def test_stream_connection_error(self, sleep_mock):
+        response = FakeResponse(self._event("ADDED", "10"))
+        response.read_chunked = MagicMock(side_effect=ProtocolError("Connection broken"))
+        self.list_func.side_effect = [response, FakeResponse(self._event("ADDED", "11"))]
+        self.assertEqual("11", next(self.watch.stream("5"))["object"]["metadata"]["resourceVersion"])
+        self.assertTrue(response.closed)
+        self.assertEqual([self._call(resource_version="5"), self._call(resource_version="5")],
+                         self.list_func.mock_calls)
+
+    def test_stream_expired_on_request(self, sleep_mock):
+        self.list_func.side_effect = ApiException(status=410, reason="Gone")
+        with self.assertRaises(WatchExpiredError):
+            next(self.watch.stream("5"))
+        sleep_mock.assert_not_called()
+
+    def test_stream_unexpected_error(self, sleep_mock):
+        self.list_func.return_value = FakeResponse(self._event("ADDED", "10"))
+        self.list_func.return_value.lines.append("not json\n")
+        stream = self.watch.stream("5")
+        next(stream)
+        with self.assertRaises(WatchExpiredError):
+            next(stream)
+        self.assertEqual(1, self.list_func.call_count)  # the same version is not tried again
+        sleep_mock.assert_called_once_with(ResumableWatch.RETRY_WAIT)
+
+    def test_stream_from_scratch(self, sleep_mock):
+        self.list_func.return_value = FakeResponse(self._event("ADDED", "10"))
+        self.assertEqual("ADDED", next(self.watch.stream())["type"])
+        self.list_func.assert_called_once_with(namespace="default", timeout_seconds=300, watch=True,
+                                               _preload_content=False)
+
+    def test_stream_stateful_sets(self, sleep_mock):
+        api_client = MagicMock()
+        stateful_set = {"metadata": {"name": "mongo-cluster", "namespace": "default", "resourceVersion": "123"}}
+        api_client.call_api.return_value = FakeResponse({"type": "ADDED", "object": stateful_set}, self._expired())
+        watch = ResumableWatch(AppsV1beta1Api(api_client).list_stateful_set_for_all_namespaces)
+
+        stream = watch.stream("100")
+        event = next(stream)
+        self.assertIsInstance(event["object"], V1beta1StatefulSet)
+        self.assertEqual(stateful_set, event["raw_object"])
+        with self.assertRaises(WatchExpiredError) as context:
+            next(stream)
+        self.assertEqual("too old resource version: 123 (456)", str(context.exception))
+        self.assertEqual(1, api_client.call_api.call_count)
+        sleep_mock.assert_not_called()
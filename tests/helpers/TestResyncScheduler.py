@@ -0,0 +1,54 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from mongoOperator.helpers.ResyncScheduler import ResyncScheduler
+
+
+@patch("mongoOperator.helpers.ResyncScheduler.random.uniform", lambda low, high: 1.0)
+class TestResyncScheduler(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.work_queue = MagicMock()
+        self.scheduler = ResyncScheduler(self.work_queue, interval=300, degraded_interval=30, budget_per_minute=60)
+
+    def test_schedule_health(self):
+        self.assertEqual(300, self.scheduler.schedule(("ns", "healthy"), True))
+        self.assertEqual(30, self.scheduler.schedule(("ns", "degraded"), False))
+
+    def test_schedule_budget(self):
+        for index in range(1000):
+            self.scheduler.schedule(("ns", str(index)), True)
+        for index in range(100):
+            self.scheduler.schedule(("ns", "degraded-" + str(index)), False)
+        intervals = self.scheduler.getIntervals()
+        self.assertEqual({"healthy": 2000.0, "degraded": 200.0}, intervals)
+        resyncs_per_minute = 1000 * 60 / intervals["healthy"] + 100 * 60 / intervals["degraded"]
+        self.assertEqual(60, resyncs_per_minute)
+
+    @patch("mongoOperator.helpers.ResyncScheduler.monotonic")
+    def test__popDue(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.scheduler.schedule(("ns", "one"), False)
+        self.scheduler.schedule(("ns", "two"), True)
+        self.scheduler.schedule(("ns", "three"), False)
+        self.scheduler.schedule(("ns", "three"), True)  # replaces the earlier schedule
+        self.scheduler.schedule(("ns", "removed"), False)
+        self.scheduler.forget(("ns", "removed"))
+        monotonic_mock.return_value = 130.0
+        self.assertEqual([("ns", "one")], self.scheduler._popDue())
+        monotonic_mock.return_value = 400.0
+        self.assertEqual({("ns", "two"), ("ns", "three")}, set(self.scheduler._popDue()))
+
+    def test_stop(self):
+        self.scheduler.schedule(("ns", "one"), True)
+        thread = threading.Thread(target=self.scheduler.run)
+        thread.start()
+        self.scheduler.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.scheduler._popDue())
+        self.work_queue.add.assert_not_called()
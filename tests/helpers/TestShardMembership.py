@@ -0,0 +1,79 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseList, V1beta1LeaseSpec, V1ObjectMeta
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.ShardMembership import ShardMembership
+
+
+@patch("mongoOperator.helpers.ShardMembership.monotonic")
+class TestShardMembership(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.kubernetes_service = MagicMock()
+        self.kubernetes_service.getLease.side_effect = ApiException(status=404)
+        with patch("mongoOperator.helpers.ShardMembership.monotonic", return_value=0.0):
+            self.membership = ShardMembership(self.kubernetes_service, "mongo-operator", "default", "me",
+                                              lease_duration=15, virtual_nodes=10)
+        self.other_lease = self._createLease("other", 1)
+        self.kubernetes_service.listLeases.return_value = V1beta1LeaseList(items=[self.other_lease])
+
+    @staticmethod
+    def _createLease(holder, second):
+        return V1beta1Lease(metadata=V1ObjectMeta(name="mongo-operator-" + holder),
+                            spec=V1beta1LeaseSpec(holder_identity=holder, lease_duration_seconds=15,
+                                                  renew_time=datetime(2019, 1, 1, 0, 0, second, tzinfo=timezone.utc)))
+
+    def test_refresh(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.assertTrue(self.membership.refresh())
+        self.assertEqual({"me", "other"}, self.membership.ring.members)
+        name, namespace, spec, labels = self.kubernetes_service.createLease.call_args[0]
+        self.assertEqual(("default", "me", {"mongo-operator-shard": "mongo-operator"}),
+                         (namespace, spec.holder_identity, labels))
+        self.assertTrue(name.startswith("mongo-operator-"))
+
+        monotonic_mock.return_value = 105.0
+        self.assertFalse(self.membership.refresh())
+
+    def test_refresh_member_left(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.membership.refresh()
+        monotonic_mock.return_value = 116.0
+        self.assertTrue(self.membership.refresh())
+        self.assertEqual({"me"}, self.membership.ring.members)
+        self.kubernetes_service.deleteLease.assert_not_called()
+
+        monotonic_mock.return_value = 161.0
+        self.membership.refresh()
+        self.kubernetes_service.deleteLease.assert_called_once_with("mongo-operator-other", "default")
+
+    def test_refresh_renews(self, monotonic_mock):
+        own_lease = self._createLease("me", 1)
+        self.kubernetes_service.getLease.side_effect = None
+        self.kubernetes_service.getLease.return_value = own_lease
+        monotonic_mock.return_value = 100.0
+        self.membership.refresh()
+        self.kubernetes_service.replaceLease.assert_called_once_with(own_lease)
+        self.assertNotEqual(datetime(2019, 1, 1, 0, 0, 1, tzinfo=timezone.utc), own_lease.spec.renew_time)
+
+    def test_isOwner(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.membership.refresh()
+        keys = [("ns", "cluster-{}".format(index)) for index in range(100)]
+        owned = [key for key in keys if self.membership.isOwner(key)]
+        self.assertTrue(0 < len(owned) < 100)
+
+        # our own lease expired, so we should not touch any cluster
+        monotonic_mock.return_value = 116.0
+        self.assertEqual([], [key for key in keys if self.membership.isOwner(key)])
+
+    def test_leave(self, monotonic_mock):
+        self.kubernetes_service.deleteLease.side_effect = ApiException(status=404)
+        self.membership.leave()
+        self.kubernetes_service.deleteLease.assert_called_once()
@@ -19,8 +19,8 @@ class TestStatefulSetChecker(TestCase):
 
     def test_listResources(self):
         result = self.checker.listResources()
-        self.assertEqual(self.kubernetes_service.listAllStatefulSetsWithLabels.return_value.items, result)
-        self.kubernetes_service.listAllStatefulSetsWithLabels.assert_called_once_with()
+        self.assertEqual(self.kubernetes_service.listAllStatefulSetsWithLabels.return_value, result)
+        self.kubernetes_service.listAllStatefulSetsWithLabels.assert_called_once_with(metadata_only=True)
 
     def test_getResource(self):
         result = self.checker.getResource(self.cluster_object)
@@ -0,0 +1,75 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from mongoOperator.helpers.WorkQueue import WorkQueue
+
+
+class TestWorkQueue(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.queue = WorkQueue()
+
+    def test_add_coalesces(self):
+        self.assertTrue(self.queue.add(("ns", "one")))
+        self.assertFalse(self.queue.add(("ns", "one")))
+        self.assertTrue(self.queue.add(("ns", "two")))
+        self.assertEqual(2, len(self.queue))
+        self.assertEqual(("ns", "one"), self.queue.get())
+        self.assertEqual(("ns", "two"), self.queue.get())
+        self.assertIsNone(self.queue.get(timeout=0))
+
+    def test_add_while_processing(self):
+        self.queue.add(("ns", "one"))
+        key = self.queue.get()
+        self.queue.add(key)
+        self.queue.add(key)
+        self.assertEqual(0, len(self.queue))  # not handed out twice at the same time
+        self.queue.done(key)
+        self.assertEqual(1, len(self.queue))
+        self.assertEqual(key, self.queue.get(timeout=0))
+        self.queue.done(key)
+        self.assertEqual(0, len(self.queue))
+
+    def test_getStats(self):
+        for _ in range(4):
+            self.queue.add(("ns", "one"))
+        self.assertEqual({"depth": 1, "processing": 0, "waiting": 0, "added": 4, "deduplicated": 3,
+                          "dedup_ratio": 0.75},
+                         self.queue.getStats())
+        self.assertEqual(0.75, self.queue.dedup_ratio)
+
+    def test_dedup_ratio_empty(self):
+        self.assertEqual(0.0, self.queue.dedup_ratio)
+
+    @patch("mongoOperator.helpers.WorkQueue.monotonic")
+    def test_addAfter(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.queue.addAfter(("ns", "one"), 5.0)
+        self.queue.addAfter(("ns", "two"), 0)
+        self.assertEqual(("ns", "two"), self.queue.get(timeout=0))
+        self.assertIsNone(self.queue.get(timeout=0))
+        monotonic_mock.return_value = 105.0
+        self.assertEqual(("ns", "one"), self.queue.get(timeout=0))
+
+    def test_addAfter_wakes_up(self):
+        self.queue.addAfter(("ns", "one"), 0.05)
+        self.assertEqual(("ns", "one"), self.queue.get(timeout=5))
+
+    def test_shutDown(self):
+        self.queue.add(("ns", "one"))
+        key = self.queue.get()
+        self.queue.add(("ns", "two"))
+        self.queue.shutDown()
+        self.assertIsNone(self.queue.get())  # does not block
+        self.queue.done(key)
+
+    def test_shutDown_wakes_up(self):
+        thread = threading.Thread(target=self.queue.get)
+        thread.start()
+        self.queue.shutDown()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
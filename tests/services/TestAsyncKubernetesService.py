@@ -0,0 +1,67 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock, call
+
+from mongoOperator.services.AsyncKubernetesService import AsyncKubernetesService
+
+
+class TestAsyncKubernetesService(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.kubernetes_service = MagicMock()
+        self.service = AsyncKubernetesService(self.kubernetes_service, concurrency=4)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        self.service.close()
+        super().tearDown()
+
+    @staticmethod
+    async def _collect(async_iterator):
+        return [item async for item in async_iterator]
+
+    def test_run(self):
+        result = self.loop.run_until_complete(self.service.run(self.kubernetes_service.deleteSecret, "secret",
+                                                               "default"))
+        self.assertEqual([call.deleteSecret("secret", "default")], self.kubernetes_service.mock_calls)
+        self.assertIs(self.kubernetes_service.deleteSecret.return_value, result)
+
+    def test_run_error(self):
+        self.kubernetes_service.deleteSecret.side_effect = ValueError("not found")
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(self.service.run(self.kubernetes_service.deleteSecret, "secret", "default"))
+
+    def test_listMongoObjects(self):
+        self.kubernetes_service.listMongoObjects.return_value = iter(range(5))
+        result = self.loop.run_until_complete(self._collect(self.service.listMongoObjects()))
+        self.assertEqual([0, 1, 2, 3, 4], result)
+        self.assertEqual([call.listMongoObjects()], self.kubernetes_service.mock_calls)
+
+    def test_iterate_pages(self):
+        consumed = []
+
+        def generate():
+            for item in range(5):
+                consumed.append(item)
+                yield item
+
+        async def first():
+            async for item in self.service.iterate(generate, page_size=2):
+                return item
+
+        self.assertEqual(0, self.loop.run_until_complete(first()))
+        self.assertEqual([0, 1], consumed)
+
+    def test_concurrent_calls(self):
+        # each call blocks until all calls were started, which requires them to run concurrently.
+        barrier = threading.Barrier(4, timeout=5)
+        self.kubernetes_service.getService.side_effect = lambda name, namespace: barrier.wait()
+        calls = [self.service.run(self.kubernetes_service.getService, "service-{}".format(index), "default")
+                 for index in range(4)]
+        self.assertCountEqual([0, 1, 2, 3], self.loop.run_until_complete(asyncio.gather(*calls)))
@@ -4,23 +4,26 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import json
 from unittest import TestCase
 from unittest.mock import patch, call, MagicMock
 
 from kubernetes.client import Configuration, V1Secret, V1ObjectMeta, V1Service, \
     V1ServiceSpec, V1ServicePort, V1DeleteOptions, V1beta1StatefulSet, V1beta1StatefulSetSpec, V1PodSpec, V1Container, \
     V1EnvVar, V1EnvVarSource, V1ObjectFieldSelector, V1ContainerPort, V1VolumeMount, V1ResourceRequirements, \
-    V1PersistentVolumeClaim, V1PersistentVolumeClaimSpec, V1PodTemplateSpec, V1beta1CustomResourceDefinitionList, \
-    V1beta1CustomResourceDefinition, V1beta1CustomResourceDefinitionSpec, V1beta1CustomResourceDefinitionNames, V1Status
+    V1PersistentVolumeClaim, V1PersistentVolumeClaimSpec, V1PodTemplateSpec, \
+    V1beta1CustomResourceDefinition, V1beta1CustomResourceDefinitionSpec, V1beta1CustomResourceDefinitionNames, \
+    V1Status, V1OwnerReference
 from kubernetes.client.rest import ApiException
 
+from Settings import Settings
 from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.ObjectView import ObjectView
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
-from mongoOperator.services.KubernetesService import KubernetesService
+from mongoOperator.services.KubernetesService import ApplyConflictError, KubernetesService
 from tests.test_utils import getExampleClusterDefinition, dict_eq
 
 
-@patch("mongoOperator.services.KubernetesService.sleep", MagicMock())
 @patch("mongoOperator.services.KubernetesService.client")
 class TestKubernetesService(TestCase):
     maxDiff = 10000
@@ -89,19 +92,24 @@ class TestKubernetesService(TestCase):
         )
 
     def test___init__(self, client_mock):
-        KubernetesService()
+        service = KubernetesService()
         config = Configuration()
         config.debug = False
+        watch_count = 6  # the informers and the pods
+        config.connection_pool_maxsize = (Settings.RECONCILE_WORKERS * Settings.CHECKER_THREADS + watch_count
+                                          + Settings.GC_BATCH_SIZE)
         expected = [
             call.ApiClient(config),
             call.CoreV1Api(client_mock.ApiClient.return_value),
             call.CustomObjectsApi(client_mock.ApiClient.return_value),
             call.ApiextensionsV1beta1Api(client_mock.ApiClient.return_value),
             call.AppsV1beta1Api(client_mock.ApiClient.return_value),
+            call.CoordinationV1beta1Api(client_mock.ApiClient.return_value),
         ]
 
         with patch("kubernetes.client.configuration.Configuration.__eq__", dict_eq):
             self.assertEqual(expected, client_mock.mock_calls)
+        self.assertEqual(watch_count, len(service.informers) + 1)
 
     def test_createMongoObjectDefinition(self, client_mock):
         service = KubernetesService()
@@ -119,15 +127,15 @@ class TestKubernetesService(TestCase):
             )
         )
 
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value = \
-            V1beta1CustomResourceDefinitionList(items=[])
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.side_effect = \
+            ApiException(status=404)
         client_mock.ApiextensionsV1beta1Api.return_value.create_custom_resource_definition.return_value = expected_def
 
         result = service.createMongoObjectDefinition()
 
         self.assertEqual(expected_def, result)
         expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.javamachr.cz"),
             call.ApiextensionsV1beta1Api().create_custom_resource_definition(expected_def),
         ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
@@ -136,50 +144,124 @@ class TestKubernetesService(TestCase):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
-
         result = service.createMongoObjectDefinition()
 
-        self.assertEqual(item, result)
-
-        expected_calls = [call.ApiextensionsV1beta1Api().list_custom_resource_definition()]
+        self.assertIs(client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.return_value,
+                      result)
+        expected_calls = [
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.javamachr.cz")
+        ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
 
+    def test_getMongoObjectDefinition(self, client_mock):
+        service = KubernetesService()
+        read_mock = client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition
+
+        self.assertEqual(read_mock.return_value, service.getMongoObjectDefinition())
+        self.assertEqual(read_mock.return_value, service.getMongoObjectDefinition())
+        self.assertEqual(1, read_mock.call_count)
+
+        # the informer reports the definition was changed and then deleted
+        changed = MagicMock()
+        service._onMongoDefinitionEvent("MODIFIED", changed)
+        self.assertEqual(changed, service.getMongoObjectDefinition())
+        service._onMongoDefinitionEvent("DELETED", changed)
+        self.assertEqual(read_mock.return_value, service.getMongoObjectDefinition())
+        self.assertEqual(2, read_mock.call_count)
+
+    def test_listMongoObjects_404(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        read_mock = client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition
+        call_api_mock.side_effect = ApiException(status=404)
+
+        with self.assertRaises(ApiException):
+            list(service.listMongoObjects())
+        call_api_mock.side_effect = None
+        call_api_mock.return_value = MagicMock(data=json.dumps({"items": [], "metadata": {}}))
+        self.assertEqual([], list(service.listMongoObjects()))
+        self.assertEqual(2, read_mock.call_count)  # the definition is read again after the 404
+
+    @patch("mongoOperator.services.KubernetesService.ResumableWatch")
+    @patch("mongoOperator.services.KubernetesService.Settings.KUBERNETES_NAMESPACE", "operator-ns")
+    def test_streamPodsOperatedByMe(self, watch_mock, client_mock):
+        service = KubernetesService()
+        watch_mock.return_value.stream.return_value = iter([{"type": "ADDED"}])
+        self.assertEqual({"type": "ADDED"}, next(service.streamPodsOperatedByMe()))
+        watch_mock.assert_called_once_with(client_mock.CoreV1Api.return_value.list_namespaced_pod,
+                                           namespace="operator-ns", label_selector="operated-by=operators.javamachr.cz")
+
+    def test_getMongoObject_cached(self, client_mock):
+        service = KubernetesService()
+        service.mongo_informer.cache.replace([self.cluster_dict])
+        client_mock.reset_mock()
+
+        self.assertEqual(self.cluster_dict, service.getMongoObject(self.name, self.namespace))
+        with self.assertRaises(ApiException) as context:
+            service.getMongoObject("other", self.namespace)
+        self.assertEqual(404, context.exception.status)
+        self.assertEqual([], client_mock.mock_calls)
+
+    def test_listAllServicesWithLabels_cached(self, client_mock):
+        service = KubernetesService()
+        service.service_informer.cache.replace([KubernetesResources.createService(self.cluster_object)])
+        client_mock.reset_mock()
+
+        result = service.listAllServicesWithLabels()
+        self.assertEqual([self.name], [item.metadata.name for item in result])
+        self.assertEqual([], client_mock.mock_calls)
+
     def test_listMongoObjects(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
         service = KubernetesService()
         client_mock.reset_mock()
 
-        item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
+        call_api_mock.side_effect = [
+            MagicMock(data=json.dumps({"items": [{"metadata": {"name": "first"}}], "metadata": {"continue": "token"}})),
+            MagicMock(data=json.dumps({"items": [{"metadata": {"name": "second"}}], "metadata": {}})),
+        ]
+        result = service.listMongoObjects(label_selector="a=b")
+        self.assertEqual([], client_mock.mock_calls)  # nothing is requested until the objects are consumed
+        self.assertEqual(["first", "second"], [item["metadata"]["name"] for item in result])
 
-        result = service.listMongoObjects(param="value")
+        path_params = {"group": "operators.javamachr.cz", "version": "v1", "plural": "mongos"}
+        header_params = {"Accept": "application/json", "Accept-Encoding": "gzip"}
         expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.javamachr.cz", "v1", "mongos", param="value")
+            call("/apis/{group}/{version}/{plural}", "GET", path_params=path_params,
+                 query_params=[("labelSelector", "a=b"), ("limit", 500)], header_params=header_params,
+                 auth_settings=["BearerToken"], _return_http_data_only=True, _preload_content=False),
+            call("/apis/{group}/{version}/{plural}", "GET", path_params=path_params,
+                 query_params=[("labelSelector", "a=b"), ("limit", 500), ("continue", "token")],
+                 header_params=header_params, auth_settings=["BearerToken"], _return_http_data_only=True,
+                 _preload_content=False),
         ]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CustomObjectsApi().list_cluster_custom_object.return_value, result)
+        self.assertEqual(expected_calls, call_api_mock.call_args_list)
 
-    def test_listMongoObjects_400(self, client_mock):
+    def test_mongo_informer_paged(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
         service = KubernetesService()
-        client_mock.reset_mock()
+        call_api_mock.side_effect = [
+            MagicMock(data=json.dumps({"items": [self.cluster_dict], "metadata": {"continue": "token"}})),
+            MagicMock(data=json.dumps({"items": [], "metadata": {"resourceVersion": "42"}})),
+        ]
 
-        item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
-        client_mock.CustomObjectsApi.return_value.list_cluster_custom_object.side_effect = ApiException(400)
+        self.assertEqual("42", service.mongo_informer._list())
+        self.assertEqual(self.cluster_dict, service.mongo_informer.cache.get(self.namespace, self.name))
+        path_params = {"group": "operators.javamachr.cz", "version": "v1", "plural": "mongos"}
+        self.assertEqual([("/apis/{group}/{version}/{plural}", "GET")] * 2,
+                         [mock_call[0][:2] for mock_call in call_api_mock.call_args_list])
+        self.assertEqual([path_params] * 2,
+                         [mock_call[1]["path_params"] for mock_call in call_api_mock.call_args_list])
+        self.assertEqual([[("limit", 500)], [("limit", 500), ("continue", "token")]],
+                         [mock_call[1]["query_params"] for mock_call in call_api_mock.call_args_list])
 
-        with self.assertRaises(ApiException):
-            service.listMongoObjects(param="value")
+    def test_listMongoObjects_400(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        call_api_mock.side_effect = ApiException(400)
 
-        expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.javamachr.cz", "v1", "mongos", param="value")
-        ]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
+        with self.assertRaises(ApiException):
+            list(service.listMongoObjects())
 
     def test_getMongoObject(self, client_mock):
         service = KubernetesService()
@@ -194,72 +276,140 @@ class TestKubernetesService(TestCase):
 
     def test_listAllServicesWithLabels_default(self, client_mock):
         service = KubernetesService()
-        client_mock.reset_mock()
+        list_mock = client_mock.CoreV1Api.return_value.list_service_for_all_namespaces
+        list_mock.side_effect = [MagicMock(items=["first"], metadata=MagicMock(_continue="token")),
+                                 MagicMock(items=["second"], metadata=MagicMock(_continue=None))]
 
         result = service.listAllServicesWithLabels()
-        expected_calls = [call.CoreV1Api().list_service_for_all_namespaces(
-            label_selector="operated-by=operators.javamachr.cz,heritage=mongos"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_service_for_all_namespaces.return_value, result)
+        self.assertEqual(["first", "second"], list(result))
+        selector = "operated-by=operators.javamachr.cz,heritage=mongos"
+        self.assertEqual([call(label_selector=selector, limit=500),
+                          call(label_selector=selector, limit=500, _continue="token")], list_mock.mock_calls)
 
     def test_listAllServicesWithLabels_custom(self, client_mock):
         service = KubernetesService()
-        client_mock.reset_mock()
+        list_mock = client_mock.CoreV1Api.return_value.list_service_for_all_namespaces
+        list_mock.side_effect = [MagicMock(items=["first"], metadata=MagicMock(_continue="token")),
+                                 MagicMock(items=["second"], metadata=MagicMock(_continue=None))]
 
         labels = {"operated-by": "me", "heritage": "mongo", "name": "name"}
         result = service.listAllServicesWithLabels(labels)
-        expected_calls = [call.CoreV1Api().list_service_for_all_namespaces(
-            label_selector = "operated-by=me,heritage=mongo,name=name"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_service_for_all_namespaces.return_value, result)
+        self.assertEqual(["first", "second"], list(result))
+        selector = "operated-by=me,heritage=mongo,name=name"
+        self.assertEqual([call(label_selector=selector, limit=500),
+                          call(label_selector=selector, limit=500, _continue="token")], list_mock.mock_calls)
 
     def test_listAllStatefulSetsWithLabels_default(self, client_mock):
         service = KubernetesService()
-        client_mock.reset_mock()
+        list_mock = client_mock.AppsV1beta1Api.return_value.list_stateful_set_for_all_namespaces
+        list_mock.side_effect = [MagicMock(items=["first"], metadata=MagicMock(_continue="token")),
+                                 MagicMock(items=["second"], metadata=MagicMock(_continue=None))]
 
         result = service.listAllStatefulSetsWithLabels()
-        expected_calls = [call.AppsV1beta1Api().list_stateful_set_for_all_namespaces(
-            label_selector="operated-by=operators.javamachr.cz,heritage=mongos"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.AppsV1beta1Api().list_stateful_set_for_all_namespaces.return_value, result)
+        self.assertEqual(["first", "second"], list(result))
+        selector = "operated-by=operators.javamachr.cz,heritage=mongos"
+        self.assertEqual([call(label_selector=selector, limit=500),
+                          call(label_selector=selector, limit=500, _continue="token")], list_mock.mock_calls)
 
     def test_listAllStatefulSetsWithLabels_custom(self, client_mock):
         service = KubernetesService()
-        client_mock.reset_mock()
+        list_mock = client_mock.AppsV1beta1Api.return_value.list_stateful_set_for_all_namespaces
+        list_mock.side_effect = [MagicMock(items=["first"], metadata=MagicMock(_continue="token")),
+                                 MagicMock(items=["second"], metadata=MagicMock(_continue=None))]
 
         labels = {"operated-by": "me", "heritage": "mongo", "name": "name"}
         result = service.listAllStatefulSetsWithLabels(labels)
-        expected_calls = [call.AppsV1beta1Api().list_stateful_set_for_all_namespaces(
-            label_selector = "operated-by=me,heritage=mongo,name=name"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.AppsV1beta1Api().list_stateful_set_for_all_namespaces.return_value, result)
+        self.assertEqual(["first", "second"], list(result))
+        selector = "operated-by=me,heritage=mongo,name=name"
+        self.assertEqual([call(label_selector=selector, limit=500),
+                          call(label_selector=selector, limit=500, _continue="token")], list_mock.mock_calls)
 
     def test_listAllSecretsWithLabels_default(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
         service = KubernetesService()
-        client_mock.reset_mock()
+        secret = KubernetesResources.createSecret(self.name, self.namespace, {})
+        call_api_mock.side_effect = [
+            MagicMock(data=json.dumps({"items": [{"metadata": KubernetesResources.serialize(secret.metadata)}],
+                                       "metadata": {"continue": "token"}})),
+            MagicMock(data=json.dumps({"items": [], "metadata": {}})),
+        ]
 
-        result = service.listAllSecretsWithLabels()
-        expected_calls = [call.CoreV1Api().list_secret_for_all_namespaces(
-            label_selector="operated-by=operators.javamachr.cz,heritage=mongos"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_secret_for_all_namespaces.return_value, result)
+        result = list(service.listAllSecretsWithLabels())
+        self.assertEqual([(self.namespace, self.name)], [KubernetesResources.getClusterKey(item) for item in result])
+        header_params = {"Accept": "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json",
+                         "Accept-Encoding": "gzip"}
+        selector = "operated-by=operators.javamachr.cz,heritage=mongos"
+        self.assertEqual([
+            call("/api/v1/secrets", "GET", path_params={}, query_params=[("labelSelector", selector), ("limit", 500)],
+                 header_params=header_params, auth_settings=["BearerToken"], _return_http_data_only=True,
+                 _preload_content=False),
+            call("/api/v1/secrets", "GET", path_params={},
+                 query_params=[("labelSelector", selector), ("limit", 500), ("continue", "token")],
+                 header_params=header_params, auth_settings=["BearerToken"], _return_http_data_only=True,
+                 _preload_content=False),
+        ], call_api_mock.call_args_list)
+        client_mock.CoreV1Api.return_value.list_secret_for_all_namespaces.assert_not_called()
 
     def test_listAllSecretsWithLabels_custom(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
         service = KubernetesService()
-        client_mock.reset_mock()
+        call_api_mock.return_value = MagicMock(data=json.dumps({"items": [], "metadata": {}}))
 
         labels = {"operated-by": "me", "heritage": "mongo", "name": "name"}
-        result = service.listAllSecretsWithLabels(labels)
-        expected_calls = [
-            call.CoreV1Api().list_secret_for_all_namespaces(label_selector="operated-by=me,heritage=mongo,name=name")
-        ]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_secret_for_all_namespaces.return_value, result)
+        self.assertEqual([], list(service.listAllSecretsWithLabels(labels)))
+        self.assertEqual([("labelSelector", "operated-by=me,heritage=mongo,name=name"), ("limit", 500)],
+                         call_api_mock.call_args[1]["query_params"])
+
+    def test_listAllSecretsWithLabels_cached(self, client_mock):
+        service = KubernetesService()
+        secret = KubernetesResources.createSecret(self.name, self.namespace, {})
+        metadata = KubernetesResources.serialize(secret.metadata)
+        service.secret_informer.cache.replace([ObjectView({"metadata": metadata})])
+        client_mock.reset_mock()
+
+        self.assertEqual([self.name], [item.metadata.name for item in service.listAllSecretsWithLabels()])
+        self.assertEqual([], client_mock.mock_calls)
+
+    def test_listAllStatefulSetsWithLabels_metadata_only(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        call_api_mock.return_value = MagicMock(data=json.dumps({"items": [{"metadata": {"name": "first"}}]}))
+
+        result = list(service.listAllStatefulSetsWithLabels(metadata_only=True))
+        self.assertEqual(["first"], [item.metadata.name for item in result])
+        self.assertEqual("/apis/apps/v1beta1/statefulsets", call_api_mock.call_args[0][0])
+        self.assertEqual("application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json",
+                         call_api_mock.call_args[1]["header_params"]["Accept"])
+
+    @patch("Settings.Settings.RAW_LIST_RESPONSES", True)
+    def test_listAllServicesWithLabels_raw(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        body = KubernetesResources.serialize(KubernetesResources.createService(self.cluster_object))
+        call_api_mock.return_value = MagicMock(data=json.dumps({"items": [body], "metadata": {}}).encode())
+
+        result = list(service.listAllServicesWithLabels())
+        self.assertEqual([(self.namespace, self.name)], [KubernetesResources.getClusterKey(item) for item in result])
+        call_api_mock.assert_called_once_with(
+            "/api/v1/services", "GET", path_params={},
+            query_params=[("labelSelector", "operated-by=operators.javamachr.cz,heritage=mongos"), ("limit", 500)],
+            header_params={"Accept": "application/json", "Accept-Encoding": "gzip"}, auth_settings=["BearerToken"],
+            _return_http_data_only=True, _preload_content=False)
+        client_mock.CoreV1Api.return_value.list_service_for_all_namespaces.assert_not_called()
+
+    def test__listRaw_watch(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+
+        result = service._listRaw("/api/v1/secrets", label_selector="a=b", resource_version="12", timeout_seconds=300,
+                                  watch=True, metadata_only=True, _preload_content=False)
+        self.assertEqual(call_api_mock.return_value, result)
+        call_api_mock.assert_called_once_with(
+            "/api/v1/secrets", "GET", path_params={},
+            query_params=[("labelSelector", "a=b"), ("resourceVersion", "12"), ("timeoutSeconds", 300),
+                          ("watch", "true")],
+            header_params={"Accept": "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,application/json"},
+            auth_settings=["BearerToken"], _return_http_data_only=True, _preload_content=False)
 
     def test_getSecret(self, client_mock):
         service = KubernetesService()
@@ -270,12 +420,26 @@ class TestKubernetesService(TestCase):
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertEqual(client_mock.CoreV1Api().read_namespaced_secret.return_value, result)
 
+    def test_getSecretMetadata_cached(self, client_mock):
+        service = KubernetesService()
+        service.secret_informer.cache.replace([])
+        client_mock.CoreV1Api.return_value.create_namespaced_secret.return_value = \
+            KubernetesResources.createSecret(self.name, self.namespace, {"password": "secret"})
+        service.createSecret(self.name, self.namespace, {"password": "secret"})
+        client_mock.reset_mock()
+
+        result = service.getSecretMetadata(self.name, self.namespace)
+        self.assertEqual([], client_mock.mock_calls)
+        self.assertEqual(self.name, result.metadata.name)
+        self.assertEqual(["metadata"], list(result))  # the secret data is not cached
+
     def test_createSecret(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
         secret_data = {"username": "unit-test", "password": "secret"}
-        expected_body = V1Secret(metadata=self._createMeta("secret-name"), string_data=secret_data)
+        expected_body = KubernetesResources.stampSpecHash(V1Secret(metadata=self._createMeta("secret-name"),
+                                                                   string_data=secret_data))
         result = service.createSecret("secret-name", self.namespace, secret_data)
 
         self.assertEqual([call.CoreV1Api().create_namespaced_secret(self.namespace, expected_body)],
@@ -291,7 +455,8 @@ class TestKubernetesService(TestCase):
         secret_data = {"username": "unit-test", "password": "secret"}
         result = service.createSecret(self.name, self.namespace, secret_data)
 
-        expected_body = V1Secret(metadata=self._createMeta(self.name), string_data=secret_data)
+        expected_body = KubernetesResources.stampSpecHash(V1Secret(metadata=self._createMeta(self.name),
+                                                                   string_data=secret_data))
         expected_calls = [call.CoreV1Api().create_namespaced_secret(self.namespace, expected_body)]
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertIsNone(result)
@@ -306,19 +471,87 @@ class TestKubernetesService(TestCase):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        client_mock.CoreV1Api.return_value.read_namespaced_secret.return_value = V1Secret(kind="unit")
-
         secret_data = {"username": "unit-test", "password": "secret"}
-        expected_body = V1Secret(kind="unit", string_data=secret_data)
-        expected_calls = [
-            call.CoreV1Api().read_namespaced_secret(self.name, self.namespace),
-            call.CoreV1Api().patch_namespaced_secret(self.name, self.namespace, expected_body),
-        ]
+        expected_body = KubernetesResources.stampSpecHash(V1Secret(metadata=self._createMeta(self.name),
+                                                                   string_data=secret_data))
+        expected_calls = [call.CoreV1Api().patch_namespaced_secret(self.name, self.namespace, expected_body)]
 
         result = service.updateSecret(self.name, self.namespace, secret_data)
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertEqual(client_mock.CoreV1Api.return_value.patch_namespaced_secret.return_value, result)
 
+    def test_updateSecret_owner_references(self, client_mock):
+        service = KubernetesService()
+        client_mock.reset_mock()
+
+        self.cluster_object.metadata.uid = "a1b2c3"
+        owner_references = KubernetesResources.createOwnerReferences(self.cluster_object)
+        self.assertEqual([V1OwnerReference(api_version="operators.javamachr.cz/v1", kind="Mongo", name=self.name,
+                                           uid="a1b2c3", controller=True, block_owner_deletion=True)],
+                         owner_references)
+
+        secret_data = {"username": "unit-test", "password": "secret"}
+        meta = self._createMeta(self.name)
+        meta.owner_references = owner_references
+        expected_body = KubernetesResources.stampSpecHash(V1Secret(metadata=meta, string_data=secret_data))
+        expected_calls = [call.CoreV1Api().patch_namespaced_secret(self.name, self.namespace, expected_body)]
+
+        service.updateSecret(self.name, self.namespace, secret_data, owner_references)
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+
+    def test_applySecret(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        client_mock.reset_mock()
+
+        secret_data = {"username": "unit-test", "password": "secret"}
+        result = service.applySecret(self.name, self.namespace, secret_data)
+
+        expected_body = KubernetesResources.stampSpecHash(V1Secret(metadata=self._createMeta(self.name),
+                                                                   string_data=secret_data))
+        expected_body.api_version, expected_body.kind = "v1", "Secret"
+        expected_calls = [call.ApiClient().call_api(
+            "/api/v1/namespaces/{namespace}/secrets/{name}", "PATCH",
+            path_params={"namespace": self.namespace, "name": self.name},
+            query_params=[("fieldManager", "mongo-operator")],
+            header_params={"Accept": "application/json", "Content-Type": "application/apply-patch+yaml"},
+            body=json.dumps(KubernetesResources.serialize(expected_body)), response_type="V1Secret",
+            auth_settings=["BearerToken"], _return_http_data_only=True
+        )]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(call_api_mock.return_value, result)
+
+    def test_applyService_conflict(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        conflict = ApiException(status=409, reason="Conflict")
+        conflict.body = json.dumps({"details": {"causes": [
+            {"reason": "FieldManagerConflict", "message": 'conflict with "kubectl"', "field": ".spec.type"}
+        ]}})
+        call_api_mock.side_effect = conflict
+
+        with self.assertRaises(ApplyConflictError) as context:
+            service.applyService(self.cluster_object)
+        self.assertEqual(['conflict with "kubectl"'], context.exception.conflicts)
+        self.assertEqual('Conflict applying Service mongo-cluster @ ns/{}: conflict with "kubectl"'
+                         .format(self.namespace), str(context.exception))
+
+    @patch("mongoOperator.helpers.RateLimiter.sleep")
+    def test_call_api_rate_limited(self, sleep_mock, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        for _ in range(Settings.KUBERNETES_WRITE_BURST + 1):
+            service.api_client.call_api("/api/v1/namespaces/{namespace}/secrets/{name}", "DELETE")
+        service.api_client.call_api("/api/v1/namespaces/{namespace}/secrets/{name}", "GET")
+
+        self.assertEqual(Settings.KUBERNETES_WRITE_BURST + 2, call_api_mock.call_count)
+        self.assertEqual(1, sleep_mock.call_count)  # only the writes exceeded their burst
+        stats = service.rate_limiter.getStats()
+        self.assertEqual({"requests": Settings.KUBERNETES_WRITE_BURST + 1, "throttled": 1},
+                         {key: stats["write"][key] for key in ("requests", "throttled")})
+        self.assertEqual({"requests": 1, "throttled": 0},
+                         {key: stats["read"][key] for key in ("requests", "throttled")})
+
     def test_deleteSecret(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
@@ -442,6 +675,28 @@ class TestKubernetesService(TestCase):
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertEqual(client_mock.AppsV1beta1Api().patch_namespaced_stateful_set.return_value, result)
 
+    def test_applyStatefulSet(self, client_mock):
+        call_api_mock = client_mock.ApiClient.return_value.call_api
+        service = KubernetesService()
+        service.stateful_set_informer = MagicMock()
+        client_mock.reset_mock()
+
+        result = service.applyStatefulSet(self.cluster_object)
+
+        expected_body = KubernetesResources.withType(KubernetesResources.createStatefulSetBody(self.cluster_object),
+                                                     "apps/v1beta1", "StatefulSet")
+        expected_calls = [call.ApiClient().call_api(
+            "/apis/apps/v1beta1/namespaces/{namespace}/statefulsets/{name}", "PATCH",
+            path_params={"namespace": self.namespace, "name": self.name},
+            query_params=[("fieldManager", "mongo-operator")],
+            header_params={"Accept": "application/json", "Content-Type": "application/apply-patch+yaml"},
+            body=json.dumps(KubernetesResources.serialize(expected_body)), response_type="V1beta1StatefulSet",
+            auth_settings=["BearerToken"], _return_http_data_only=True
+        )]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(call_api_mock.return_value, result)
+        service.stateful_set_informer.cache.apply.assert_called_once_with("MODIFIED", result)
+
     def test_deleteStatefulSet(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
@@ -2,12 +2,16 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import json
+import threading
 from base64 import b64encode
+from subprocess import SubprocessError
+from time import sleep
 
 from kubernetes.client import V1Secret, V1ObjectMeta
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+from mongoOperator.helpers.ClusterLocks import ClusterLocks
 from mongoOperator.helpers.MongoResources import MongoResources
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from mongoOperator.services.MongoService import MongoService
@@ -16,7 +20,6 @@ from bson.json_util import loads
 from pymongo.errors import OperationFailure, ConnectionFailure
 
 
-@patch("mongoOperator.services.MongoService.sleep", MagicMock())
 @patch("mongoOperator.services.MongoService.MongoClient")
 class TestMongoService(TestCase):
     maxDiff = None
@@ -34,6 +37,7 @@ class TestMongoService(TestCase):
             },
         )
         self.service = MongoService(self.kubernetes_service)
+        self.service.activate()
         self.cluster_dict = getExampleClusterDefinition()
         self.cluster_object = V1MongoClusterConfiguration(**self.cluster_dict)
 
@@ -97,22 +101,14 @@ class TestMongoService(TestCase):
             ConnectionFailure("connection attempt failed"),
             self._getFixture("initiate-ok")
         )
-        result = self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
-        self.assertEqual(self.initiate_ok_response, result)
-
-    def test__mongoAdminCommand_TimeoutError(self, mongo_client_mock):
-        mongo_client_mock.return_value.admin.command.side_effect = (
-            ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"),
-            OperationFailure("no replset config has been received")
-        )
-
-        with self.assertRaises(TimeoutError) as context:
+        with self.assertRaises(ConnectionFailure) as context:
             self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
+        self.assertEqual("connection attempt failed", str(context.exception))
 
-        self.assertEqual("Could not execute command after 4 retries!", str(context.exception))
+        # the next check reuses the client and succeeds.
+        result = self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
+        self.assertEqual(self.initiate_ok_response, result)
+        self.assertEqual(1, mongo_client_mock.call_count)
 
     def test__mongoAdminCommand_NoPrimary(self, mongo_client_mock):
         mongo_client_mock.return_value.admin.command.side_effect = (
@@ -122,6 +118,8 @@ class TestMongoService(TestCase):
 
         )
 
+        with self.assertRaises(ConnectionFailure):
+            self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
         self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
 
     def test_initializeReplicaSet(self, mongo_client_mock):
@@ -159,6 +157,16 @@ class TestMongoService(TestCase):
         mongo_client_mock.return_value.admin.command.return_value = self._getFixture("replica-status-ok")
         self.service.checkOrCreateReplicaSet(self.cluster_object)
 
+    def test_isReplicaSetHealthy(self, mongo_client_mock):
+        self.assertFalse(self.service.isReplicaSetHealthy(self.cluster_object))
+        response = self._getFixture("replica-status-ok")
+        mongo_client_mock.return_value.admin.command.return_value = response
+        self.service.checkOrCreateReplicaSet(self.cluster_object)
+        self.assertTrue(self.service.isReplicaSetHealthy(self.cluster_object))
+        response["members"][1]["health"] = 0.0
+        self.service.checkOrCreateReplicaSet(self.cluster_object)
+        self.assertFalse(self.service.isReplicaSetHealthy(self.cluster_object))
+
     def test_checkOrCreateReplicaSet_initialize(self, mongo_client_mock):
         mongo_client_mock.return_value.admin.command.side_effect = (
             OperationFailure("no replset config has been received"),
@@ -210,17 +218,16 @@ class TestMongoService(TestCase):
 
         self.assertEqual("\"createUser\" had the wrong type. Expected string, found object", str(context.exception))
 
-    def test_createUsers_TimeoutError(self, mongo_client_mock):
+    def test_createUsers_ConnectionFailure(self, mongo_client_mock):
         mongo_client_mock.return_value.admin.command.side_effect = (
             None,
-            ConnectionFailure("connection attempt failed"), ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"), ConnectionFailure("connection attempt failed")
+            ConnectionFailure("connection attempt failed"),
         )
 
-        with self.assertRaises(TimeoutError) as context:
+        with self.assertRaises(ConnectionFailure) as context:
             self.service.createUsers(self.cluster_object)
 
-        self.assertEqual("Could not execute command after 4 retries!", str(context.exception))
+        self.assertEqual("connection attempt failed", str(context.exception))
 
     def test_onReplicaSetReady(self, mongo_client_mock):
         self.service._restore_helper.restoreIfNeeded = MagicMock()
@@ -246,3 +253,123 @@ class TestMongoService(TestCase):
 
         self.service.checkOrCreateReplicaSet.assert_called()
         mongo_client_mock.assert_not_called()
+
+    def test_onReplicaSetReady_failed(self, mongo_client_mock):
+        self.service._restore_helper.restoreIfNeeded = MagicMock(side_effect=(SubprocessError("failed"), True))
+
+        self.service._onReplicaSetReady(self.cluster_object)
+        self.assertEqual([], self.service._restored_cluster_names)
+
+        # the restore is retried during the next check of the replica set.
+        mongo_client_mock.return_value.admin.command.return_value = self._getFixture("replica-status-ok")
+        self.service.checkOrCreateReplicaSet(self.cluster_object)
+        self.assertEqual(["mongo-cluster"], self.service._restored_cluster_names)
+        self.assertEqual(2, self.service._restore_helper.restoreIfNeeded.call_count)
+
+    def test_onReplicaSetReady_standby(self, mongo_client_mock):
+        self.service = MongoService(self.kubernetes_service)
+        self.service._restore_helper.restoreIfNeeded = MagicMock()
+
+        self.service._onReplicaSetReady(self.cluster_object)
+        self.service._restore_helper.restoreIfNeeded.assert_not_called()
+
+        # the restore is done during the first check of the replica set after taking over.
+        self.service.activate()
+        mongo_client_mock.return_value.admin.command.return_value = self._getFixture("replica-status-ok")
+        self.service.checkOrCreateReplicaSet(self.cluster_object)
+        self.service._restore_helper.restoreIfNeeded.assert_called_once_with(self.cluster_object)
+
+    def test_onAllHostsReady_standby(self, mongo_client_mock):
+        self.service = MongoService(self.kubernetes_service)
+        self.service.checkOrCreateReplicaSet = MagicMock()
+
+        self.service._onAllHostsReady(self.cluster_object)
+
+        self.service.checkOrCreateReplicaSet.assert_not_called()
+
+    def test_onReplicaSetReady_not_owner(self, mongo_client_mock):
+        is_owner = MagicMock(return_value=False)
+        self.service = MongoService(self.kubernetes_service, is_owner=is_owner)
+        self.service.activate()
+        self.service._restore_helper.restoreIfNeeded = MagicMock()
+
+        self.service._onReplicaSetReady(self.cluster_object)
+
+        self.service._restore_helper.restoreIfNeeded.assert_not_called()
+        is_owner.assert_called_once_with((self.cluster_object.metadata.namespace, "mongo-cluster"))
+        self.assertEqual({"mongo-cluster"}, self.service._pending_restore_names)
+
+    def test_onAllHostsReady_not_owner(self, mongo_client_mock):
+        self.service = MongoService(self.kubernetes_service, is_owner=lambda key: False)
+        self.service.activate()
+        self.service.checkOrCreateReplicaSet = MagicMock()
+
+        self.service._onAllHostsReady(self.cluster_object)
+
+        self.service.checkOrCreateReplicaSet.assert_not_called()
+
+    def test_onAllHostsReady_locked(self, mongo_client_mock):
+        cluster_locks = ClusterLocks()
+        self.service = MongoService(self.kubernetes_service, cluster_locks)
+        self.service.activate()
+        self.service.checkOrCreateReplicaSet = MagicMock()
+        self.service._restore_helper.restoreIfNeeded = MagicMock()
+        key = self.cluster_object.metadata.namespace, "mongo-cluster"
+
+        # the cluster is being reconciled by another thread, which checks the replica set itself.
+        locked = threading.Event()
+        release = threading.Event()
+
+        def reconcile():
+            with cluster_locks.get(key):
+                locked.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=reconcile)
+        thread.start()
+        locked.wait(5)
+        self.service._onAllHostsReady(self.cluster_object)
+        self.service._onReplicaSetReady(self.cluster_object)
+        release.set()
+        thread.join(5)
+
+        self.service.checkOrCreateReplicaSet.assert_not_called()
+        self.service._restore_helper.restoreIfNeeded.assert_not_called()
+        self.assertEqual({"mongo-cluster"}, self.service._pending_restore_names)
+
+        # once the lock is released, the callbacks act on the cluster again.
+        self.service._onAllHostsReady(self.cluster_object)
+        self.service.checkOrCreateReplicaSet.assert_called_once_with(self.cluster_object)
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(cluster_locks.get(key).acquire(blocking=False)))
+        thread.start()
+        thread.join(5)
+        self.assertEqual([True], acquired)  # the callback released the lock
+
+    def test_connect(self, mongo_client_mock):
+        self.service.connect(self.cluster_object)
+        self.service.connect(self.cluster_object)
+        mongo_client_mock.assert_called_once()
+
+    def test_connect_concurrently(self, mongo_client_mock):
+        started = threading.Event()
+
+        def createClient(*args, **kwargs):
+            started.set()
+            sleep(0.05)  # a second thread calls connect while the client is being created
+            return MagicMock()
+
+        mongo_client_mock.side_effect = createClient
+        thread = threading.Thread(target=self.service.connect, args=(self.cluster_object,))
+        thread.start()
+        started.wait()
+        self.service.connect(self.cluster_object)
+        thread.join()
+        mongo_client_mock.assert_called_once()
+
+    @patch("mongoOperator.services.MongoService.Settings.MONGO_SERVER_SELECTION_TIMEOUT", 2.5)
+    @patch("mongoOperator.services.MongoService.Settings.MONGO_CONNECT_TIMEOUT", 1)
+    def test_connect_timeouts(self, mongo_client_mock):
+        self.service.connect(self.cluster_object)
+        self.assertEqual(1000, mongo_client_mock.call_args[1]["connectTimeoutMS"])
+        self.assertEqual(2500, mongo_client_mock.call_args[1]["serverSelectionTimeoutMS"])